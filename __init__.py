@@ -1,17 +1,51 @@
 from __future__ import annotations
 
 import logging
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant, ServiceCall, callback
 from homeassistant.config_entries import ConfigEntry
-
-from .const import DOMAIN, DEVICE_TYPES
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
+
+from .const import (
+    DOMAIN,
+    DEVICE_TYPES,
+    CONF_PIPELINE_WINDOW,
+    DEFAULT_PIPELINE_WINDOW,
+    CONF_MIN_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    CONF_NIGHT_INTERVAL,
+    DEFAULT_NIGHT_INTERVAL,
+    CONF_PROXY_PORT,
+    DEFAULT_PROXY_PORT,
+    CONF_PROXY_MAX_AGE,
+    DEFAULT_PROXY_MAX_AGE,
+)
 from .modbus_client import EpeverModbusClient
 from .coordinator import EpeverCoordinator
+from .capture import BurstCapture
+from .orchestrator import async_get_orchestrator
+from .services import async_setup_services
+from .settings import EpeverSettings
+from .storage import EpeverStore
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = ["sensor"]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+# ================================================================
+#   SETUP INTEGRATION
+# ================================================================
+async def async_setup(hass: HomeAssistant, config: ConfigType):
+    """Register the services shared by all entries."""
+    await async_setup_services(hass)
+    return True
+
 
 # ================================================================
 #   SETUP ENTRY
@@ -31,34 +65,56 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         return False
 
     # ------------------------------------------------------------
-    # Create Modbus client
+    # Create Modbus client (shares one connection per gateway host:port)
     # ------------------------------------------------------------
     client = EpeverModbusClient(
         host=host,
         port=port,
         slave=slave,
+        pipeline_window=entry.options.get(CONF_PIPELINE_WINDOW, DEFAULT_PIPELINE_WINDOW),
     )
 
-    try:
-        await client.connect()
-        _LOGGER.info("Connected to Epever device %s at %s:%s", name, host, port)
-    except Exception as err:
-        _LOGGER.error("Modbus connection failed: %s", err)
-        return False
+    # Data kept across restarts (registers the device rejects, last values)
+    store = EpeverStore(hass, entry.entry_id)
+    await store.async_load()
 
     # ------------------------------------------------------------
-    # Create coordinator (polling every 5 seconds)
+    # Create coordinator (polls at an adaptive interval within the
+    # options' bounds, driven by the refresh orchestrator shared by all
+    # entries)
     # ------------------------------------------------------------
     coordinator = EpeverCoordinator(
         hass=hass,
         client=client,
         profile=profile,
         device_name=name,
-        update_interval=5,
+        min_interval=entry.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+        max_interval=entry.options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+        night_interval=entry.options.get(CONF_NIGHT_INTERVAL, DEFAULT_NIGHT_INTERVAL),
+        store=store,
     )
 
-    # Initial data load
-    await coordinator.async_config_entry_first_refresh()
+    if coordinator.restore_snapshot():
+        # Warm start: entities come up with the saved values, the connection
+        # and first refresh happen in the background
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} first refresh {name}"
+        )
+    else:
+        try:
+            await client.connect()
+            _LOGGER.info("Connected to Epever device %s at %s:%s", name, host, port)
+        except Exception as err:
+            _LOGGER.error("Modbus connection failed: %s", err)
+            return False
+
+        # Initial data load; ConfigEntryNotReady makes Home Assistant retry
+        # the setup, so give back the gateway reference connect() took
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception:
+            await client.close()
+            raise
 
     # Store for access by platforms + services
     hass.data.setdefault(DOMAIN, {})
@@ -68,17 +124,63 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         "profile": profile,
         "name": name,
         "device_id": entry.entry_id,   # required for service targeting
+        "settings": EpeverSettings(client, profile, coordinator.registers),
+        "capture": BurstCapture(client, profile),
     }
 
 
     # ------------------------------------------------------------
     # Load platform(s)
     # ------------------------------------------------------------
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    try:
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    except Exception:
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+        await client.close()
+        raise
+
+    # Serve the register cache to other Modbus clients
+    proxy_port = entry.options.get(CONF_PROXY_PORT, DEFAULT_PROXY_PORT)
+    if proxy_port:
+        # Imported only when used: it loads the Modbus server side
+        from .proxy import PROXIES, ProxyDeviceContext
+
+        proxy = ProxyDeviceContext(
+            client,
+            coordinator.registers,
+            max_age=entry.options.get(CONF_PROXY_MAX_AGE, DEFAULT_PROXY_MAX_AGE),
+        )
+        try:
+            if await PROXIES.attach(proxy_port, slave, proxy):
+                hass.data[DOMAIN][entry.entry_id]["proxy"] = proxy
+                # Unload runs with the new options after an options change
+                hass.data[DOMAIN][entry.entry_id]["proxy_port"] = proxy_port
+        except Exception as err:
+            _LOGGER.error("Modbus proxy on port %s failed to start: %s", proxy_port, err)
+
+    # Hand periodic refreshes to the orchestrator
+    async_get_orchestrator(hass).register(
+        coordinator, client.gateway, concurrency=client.pipeline_window
+    )
+
+    # Keep the energy accumulators (and last values) when Home Assistant stops
+    @callback
+    def _async_save_on_stop(_event):
+        coordinator.save_state()
+
+    entry.async_on_unload(hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_save_on_stop))
+
+    # Re-create client/coordinator when the options change
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
 
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry):
+    """Reload the entry so changed options take effect."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 # ================================================================
 #   UNLOAD ENTRY
 # ================================================================
@@ -86,8 +188,22 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a Epever Modbus config entry."""
     data = hass.data[DOMAIN].pop(entry.entry_id)
 
+    async_get_orchestrator(hass).unregister(data["coordinator"])
+    data["coordinator"].save_state()
+
+    if "proxy" in data:
+        from .proxy import PROXIES
+
+        await PROXIES.detach(data["proxy_port"], entry.data["slave"])
+
+    # Drops this entry's reference; the last entry on a gateway closes it
     client: EpeverModbusClient = data["client"]
     await client.close()
 
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Delete the entry's stored data when it is removed."""
+    await EpeverStore(hass, entry.entry_id).async_remove()
@@ -0,0 +1,31 @@
+"""Shared helpers for the benchmark scripts.
+
+The integration is a Home Assistant custom component: a package that uses
+relative imports, normally loaded as ``custom_components.epever_modbus``.
+The scripts register the repository as the package ``epever_modbus``
+(without running its ``__init__``, which needs Home Assistant) so that the
+Home Assistant independent modules can be imported and timed on their own.
+The vendored pymodbus is imported through it too, ``epever_modbus.vendor.pymodbus``:
+it only uses relative imports and is not on sys.path as ``pymodbus``.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+PACKAGE = "epever_modbus"
+
+# Registered up front, so scripts can also import the vendored pymodbus
+# as epever_modbus.vendor.pymodbus (the same modules the integration uses)
+if PACKAGE not in sys.modules:
+    _package = types.ModuleType(PACKAGE)
+    _package.__path__ = [str(ROOT)]
+    sys.modules[PACKAGE] = _package
+
+
+def load(module: str):
+    """Import `<integration>.<module>` without importing Home Assistant."""
+    return importlib.import_module(f"{PACKAGE}.{module}")
@@ -0,0 +1,83 @@
+"""Compare per-register reads with planned block reads.
+
+Serves the Epever Tracer register map from the Epever simulator over the
+pymodbus null modem (no network involved) and refreshes it through
+EpeverModbusClient, once with one request per sensor (the old behaviour) and
+once with the read plan, counting the PDUs the simulator receives.
+
+    python benchmarks/bench_block_reads.py [--cycles N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from _common import load
+from epever_simulator import start_simulator
+
+from epever_modbus.vendor.pymodbus.transport import NULLMODEM_HOST
+
+const = load("const")
+planner = load("planner")
+modbus_client = load("modbus_client")
+
+PORT = 5020
+
+
+async def per_sensor_cycle(client, profile):
+    for sensor in profile["sensors"]:
+        await client.read_register(sensor["register"], count=planner.sensor_length(sensor))
+
+
+async def planned_cycle(client, plan):
+    for block in plan:
+        await client.read_register(block.start, count=block.count, reg_type=block.reg_type)
+
+
+async def main(cycles: int) -> None:
+    profile = const.DEVICE_TYPES["epever_tracer"]
+    plan = planner.plan_reads(
+        profile["sensors"],
+        max_gap=profile.get("max_gap", const.DEFAULT_MAX_GAP),
+        max_registers=profile.get("max_registers", const.DEFAULT_MAX_REGISTERS),
+    )
+
+    pdus = 0
+
+    def count_pdu(sending, pdu):
+        nonlocal pdus
+        if not sending:
+            pdus += 1
+        return pdu
+
+    server = await start_simulator(NULLMODEM_HOST, PORT, trace_pdu=count_pdu)
+
+    client = modbus_client.EpeverModbusClient(host=NULLMODEM_HOST, port=PORT, slave=1)
+    await client.connect()
+
+    print(f"{len(profile['sensors'])} sensors, {len(plan)} planned blocks:")
+    for block in plan:
+        print(f"  {block.reg_type:7} 0x{block.start:04X}-0x{block.end - 1:04X} "
+              f"({block.count} registers, {len(block.sensors)} sensors)")
+
+    for label, run in (
+        ("per-sensor", lambda: per_sensor_cycle(client, profile)),
+        ("planned", lambda: planned_cycle(client, plan)),
+    ):
+        pdus = 0
+        start = time.perf_counter()
+        for _ in range(cycles):
+            await run()
+        elapsed = time.perf_counter() - start
+        print(f"{label:10}  {pdus / cycles:6.1f} PDUs/refresh  "
+              f"{elapsed / cycles * 1000:7.2f} ms/refresh")
+
+    await client.close()
+    await server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=50)
+    asyncio.run(main(parser.parse_args().cycles))
@@ -0,0 +1,166 @@
+"""Drive the real EpeverCoordinator against N simulated Epever slaves.
+
+Every round refreshes all coordinators together (as the refresh orchestrator
+does on a tick) and reports refresh latency percentiles, PDUs per refresh
+and CPU time per refresh. Needs Home Assistant installed.
+
+By default the Epever simulator runs in-process over the pymodbus null modem
+(its CPU time is then included); `--connect HOST:PORT` polls a simulator
+started separately with benchmarks/epever_simulator.py instead.
+`--replay TRACE` answers from a recorded packet trace (see replay.py), for
+the unit ids found in it, and `--record TRACE` records this run's traffic.
+
+    python benchmarks/bench_coordinator.py --slaves 10 --latency 0.03 --rounds 20
+    python benchmarks/bench_coordinator.py --slaves 10 --pipeline-window 4 --tiered
+    python benchmarks/bench_coordinator.py --replay field.eptrace --fast
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+from _common import load
+from epever_simulator import add_condition_arguments, conditions_from_args, start_simulator
+from replay import start_replay
+
+from homeassistant.core import HomeAssistant
+from epever_modbus.vendor.pymodbus.transport import NULLMODEM_HOST
+
+const = load("const")
+coordinator_module = load("coordinator")
+modbus_client = load("modbus_client")
+packet_trace = load("packet_trace")
+
+PORT = 5020
+
+
+def percentile(samples: list[float], pct: int) -> float:
+    if len(samples) < 2:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def requests_sent(coordinators) -> int:
+    """Requests sent by the coordinators' clients, retries included."""
+    return sum(c.client.metrics.requests + c.client.metrics.retries for c in coordinators)
+
+
+async def timed_refresh(coordinator, latencies: list[float]):
+    start = time.perf_counter()
+    await coordinator.async_refresh()
+    latencies.append(time.perf_counter() - start)
+
+
+async def main(args) -> None:
+    profile = const.DEVICE_TYPES["epever_tracer"]
+    pdus = 0
+
+    def count_pdu(sending, pdu):
+        nonlocal pdus
+        if not sending:
+            pdus += 1
+        return pdu
+
+    server = None
+    replay = None
+    slaves = list(range(1, args.slaves + 1))
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        port = int(port)
+    elif args.replay:
+        host, port = NULLMODEM_HOST, PORT
+        replay = await start_replay(host, port, args.replay, realtime=not args.fast)
+        slaves = replay.responder.units
+    else:
+        host, port = NULLMODEM_HOST, PORT
+        server = await start_simulator(
+            host, port, slaves=args.slaves, conditions=conditions_from_args(args),
+            store=args.store, trace_pdu=count_pdu,
+        )
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+
+        coordinators = []
+        for slave in slaves:
+            client = modbus_client.EpeverModbusClient(
+                host, port, slave, pipeline_window=args.pipeline_window
+            )
+            await client.connect()
+            coordinators.append(
+                coordinator_module.EpeverCoordinator(hass, client, profile, f"sim {slave}")
+            )
+
+        recorder = await coordinators[0].client.start_trace() if args.record else None
+
+        # First refresh reads every tier, like setup does
+        await asyncio.gather(*(c.async_refresh() for c in coordinators))
+
+        latencies: list[float] = []
+        rounds: list[float] = []
+        pdus = 0
+        sent = requests_sent(coordinators)
+        cpu_start = time.process_time()
+        for _ in range(args.rounds):
+            if args.tiered:
+                # Real poll cadence: only the tiers due on this tick are read
+                await asyncio.sleep(coordinators[0].poll_interval.total_seconds())
+            else:
+                for coordinator in coordinators:
+                    coordinator.reset_poll_schedule()
+            start = time.perf_counter()
+            await asyncio.gather(*(timed_refresh(c, latencies) for c in coordinators))
+            rounds.append(time.perf_counter() - start)
+        cpu = time.process_time() - cpu_start
+        if server is None:
+            # No server-side trace: count the requests the clients sent instead
+            pdus = requests_sent(coordinators) - sent
+
+        refreshes = len(latencies)
+        failed = sum(not c.last_update_success for c in coordinators)
+        print(f"{len(slaves)} slaves, {args.rounds} rounds, "
+              f"{'tiered' if args.tiered else 'full'} refreshes, pipeline window {args.pipeline_window}")
+        print(f"  refresh latency  p50 {percentile(latencies, 50) * 1000:8.2f} ms  "
+              f"p95 {percentile(latencies, 95) * 1000:8.2f} ms  "
+              f"p99 {percentile(latencies, 99) * 1000:8.2f} ms")
+        print(f"  round (all slaves)    {statistics.mean(rounds) * 1000:8.2f} ms mean")
+        print(f"  PDUs per refresh      {pdus / refreshes:8.2f}")
+        print(f"  CPU per refresh       {cpu / refreshes * 1000:8.3f} ms"
+              f"{'' if args.connect else ' (including the simulator)'}")
+        if replay:
+            responder = replay.responder
+            print(f"  replayed              {responder.answered} answered, "
+                  f"{responder.unanswered} unanswered, {responder.unknown} not in the trace")
+        if failed:
+            print(f"  {failed} coordinators failed their last refresh")
+
+        if recorder:
+            coordinators[0].client.stop_trace()
+            recorder.save(args.record)
+            print(f"  recorded {recorder.packets} packets to {args.record}")
+
+        for coordinator in coordinators:
+            await coordinator.client.close()
+        await hass.async_stop(force=True)
+
+    if server:
+        await server.shutdown()
+    if replay:
+        replay.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--tiered", action="store_true",
+                        help="wait a poll interval per round and read only due tiers")
+    parser.add_argument("--pipeline-window", type=int, default=const.DEFAULT_PIPELINE_WINDOW)
+    parser.add_argument("--connect", metavar="HOST:PORT", help="poll an external simulator")
+    parser.add_argument("--replay", metavar="TRACE", help="answer from a recorded packet trace")
+    parser.add_argument("--fast", action="store_true", help="replay without the recorded delays")
+    parser.add_argument("--record", metavar="TRACE", help="record this run's gateway traffic")
+    add_condition_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+"""Time the config flow's discovery scan against many simulated slaves.
+
+Runs the Epever simulator over the pymodbus null modem with units at
+random ids among 1-247 and scans the whole range with discovery.py,
+reporting the scan time and whether every unit was found.
+
+    python benchmarks/bench_discovery.py [--slaves 10] [--latency 0.02] [--concurrency 16]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+
+from _common import load
+from epever_simulator import BusConditions, build_context
+
+from epever_modbus.vendor.pymodbus.server import ModbusTcpServer
+from epever_modbus.vendor.pymodbus.transport import NULLMODEM_HOST
+
+const = load("const")
+discovery = load("discovery")
+
+PORT = 5020
+
+
+async def main(args) -> None:
+    ids = sorted(random.sample(range(1, 248), args.slaves))
+    context = build_context(args.slaves, BusConditions(latency=args.latency))
+    # Move the simulated units to random ids
+    devices = [device for _slave, device in context]
+    for slave in range(1, args.slaves + 1):
+        del context[slave]
+    for slave, device in zip(ids, devices):
+        context[slave] = device
+
+    server = ModbusTcpServer(context, address=(NULLMODEM_HOST, PORT), ignore_missing_devices=True)
+    await server.serve_forever(background=True)
+
+    start = time.perf_counter()
+    found = await discovery.scan_gateway(
+        NULLMODEM_HOST, PORT, concurrency=args.concurrency, timeout=args.timeout
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"scanned 1-247 in {elapsed:.2f} s (concurrency {args.concurrency}, timeout {args.timeout} s)")
+    for device in found:
+        print(f"  {device.label}")
+    missing = set(ids) - {device.slave for device in found}
+    print("all units found" if not missing else f"MISSED units {sorted(missing)}")
+
+    await server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slaves", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=const.DISCOVERY_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=const.DISCOVERY_TIMEOUT)
+    asyncio.run(main(parser.parse_args()))
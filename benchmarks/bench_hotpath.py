@@ -0,0 +1,431 @@
+"""Micro-benchmarks of the per-refresh CPU cost, no device or network needed.
+
+Every case runs the real code over the responses of one full refresh of an
+Epever Tracer (all planned block reads), taken from the simulator's
+register map or from a recorded packet trace (``--trace``):
+
+    framer.handleFrame      MBAP framing and PDU decode of every response
+    DecodePDU.decode        function code lookup and PDU decode
+    registers.decode        the register response decode methods
+    convert_from_registers  the pymodbus client's datatype helpers
+    BlockDecoder.decode     the integration's block decode (scaled values)
+    formulas                every function of formulas.FORMULAS
+    coordinator.update      EpeverCoordinator._async_update_data, client stubbed (*)
+    sensor.native_value     EpeverVirtualSensor.native_value of every virtual sensor (*)
+
+(*) needs Home Assistant installed, skipped otherwise.
+
+Each case reports refreshes (ops) per second, the best of --repeat timed
+runs of about --time seconds each with the garbage collector off, the peak
+memory allocated during one op and the memory blocks it leaves behind.
+Simulated values are seeded, so runs are reproducible on one machine.
+
+    python benchmarks/bench_hotpath.py --save baseline.json
+    python benchmarks/bench_hotpath.py --compare baseline.json --threshold 10
+    python benchmarks/bench_hotpath.py framer registers
+
+--compare prints the change against a saved run and, with --threshold,
+exits with status 1 when a case got slower by more than that percentage.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from _common import load
+from epever_simulator import ACTIONS, PROFILE, tracer_config
+
+from epever_modbus.vendor.pymodbus.client.mixin import ModbusClientMixin
+from epever_modbus.vendor.pymodbus.datastore import ModbusSimulatorContext
+from epever_modbus.vendor.pymodbus.framer import FramerSocket
+from epever_modbus.vendor.pymodbus.pdu import DecodePDU
+from epever_modbus.vendor.pymodbus.pdu.register_message import (
+    ReadHoldingRegistersResponse,
+    ReadInputRegistersResponse,
+)
+
+decoder_module = load("decoder")
+formulas = load("formulas")
+metrics = load("metrics")
+packet_trace = load("packet_trace")
+planner = load("planner")
+
+FUNCTION_CODES = {"holding": 3, "input": 4}
+RESPONSES = {3: ReadHoldingRegistersResponse, 4: ReadInputRegistersResponse}
+
+DATATYPE = ModbusClientMixin.DATATYPE
+CONVERSIONS = [
+    DATATYPE.UINT16, DATATYPE.INT16, DATATYPE.UINT32, DATATYPE.INT32, DATATYPE.FLOAT32, DATATYPE.UINT64,
+]
+
+
+# ============================================================
+#  RECORDED RESPONSES
+# ============================================================
+
+def plan_blocks(profile: dict) -> list:
+    """The profile's block reads, planned per poll tier like the coordinator does."""
+    tiers = {}
+    for sensor in profile["sensors"]:
+        tiers.setdefault(planner.sensor_tier(sensor), []).append(sensor)
+    return [block for sensors in tiers.values() for block in planner.plan_reads(sensors)]
+
+
+def simulated_registers(blocks: list) -> dict[tuple[str, int], int]:
+    """(table, address) -> value for every register of the blocks, from the simulator."""
+    random.seed(0)
+    store = ModbusSimulatorContext(tracer_config(), ACTIONS)
+    values = {}
+    for block in blocks:
+        registers = store.getValues(FUNCTION_CODES[block.reg_type], block.start, block.count)
+        for offset, value in enumerate(registers):
+            values[(block.reg_type, block.start + offset)] = value
+    return values
+
+
+def simulated_frames(blocks: list, registers: dict) -> list[bytes]:
+    """Response frames (MBAP + PDU) of one refresh."""
+    framer = FramerSocket(DecodePDU(False))
+    frames = []
+    for tid, block in enumerate(blocks, 1):
+        values = [registers[(block.reg_type, block.start + i)] for i in range(block.count)]
+        response = RESPONSES[FUNCTION_CODES[block.reg_type]](
+            registers=values, dev_id=1, transaction_id=tid
+        )
+        frames.append(framer.buildFrame(response))
+    return frames
+
+
+def recorded_frames(path: str) -> list[bytes]:
+    """Register read responses (FC03/FC04) of a packet trace."""
+    records = packet_trace.read_trace(Path(path).read_bytes())
+    frames = [
+        exchange.response for exchange in packet_trace.exchanges(records)
+        if exchange.response is not None and exchange.response[7] in RESPONSES
+    ]
+    if not frames:
+        raise SystemExit(f"{path}: no register read responses recorded")
+    return frames
+
+
+# ============================================================
+#  CASES
+# ============================================================
+
+class Context:
+    """Inputs shared by the cases."""
+
+    def __init__(self, args):
+        self.profile = PROFILE
+        self.blocks = plan_blocks(self.profile)
+        self.registers = simulated_registers(self.blocks)
+        if args.trace:
+            self.frames = recorded_frames(args.trace)
+        else:
+            self.frames = simulated_frames(self.blocks, self.registers)
+        self.decoders = [decoder_module.BlockDecoder(block) for block in self.blocks]
+        self.block_registers = [
+            [self.registers[(block.reg_type, block.start + i)] for i in range(block.count)]
+            for block in self.blocks
+        ]
+        self.data = {}
+        for decoder, registers in zip(self.decoders, self.block_registers):
+            self.data.update(decoder.decode(registers))
+        self.loop = asyncio.new_event_loop()
+        self.hass = None
+        self._config_dir = None
+
+    def close_hass(self):
+        """Stop the Home Assistant instance of the last case, if any."""
+        if self.hass is None:
+            return
+        self.loop.run_until_complete(self.hass.async_stop(force=True))
+        self._config_dir.cleanup()
+        self.hass = self._config_dir = None
+
+
+def case_handle_frame(ctx: Context):
+    framer = FramerSocket(DecodePDU(False))
+    frames = ctx.frames
+
+    def op():
+        for frame in frames:
+            framer.handleFrame(frame, 0, 0)
+    return op
+
+
+def case_decode_pdu(ctx: Context):
+    decoder = DecodePDU(False)
+    pdus = [frame[7:] for frame in ctx.frames]
+
+    def op():
+        for pdu in pdus:
+            decoder.decode(pdu)
+    return op
+
+
+def case_register_decode(ctx: Context):
+    bodies = [(RESPONSES[frame[7]], frame[8:]) for frame in ctx.frames]
+
+    def op():
+        for response_class, body in bodies:
+            response_class().decode(body)
+    return op
+
+
+def case_convert(ctx: Context):
+    registers = [registers for registers in ctx.block_registers if len(registers) >= 4]
+    convert = ModbusClientMixin.convert_from_registers
+    # Every datatype, at every 8th register of the refresh's blocks
+    conversions = [
+        (block[i:i + data_type.value[1]], data_type)
+        for block in registers
+        for data_type in CONVERSIONS
+        for i in range(0, len(block) - data_type.value[1] + 1, 8)
+    ]
+
+    def op():
+        for values, data_type in conversions:
+            convert(values, data_type, word_order="little")
+    return op
+
+
+def case_block_decode(ctx: Context):
+    pairs = list(zip(ctx.decoders, ctx.block_registers))
+
+    def op():
+        for decoder, registers in pairs:
+            decoder.decode(registers)
+    return op
+
+
+def case_formulas(ctx: Context):
+    functions = list(formulas.FORMULAS.values())
+    data = ctx.data
+
+    def op():
+        for func in functions:
+            func(data)
+    return op
+
+
+class StubClient:
+    """EpeverModbusClient answering from the recorded registers, no I/O."""
+
+    def __init__(self, registers: dict[tuple[str, int], int]):
+        self.registers = registers
+        self.metrics = metrics.PollMetrics()
+
+    async def read_block(self, register: int, count: int = 1, reg_type: str = "input"):
+        self.metrics.record_request(0.0, count, 0)
+        return [self.registers.get((reg_type, register + i), 0) for i in range(count)], None
+
+    async def read_register(self, register: int, count: int = 1, reg_type: str = "input"):
+        registers, _exception_code = await self.read_block(register, count, reg_type)
+        return registers
+
+    async def read_device_identification(self, timeout=None):
+        return {0: "Epever", 1: "Tracer"}
+
+
+def _hass(ctx: Context):
+    if ctx.hass is None:
+        from homeassistant.core import HomeAssistant
+
+        async def build():
+            # HomeAssistant binds to the running loop, like bench_coordinator.py
+            return HomeAssistant(ctx._config_dir.name)
+
+        ctx._config_dir = tempfile.TemporaryDirectory()
+        ctx.hass = ctx.loop.run_until_complete(build())
+    return ctx.hass
+
+
+def case_coordinator(ctx: Context):
+    coordinator_module = load("coordinator")
+    coordinator = coordinator_module.EpeverCoordinator(
+        _hass(ctx), StubClient(ctx.registers), ctx.profile, "bench"
+    )
+
+    async def refresh():
+        # Every tier due: one full refresh per op
+        coordinator.reset_poll_schedule()
+        coordinator.data = await coordinator._async_update_data()
+
+    def op():
+        ctx.loop.run_until_complete(refresh())
+    return op
+
+
+def case_native_value(ctx: Context):
+    sensor_module = load("sensor")
+    coordinator_module = load("coordinator")
+    coordinator = coordinator_module.EpeverCoordinator(
+        _hass(ctx), StubClient(ctx.registers), ctx.profile, "bench"
+    )
+    coordinator.data = ctx.data
+    coordinator.virtual_data = coordinator.virtual_plan.evaluate(ctx.data)
+    sensors = [
+        sensor_module.EpeverVirtualSensor(coordinator, "bench", cfg["key"], cfg)
+        for cfg in ctx.profile.get("virtual_sensors", [])
+    ]
+
+    def op():
+        for sensor in sensors:
+            sensor.native_value
+    return op
+
+
+# name -> (setup returning the op, needs Home Assistant)
+CASES = {
+    "framer.handleFrame": (case_handle_frame, False),
+    "DecodePDU.decode": (case_decode_pdu, False),
+    "registers.decode": (case_register_decode, False),
+    "convert_from_registers": (case_convert, False),
+    "BlockDecoder.decode": (case_block_decode, False),
+    "formulas": (case_formulas, False),
+    "coordinator.update": (case_coordinator, True),
+    "sensor.native_value": (case_native_value, True),
+}
+
+
+# ============================================================
+#  MEASUREMENT
+# ============================================================
+
+def ops_per_second(op, repeat: int, seconds: float) -> float:
+    """Best of `repeat` timed runs of about `seconds` each, gc off."""
+    # Calibrate the number of ops per run
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds / 10:
+            break
+        number *= 2
+    number = max(1, int(number * seconds / elapsed))
+
+    best = float("inf")
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                op()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return number / best
+
+
+def allocations(op, ops: int = 100) -> tuple[int, float]:
+    """(peak bytes allocated during one op, memory blocks left behind per op)."""
+    op()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        current, _peak = tracemalloc.get_traced_memory()
+        op()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    for _ in range(ops):
+        op()
+    gc.collect()
+    return peak - current, (sys.getallocatedblocks() - blocks) / ops
+
+
+def change(new: float, old: float | None) -> str:
+    if not old:
+        return ""
+    return f"{(new - old) / old * 100:+7.1f}%"
+
+
+def main(args) -> int:
+    ctx = Context(args)
+    selected = [
+        name for name in CASES
+        if not args.cases or any(pattern.lower() in name.lower() for pattern in args.cases)
+    ]
+    saved = json.loads(Path(args.compare).read_text()) if args.compare else {}
+    baseline = saved.get("cases", {})
+
+    print(f"{len(ctx.frames)} responses per refresh "
+          f"({'trace ' + args.trace if args.trace else 'simulated Tracer'}), "
+          f"Python {platform.python_version()}")
+    if saved and saved.get("responses") != len(ctx.frames):
+        print(f"  (baseline measured on {saved.get('responses')} responses per refresh, not comparable)")
+    print(f"  {'case':<24} {'ops/s':>10} {'us/op':>9} {'peak B/op':>10} {'blocks/op':>9}"
+          + ("   vs baseline" if baseline else ""))
+
+    results = {}
+    slower = []
+    for name in selected:
+        setup, needs_hass = CASES[name]
+        try:
+            op = setup(ctx)
+        except ImportError as err:
+            ctx.close_hass()
+            if not needs_hass:
+                raise
+            print(f"  {name:<24} skipped ({err.name} not installed)")
+            continue
+        try:
+            rate = ops_per_second(op, args.repeat, args.time)
+            peak, blocks = allocations(op)
+        finally:
+            ctx.close_hass()
+        results[name] = {"ops": rate, "peak_bytes": peak, "blocks": blocks}
+
+        old = baseline.get(name, {})
+        delta = change(rate, old.get("ops"))
+        print(f"  {name:<24} {rate:10.0f} {1e6 / rate:9.2f} {peak:10d} {blocks:9.2f}   {delta}")
+        if args.threshold and old.get("ops") and rate < old["ops"] * (1 - args.threshold / 100):
+            slower.append(name)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(
+            {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "responses": len(ctx.frames),
+                "cases": results,
+            },
+            indent=2,
+        ))
+        print(f"saved to {args.save}")
+    ctx.loop.close()
+
+    if slower:
+        print(f"FAIL: more than {args.threshold}% slower: {', '.join(slower)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cases", nargs="*", help="run only cases whose name contains one of these")
+    parser.add_argument("--trace", help="take the responses from a recorded packet trace")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (best is kept)")
+    parser.add_argument("--time", type=float, default=0.2, help="seconds per timed run")
+    parser.add_argument("--save", metavar="JSON", help="save the results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="compare with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0,
+                        help="with --compare, fail when a case is this many %% slower")
+    sys.exit(main(parser.parse_args()))
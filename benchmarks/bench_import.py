@@ -0,0 +1,131 @@
+"""Measure the import time of the integration's client side modules.
+
+Every run imports them in a fresh interpreter under ``python -X importtime``
+and the median over the runs is reported: the cumulative time of each
+module and the time spent in the vendored pymodbus itself. Standard
+library modules Home Assistant has loaded long before any integration
+(asyncio, logging, ssl, ...) are imported first and not counted.
+
+The run also checks the vendored pymodbus stays isolated and lean: no top
+level ``pymodbus`` (an installed copy) gets imported, nor aiohttp or the
+serial, TLS, UDP, server and simulator parts of the vendored copy (the
+Modbus proxy, which needs the server, is imported only when enabled).
+
+    python benchmarks/bench_import.py [--runs 10] [--budget 30]
+
+Exits with status 1 when a check fails or the modules take more than
+--budget ms in total, to catch Home Assistant boot time regressions.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from _common import PACKAGE
+
+MODULES = ["modbus_client", "discovery", "register_cache"]
+
+# Loaded by Home Assistant before it imports any integration
+PRELOAD = [
+    "asyncio", "collections", "dataclasses", "enum", "functools", "json",
+    "logging", "select", "socket", "ssl", "struct", "threading", "typing",
+]
+
+VENDOR = f"{PACKAGE}.vendor.pymodbus"
+
+# Vendored modules the integration never needs at import time
+UNWANTED = [
+    f"{VENDOR}.client.serial",
+    f"{VENDOR}.client.tls",
+    f"{VENDOR}.client.udp",
+    f"{VENDOR}.datastore.array_simulator",
+    f"{VENDOR}.datastore.simulator",
+    f"{VENDOR}.server",
+    f"{VENDOR}.transport.serialtransport",
+    "pymodbus",
+    "aiohttp",
+    "serial",
+]
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+CHILD = """
+import sys
+for name in {preload!r}:
+    __import__(name)
+sys.path.insert(0, {bench!r})
+import _common
+print("-- start --", file=sys.stderr)
+for module in {modules!r}:
+    # __import__, unlike importlib.import_module, is reported by -X importtime
+    __import__(f"{{_common.PACKAGE}}.{{module}}")
+print("-- end --", file=sys.stderr)
+print(__import__("json").dumps(sorted(sys.modules)))
+"""
+
+
+def run_once(modules: list[str]) -> tuple[dict[str, int], dict[str, int], list[str]]:
+    """(cumulative us per module, self us per vendored module, loaded module names)."""
+    code = CHILD.format(preload=PRELOAD, bench=str(Path(__file__).parent), modules=modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    report = result.stderr.split("-- start --", 1)[1].split("-- end --", 1)[0]
+
+    cumulative = {}
+    vendored = {}
+    for match in LINE.finditer(report):
+        own, total, _indent, name = int(match[1]), int(match[2]), match[3], match[4]
+        if name.startswith(f"{PACKAGE}.") and name.removeprefix(f"{PACKAGE}.") in modules:
+            cumulative[name.removeprefix(f"{PACKAGE}.")] = total
+        if name.startswith(VENDOR):
+            vendored[name] = own
+    return cumulative, vendored, json.loads(result.stdout)
+
+
+def main(args) -> int:
+    runs = [run_once(args.modules) for _ in range(args.runs)]
+    failed = False
+
+    print(f"{len(runs)} runs, median ms (modules already imported by an earlier one count 0)")
+    totals = []
+    for module in args.modules:
+        times = [cumulative.get(module, 0) / 1000 for cumulative, _, _ in runs]
+        print(f"  {module:<16} {statistics.median(times):7.2f}")
+    for cumulative, _, _ in runs:
+        totals.append(sum(cumulative.values()) / 1000)
+    total = statistics.median(totals)
+    print(f"  {'total':<16} {total:7.2f}")
+
+    vendored = [sum(own.values()) / 1000 for _, own, _ in runs]
+    _, own, loaded = runs[-1]
+    print(f"vendored pymodbus: {len(own)} modules, {statistics.median(vendored):.2f} ms own time")
+    for name, us in sorted(own.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {name.removeprefix(VENDOR + '.') or '__init__':<32} {us / 1000:6.2f}")
+
+    unwanted = sorted(
+        name for name in loaded
+        if any(name == prefix or name.startswith(prefix + ".") for prefix in UNWANTED)
+    )
+    if unwanted:
+        print(f"FAIL: unwanted modules imported: {', '.join(unwanted)}")
+        failed = True
+    if args.budget and total > args.budget:
+        print(f"FAIL: {total:.2f} ms over the {args.budget} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=0, help="max total ms (0: no limit)")
+    parser.add_argument("--top", type=int, default=10, help="slowest vendored modules listed")
+    parser.add_argument("modules", nargs="*", default=MODULES, help="integration modules to import")
+    sys.exit(main(parser.parse_args()))
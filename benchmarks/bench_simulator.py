@@ -0,0 +1,133 @@
+"""Compare the simulator datastores for simulating many Epever slaves.
+
+Builds the Epever simulator's per-slave stores (see epever_simulator.py)
+with each datastore and serves the integration's planned block reads of
+every slave straight from them, without network or server:
+
+    cells   ModbusSimulatorContext, a Cell object per register
+    arrays  ModbusArraySimulatorContext clones, values and flags in typed arrays
+
+For each store and slave count it reports the build time, the memory the
+stores take, the block reads served per second (actions included) and the
+datastore time of one slave's refresh. Server, framing and network time
+come on top, see bench_coordinator.py.
+
+    python benchmarks/bench_simulator.py --slaves 1 50 200
+    python benchmarks/bench_simulator.py --stores arrays --slaves 500
+
+With both stores, they are then compared on block reads shifted around the
+planned ones: same exceptions, same values for the registers without an
+action.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from _common import load
+from epever_simulator import PROFILE, STORES, build_stores
+
+planner = load("planner")
+
+FUNCTION_CODES = {"holding": 3, "input": 4}
+
+
+def planned_reads(profile: dict) -> list[tuple[int, int, int]]:
+    """(function code, address, count) of every block read of one refresh."""
+    tiers = {}
+    for sensor in profile["sensors"]:
+        tiers.setdefault(planner.sensor_tier(sensor), []).append(sensor)
+    return [
+        (FUNCTION_CODES[block.reg_type], block.start, block.count)
+        for sensors in tiers.values()
+        for block in planner.plan_reads(sensors)
+    ]
+
+
+def build(store: str, slaves: int, unreadable: tuple[int, ...]) -> tuple[list, float, int]:
+    """(stores, build seconds, bytes allocated)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        stores = build_stores(slaves, unreadable, store)
+        elapsed = time.perf_counter() - start
+        size, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return stores, elapsed, size
+
+
+def reads_per_second(stores: list, reads: list, seconds: float) -> float:
+    """Block reads served per second, polling the slaves round robin."""
+    served = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        for store in stores:
+            for func_code, address, count in reads:
+                store.getValues(func_code, address, count)
+            served += len(reads)
+    return served / elapsed
+
+
+def static_addresses(store) -> set[int]:
+    """Addresses no action writes to (a 32-bit action writes both words)."""
+    if hasattr(store, "actions"):
+        changing = {inx + word for table in store.actions for inx in table.indices for word in (0, 1)}
+    else:
+        changing = {inx + word for inx, reg in enumerate(store.registers) if reg.action for word in (0, 1)}
+    return set(range(store.register_count)) - changing
+
+
+def check(reads: list, unreadable: tuple[int, ...]) -> int:
+    """Compare both stores on shifted block reads; returns the mismatches."""
+    cells, arrays = (build_stores(1, unreadable, store)[0] for store in STORES[::-1])
+    static = static_addresses(arrays)
+    rng = random.Random(0)
+    mismatches = 0
+    for func_code, address, count in reads:
+        for _ in range(16):
+            start = address + rng.randint(-2, 2)
+            expected = cells.getValues(func_code, start, count)
+            got = arrays.getValues(func_code, start, count)
+            if isinstance(expected, list) and isinstance(got, list):
+                expected = [v for i, v in enumerate(expected, start) if i in static]
+                got = [v for i, v in enumerate(got, start) if i in static]
+            if expected != got:
+                mismatches += 1
+    return mismatches
+
+
+def main(args) -> int:
+    reads = planned_reads(PROFILE)
+    unreadable = tuple(args.unreadable)
+    print(f"{len(reads)} block reads per refresh and slave, {sum(r[2] for r in reads)} registers")
+    print(f"  {'store':<7} {'slaves':>6} {'build s':>8} {'MB':>8} {'reads/s':>9} {'us/refresh':>11}")
+
+    for store in args.stores:
+        for slaves in args.slaves:
+            stores, elapsed, size = build(store, slaves, unreadable)
+            rate = reads_per_second(stores, reads, args.time)
+            refresh = len(reads) / rate * 1e6
+            print(f"  {store:<7} {slaves:6d} {elapsed:8.2f} {size / 1e6:8.1f} {rate:9.0f} {refresh:11.1f}")
+            del stores
+
+    if set(STORES) <= set(args.stores):
+        mismatches = check(reads, unreadable)
+        print("stores agree" if not mismatches else f"FAIL: {mismatches} reads differ")
+        return 1 if mismatches else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stores", nargs="+", choices=STORES, default=list(STORES[::-1]))
+    parser.add_argument("--slaves", type=int, nargs="+", default=[1, 50, 200])
+    parser.add_argument("--time", type=float, default=1.0, help="seconds of reads per measurement")
+    parser.add_argument("--unreadable", type=lambda v: int(v, 0), nargs="*", default=[],
+                        help="addresses answered with exception 02, e.g. 0x311B")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,403 @@
+"""Epever Tracer simulator: a Modbus TCP server for offline load tests.
+
+Serves the full const.py register map of the Tracer profile, for any number
+of slave ids, from the vendored ModbusArraySimulatorContext (one register
+layout shared by every slave, values in typed arrays; ``--store cells``
+uses the Cell based ModbusSimulatorContext instead). Rated values are
+fixed, real-time values wander within realistic ranges and the energy
+counters count up, so block reads and decoding see plausible data. The
+battery / charging settings are writable holding registers.
+
+Bus conditions are simulated per request: latency (+/- jitter) spent on a
+shared RS485 bus (one request at a time, like a real gateway), a drop rate
+(no response at all) and the device's maximum registers per request.
+
+    python benchmarks/epever_simulator.py --port 5020 --slaves 10 --latency 0.03
+    python benchmarks/epever_simulator.py --port 5020 --slaves 200 --parallel-bus
+
+Library use (e.g. from a benchmark, over the pymodbus null modem)::
+
+    server = await start_simulator(NULLMODEM_HOST, 5020, slaves=10)
+    ...
+    await server.shutdown()
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+from dataclasses import dataclass
+
+from _common import load
+
+from epever_modbus.vendor.pymodbus.constants import ExcCodes
+from epever_modbus.vendor.pymodbus.datastore import (
+    ModbusArraySimulatorContext,
+    ModbusBaseDeviceContext,
+    ModbusServerContext,
+    ModbusSimulatorContext,
+)
+from epever_modbus.vendor.pymodbus.exceptions import NoSuchIdException
+from epever_modbus.vendor.pymodbus.server import ModbusTcpServer
+
+const = load("const")
+planner = load("planner")
+
+PROFILE = const.DEVICE_TYPES["epever_tracer"]
+
+# Register ranges served (holes inside them read as 0, like the real device)
+RANGES = [
+    (0x3000, 0x3020), (0x3100, 0x3120), (0x3200, 0x3203), (0x3300, 0x3320),
+    (0x9000, 0x900F), (0x906B, 0x9071),
+]
+
+# key -> (initial value, action, action parameters)
+#   wander:  random walk between minval and maxval in steps of up to `step`
+#   counter: grows by up to `step` per read (energy counters)
+BEHAVIOUR = {
+    # Rated values (fixed)
+    "array_rated_voltage_raw":   (10000, None, None),
+    "array_rated_current_raw":   (4000, None, None),
+    "array_rated_power_raw":     (104000, None, None),
+    "battery_rated_voltage_raw": (2400, None, None),
+    "battery_rated_current_raw": (4000, None, None),
+    "battery_rated_power_raw":   (104000, None, None),
+    "charging_mode_raw":         (2, None, None),
+    "rated_load_current_raw":    (2000, None, None),
+
+    # Real-time values
+    "pv_voltage_raw":          (3600, "wander", {"minval": 0, "maxval": 10000, "step": 40}),
+    "pv_current_raw":          (500, "wander", {"minval": 0, "maxval": 4000, "step": 25}),
+    "pv_power_raw":            (18000, "wander", {"minval": 0, "maxval": 104000, "step": 600}),
+    "charging_voltage_raw":    (1320, "wander", {"minval": 1150, "maxval": 1460, "step": 3}),
+    "charging_current_raw":    (1300, "wander", {"minval": 0, "maxval": 4000, "step": 25}),
+    "charging_power_raw":      (17000, "wander", {"minval": 0, "maxval": 60000, "step": 400}),
+    "load_voltage_raw":        (1320, "wander", {"minval": 1150, "maxval": 1460, "step": 3}),
+    "load_current_raw":        (120, "wander", {"minval": 0, "maxval": 2000, "step": 10}),
+    "load_power_raw":          (1580, "wander", {"minval": 0, "maxval": 26000, "step": 120}),
+    "battery_temp_raw":        (2500, "wander", {"minval": 500, "maxval": 4500, "step": 5}),
+    "device_temp_raw":         (3100, "wander", {"minval": 1000, "maxval": 6000, "step": 5}),
+    "component_temp_raw":      (3300, "wander", {"minval": 1000, "maxval": 7000, "step": 5}),
+    "battery_soc_raw":         (76, "wander", {"minval": 10, "maxval": 100, "step": 1}),
+    "remote_temp_raw":         (2500, "wander", {"minval": 500, "maxval": 4500, "step": 5}),
+    "remote_real_voltage_raw": (1320, "wander", {"minval": 1150, "maxval": 1460, "step": 3}),
+    "battery_status_raw":      (0, None, None),
+    "charger_status_raw":      (0x0009, None, None),
+    "battery_voltage_raw":     (1318, "wander", {"minval": 1150, "maxval": 1460, "step": 3}),
+    "battery_current_raw":     (1180, "wander", {"minval": 0, "maxval": 4000, "step": 25}),
+
+    # Statistics
+    "max_pv_today_raw":    (4120, None, None),
+    "min_pv_today_raw":    (12, None, None),
+    "max_batt_today_raw":  (1441, None, None),
+    "min_batt_today_raw":  (1236, None, None),
+    "consumed_today_raw":  (41, "counter", {"step": 1}),
+    "consumed_month_raw":  (1480, "counter", {"step": 1}),
+    "consumed_year_raw":   (1750, "counter", {"step": 1}),
+    "consumed_total_raw":  (5210, "counter", {"step": 1}),
+    "generated_today_raw": (96, "counter", {"step": 2}),
+    "generated_month_raw": (2870, "counter", {"step": 2}),
+    "generated_year_raw":  (3120, "counter", {"step": 2}),
+    "generated_total_raw": (9640, "counter", {"step": 2}),
+    "co2_raw":             (96, "counter", {"step": 1}),
+}
+
+# Battery / charging parameters (writable holding registers): key -> raw value
+SETTINGS = {
+    "battery_type": 1,
+    "battery_capacity": 200,
+    "temperature_compensation": 300,
+    "high_voltage_disconnect": 1600,
+    "charging_limit_voltage": 1500,
+    "over_voltage_reconnect": 1500,
+    "equalization_voltage": 1460,
+    "boost_voltage": 1440,
+    "float_voltage": 1380,
+    "boost_reconnect_voltage": 1320,
+    "low_voltage_reconnect": 1260,
+    "under_voltage_recover": 1220,
+    "under_voltage_warning": 1200,
+    "low_voltage_disconnect": 1110,
+    "discharging_limit_voltage": 1060,
+    "equalize_duration": 120,
+    "boost_duration": 120,
+    "discharging_percentage": 30,
+    "charging_percentage": 100,
+    "battery_management_mode": 0,
+}
+
+
+# ============================================================
+#  CELL ACTIONS
+# ============================================================
+# Epever stores 32-bit values low word first; the simulator's own uint32
+# type is high word first, so 32-bit sensors are two uint16 cells and the
+# action on the low cell updates both ("words": 2).
+
+def _get(registers, inx, words):
+    if words == 2:
+        return registers[inx].value | (registers[inx + 1].value << 16)
+    return registers[inx].value
+
+
+def _set(registers, inx, words, value):
+    registers[inx].value = value & 0xFFFF
+    if words == 2:
+        registers[inx + 1].value = (value >> 16) & 0xFFFF
+
+
+def action_wander(registers, inx, _cell, minval=0, maxval=0xFFFF, step=1, words=1):
+    """Random walk within [minval, maxval]."""
+    value = _get(registers, inx, words) + random.randint(-step, step)
+    _set(registers, inx, words, min(max(value, minval), maxval))
+
+
+def action_counter(registers, inx, _cell, step=1, words=1):
+    """Monotonic counter (wraps like the device's registers)."""
+    _set(registers, inx, words, _get(registers, inx, words) + random.randint(0, step))
+
+
+ACTIONS = {"wander": action_wander, "counter": action_counter}
+
+
+# Batch versions for ModbusArraySimulatorContext: one call per read with the
+# indices of the read's registers having the action and their parameters.
+# The loop body is inlined (no helper call per register, comparisons instead
+# of min/max): the actions are most of the array store's time per read.
+
+def batch_wander(values, indices, _types, minval=0, maxval=0xFFFF, step=1, words=1):
+    """action_wander over a batch of registers."""
+    uniform = random.random
+    for inx, low, high, size, width in zip(indices, minval, maxval, step, words):
+        value = values[inx] + int(uniform() * (2 * size + 1)) - size
+        if width == 2:
+            value += values[inx + 1] << 16
+        value = low if value < low else high if value > high else value
+        values[inx] = value & 0xFFFF
+        if width == 2:
+            values[inx + 1] = (value >> 16) & 0xFFFF
+
+
+def batch_counter(values, indices, _types, step=1, words=1):
+    """action_counter over a batch of registers."""
+    uniform = random.random
+    for inx, size, width in zip(indices, step, words):
+        value = values[inx] + int(uniform() * (size + 1))
+        if width == 2:
+            value += values[inx + 1] << 16
+            values[inx + 1] = (value >> 16) & 0xFFFF
+        values[inx] = value & 0xFFFF
+
+
+BATCH_ACTIONS = {"wander": batch_wander, "counter": batch_counter}
+
+
+def tracer_config(profile: dict = PROFILE, unreadable: tuple[int, ...] = ()) -> dict:
+    """Simulator context config serving every register of the profile.
+
+    Reads touching an `unreadable` address get exception 02 (illegal data
+    address), like registers missing from older Tracer firmwares.
+    """
+    cells = {}
+    for start, end in RANGES:
+        for address in range(start, end):
+            cells[address] = {"addr": [address, address], "value": 0}
+
+    for sensor in profile["sensors"]:
+        value, action, parameters = BEHAVIOUR.get(sensor["key"], (0, None, None))
+        words = planner.sensor_length(sensor)
+        address = sensor["register"]
+        low = {"addr": [address, address], "value": value & 0xFFFF}
+        if action:
+            low["action"] = action
+            low["parameters"] = {**parameters, "words": words}
+        cells[address] = low
+        if words == 2:
+            cells[address + 1] = {"addr": [address + 1, address + 1], "value": (value >> 16) & 0xFFFF}
+
+    writable = []
+    for setting in profile.get("settings", []):
+        address = setting["register"]
+        cells[address] = {"addr": [address, address], "value": SETTINGS.get(setting["key"], 0)}
+        writable.append([address, address])
+
+    size = max(cells) + 1
+    return {
+        "setup": {
+            "co size": 0,
+            "di size": 0,
+            "hr size": size,
+            "ir size": size,
+            "shared blocks": True,
+            "type exception": False,
+            "defaults": {
+                "value": {"bits": 0, "uint16": 0, "uint32": 0, "float32": 0.0, "string": " "},
+                "action": {"bits": None, "uint16": None, "uint32": None, "float32": None, "string": None},
+            },
+        },
+        "invalid": [],
+        "write": [entry for entry in writable if entry[0] not in unreadable],
+        "bits": [],
+        # Cells left undefined are invalid (the "invalid" section would be
+        # overridden by the type sections)
+        "uint16": [cells[address] for address in sorted(cells) if address not in unreadable],
+        "uint32": [],
+        "float32": [],
+        "string": [],
+        "repeat": [],
+    }
+
+
+# ============================================================
+#  BUS CONDITIONS
+# ============================================================
+
+@dataclass
+class BusConditions:
+    """Per-request behaviour of the simulated gateway + RS485 bus."""
+
+    latency: float = 0.0        # seconds on the bus per request
+    jitter: float = 0.0         # +/- seconds added to latency
+    drop_rate: float = 0.0      # fraction of requests never answered
+    max_registers: int = 125    # larger reads get ILLEGAL_VALUE
+    serial_bus: bool = True     # one request on the bus at a time
+    unreadable: tuple[int, ...] = ()  # addresses answered with exception 02
+
+
+class SimulatedDevice(ModbusBaseDeviceContext):
+    """One Epever slave behind the simulated gateway."""
+
+    def __init__(self, store: ModbusBaseDeviceContext, conditions: BusConditions, bus: asyncio.Lock):
+        self.store = store
+        self.conditions = conditions
+        self.bus = bus
+
+    async def _on_bus(self):
+        conditions = self.conditions
+        if conditions.drop_rate and random.random() < conditions.drop_rate:
+            # The request handler doesn't answer unknown ids when
+            # ignore_missing_devices is set: the client sees a timeout
+            raise NoSuchIdException("simulated drop")
+        delay = conditions.latency + random.uniform(-conditions.jitter, conditions.jitter)
+        if delay <= 0:
+            return
+        if conditions.serial_bus:
+            async with self.bus:
+                await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(delay)
+
+    async def async_getValues(self, func_code, address, count=1):
+        await self._on_bus()
+        if count > self.conditions.max_registers:
+            return ExcCodes.ILLEGAL_VALUE
+        return self.store.getValues(func_code, address, count)
+
+    async def async_setValues(self, func_code, address, values):
+        await self._on_bus()
+        if len(values) > self.conditions.max_registers:
+            return ExcCodes.ILLEGAL_VALUE
+        return self.store.setValues(func_code, address, values)
+
+    def getValues(self, func_code, address, count=1):
+        return self.store.getValues(func_code, address, count)
+
+    def setValues(self, func_code, address, values):
+        return self.store.setValues(func_code, address, values)
+
+
+STORES = ("arrays", "cells")
+
+
+def build_stores(slaves: int, unreadable: tuple[int, ...] = (), store: str = "arrays") -> list:
+    """One simulator context per slave.
+
+    "arrays": ModbusArraySimulatorContext clones of one parsed layout;
+    "cells": a ModbusSimulatorContext parsed per slave (a Cell object per
+    register), as before.
+    """
+    if store == "cells":
+        return [
+            ModbusSimulatorContext(tracer_config(unreadable=unreadable), ACTIONS)
+            for _ in range(slaves)
+        ]
+    layout = ModbusArraySimulatorContext(tracer_config(unreadable=unreadable), BATCH_ACTIONS)
+    return [layout.clone() for _ in range(slaves)]
+
+
+def build_context(slaves: int, conditions: BusConditions, store: str = "arrays") -> ModbusServerContext:
+    """Server context with slave ids 1..slaves, all on one simulated bus."""
+    bus = asyncio.Lock()
+    stores = build_stores(slaves, conditions.unreadable, store)
+    return ModbusServerContext(
+        devices={
+            slave: SimulatedDevice(device, conditions, bus)
+            for slave, device in enumerate(stores, 1)
+        },
+        single=False,
+    )
+
+
+async def start_simulator(
+    host: str,
+    port: int,
+    slaves: int = 1,
+    conditions: BusConditions | None = None,
+    store: str = "arrays",
+    **server_kwargs,
+) -> ModbusTcpServer:
+    """Start a simulated gateway in the background and return the server."""
+    server = ModbusTcpServer(
+        build_context(slaves, conditions or BusConditions(), store),
+        address=(host, port),
+        ignore_missing_devices=True,
+        **server_kwargs,
+    )
+    await server.serve_forever(background=True)
+    return server
+
+
+def add_condition_arguments(parser: argparse.ArgumentParser):
+    """Command line options shared by the simulator and the benchmarks."""
+    parser.add_argument("--slaves", type=int, default=1, help="slave ids 1..N")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds per request")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of unanswered requests")
+    parser.add_argument("--max-registers", type=int, default=125, help="max registers per request")
+    parser.add_argument("--parallel-bus", action="store_true", help="don't serialise requests on the bus")
+    parser.add_argument("--unreadable", type=lambda v: int(v, 0), nargs="*", default=[],
+                        help="addresses answered with exception 02, e.g. 0x311B 0x311D")
+    parser.add_argument("--store", choices=STORES, default="arrays", help="simulator datastore")
+
+
+def conditions_from_args(args) -> BusConditions:
+    return BusConditions(
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+        max_registers=args.max_registers,
+        serial_bus=not args.parallel_bus,
+        unreadable=tuple(args.unreadable),
+    )
+
+
+async def main(args) -> None:
+    server = await start_simulator(
+        args.host, args.port, slaves=args.slaves, conditions=conditions_from_args(args), store=args.store
+    )
+    print(f"Epever Tracer simulator on {args.host}:{args.port}, slaves 1-{args.slaves}")
+    try:
+        await server.serving
+    finally:
+        await server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    add_condition_arguments(parser)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,175 @@
+"""Replay a recorded packet trace as a Modbus TCP gateway.
+
+Traces are recorded from a live installation with the
+``epever_modbus.record_trace`` service (or ``bench_coordinator.py --record``).
+The replay gateway answers each request with a response recorded for the
+same unit id + PDU (taken in recorded order, wrapping around), with the
+transaction id patched in. In real time mode every response is delayed by
+its recorded round trip and requests that timed out in the field get no
+answer again; ``--fast`` answers everything at once, which isolates the
+client side CPU cost (decoding, scheduling) from the bus.
+
+Requests that are not in the trace are answered with exception 0x0B
+(gateway target failed to respond).
+
+    python benchmarks/replay.py trace.eptrace --port 5020
+    python benchmarks/bench_coordinator.py --replay trace.eptrace --fast
+
+Library use, e.g. over the pymodbus null modem::
+
+    server = await start_replay(NULLMODEM_HOST, 5020, "trace.eptrace")
+    ...
+    server.close()
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+from collections import defaultdict
+from pathlib import Path
+
+from _common import load
+
+from epever_modbus.vendor.pymodbus.transport import CommParams, CommType, ModbusProtocol
+
+packet_trace = load("packet_trace")
+
+# MBAP header + unit id + function code
+_HEADER = 8
+
+
+class ReplayResponder:
+    """Recorded responses keyed by request (unit id + PDU)."""
+
+    def __init__(self, exchanges: list, realtime: bool = True):
+        self.realtime = realtime
+        self._exchanges: dict[bytes, list] = defaultdict(list)
+        for exchange in exchanges:
+            self._exchanges[exchange.key].append(exchange)
+        self._next: dict[bytes, int] = defaultdict(int)
+        self.answered = 0
+        self.unanswered = 0
+        self.unknown = 0
+
+    @property
+    def units(self) -> list[int]:
+        """Unit ids the trace has requests for."""
+        return sorted({key[0] for key in self._exchanges})
+
+    def answer(self, request: bytes) -> tuple[bytes | None, float]:
+        """(response frame or None for no answer, delay in seconds) for a request frame."""
+        key = request[6:]
+        recorded = self._exchanges.get(key)
+        if not recorded:
+            self.unknown += 1
+            # Exception 0x0B: gateway target device failed to respond
+            return request[:4] + b"\x00\x03" + bytes([request[6], request[7] | 0x80, 0x0B]), 0.0
+
+        index = self._next[key]
+        self._next[key] = (index + 1) % len(recorded)
+        exchange = recorded[index]
+        if exchange.response is None:
+            if self.realtime:
+                self.unanswered += 1
+                return None, 0.0
+            # Fast replay: don't wait for a timeout, use any answered exchange
+            exchange = next((e for e in recorded if e.response is not None), None)
+            if exchange is None:
+                self.unanswered += 1
+                return None, 0.0
+
+        self.answered += 1
+        response = request[:2] + exchange.response[2:]
+        return response, exchange.latency if self.realtime else 0.0
+
+
+class ReplayProtocol(ModbusProtocol):
+    """Listener / connection answering from a ReplayResponder."""
+
+    def __init__(self, params: CommParams, responder: ReplayResponder):
+        super().__init__(params, is_server=True)
+        self.responder = responder
+
+    def callback_new_connection(self) -> ModbusProtocol:
+        return ReplayProtocol(self.comm_params, self.responder)
+
+    def callback_connected(self) -> None:
+        pass
+
+    def callback_disconnected(self, exc: Exception | None) -> None:
+        pass
+
+    def callback_data(self, data: bytes, addr: tuple | None = None) -> int:
+        used = 0
+        while len(data) - used >= _HEADER:
+            size = 6 + int.from_bytes(data[used + 4:used + 6], "big")
+            if len(data) - used < size:
+                break
+            response, delay = self.responder.answer(bytes(data[used:used + size]))
+            used += size
+            if response is None:
+                continue
+            if delay > 0:
+                self.loop.call_later(delay, self._write, response)
+            else:
+                self._write(response)
+        return used
+
+    def _write(self, response: bytes):
+        # transport.write, not send(): send() drops partially received requests
+        if self.transport:
+            self.transport.write(response)
+
+
+async def start_replay(host: str, port: int, path: str | Path, realtime: bool = True) -> ReplayProtocol:
+    """Serve a trace file on host:port; close() the returned listener to stop."""
+    records = packet_trace.read_trace(Path(path).read_bytes())
+    responder = ReplayResponder(packet_trace.exchanges(records), realtime)
+    server = ReplayProtocol(
+        CommParams(comm_name="replay", comm_type=CommType.TCP, source_address=(host, port)),
+        responder,
+    )
+    if not await server.listen():
+        raise OSError(f"Cannot listen on {host}:{port}")
+    return server
+
+
+def summary(path: str | Path) -> str:
+    """One-paragraph description of a trace file."""
+    records = packet_trace.read_trace(Path(path).read_bytes())
+    exchanges = packet_trace.exchanges(records)
+    latencies = [e.latency for e in exchanges if e.latency is not None]
+    units = sorted({e.request[6] for e in exchanges})
+    lines = [
+        f"{path}: {records[-1].time if records else 0:.1f} s, {len(exchanges)} requests, "
+        f"{len(exchanges) - len(latencies)} unanswered, units {units}",
+    ]
+    if latencies:
+        lines.append(
+            f"  round trip  mean {statistics.mean(latencies) * 1000:.1f} ms  "
+            f"max {max(latencies) * 1000:.1f} ms"
+        )
+    return "\n".join(lines)
+
+
+async def main(args) -> None:
+    print(summary(args.trace))
+    server = await start_replay(args.host, args.port, args.trace, realtime=not args.fast)
+    print(f"Replaying on {args.host}:{args.port} ({'fast' if args.fast else 'real time'}), Ctrl+C to stop")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", help="trace file (.eptrace)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--fast", action="store_true", help="answer without the recorded delays")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import logging
+
+from .const import (
+    BREAKER_CLOSED,
+    BREAKER_HALF_OPEN,
+    BREAKER_OPEN,
+    BREAKER_PROBE_BASE,
+    BREAKER_PROBE_MAX,
+    BREAKER_THRESHOLD,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Fast-fail guard for one device.
+
+    closed:    refreshes poll normally; consecutive failed refreshes are counted
+    open:      refreshes are skipped without touching the bus until the next probe
+    half_open: one probe read decides between closed and open again, with the
+               delay to the next probe doubled each time it fails
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int = BREAKER_THRESHOLD,
+        probe_base: float = BREAKER_PROBE_BASE,
+        probe_max: float = BREAKER_PROBE_MAX,
+    ):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.probe_base = probe_base
+        self.probe_max = probe_max
+
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.next_probe: float | None = None
+        self._probe_delay = probe_base
+
+    def allow(self, now: float) -> bool:
+        """Whether a refresh may use the bus; moves open to half_open when a probe is due."""
+        if self.state == BREAKER_OPEN:
+            if now < self.next_probe:
+                return False
+            self.state = BREAKER_HALF_OPEN
+        return True
+
+    def record_success(self):
+        """A refresh (or probe) got an answer from the device."""
+        if self.state != BREAKER_CLOSED:
+            _LOGGER.info("%s: device answers again, resuming polling", self.name)
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.next_probe = None
+        self._probe_delay = self.probe_base
+
+    def record_failure(self, now: float):
+        """A refresh (or probe) got no answer at all."""
+        self.failures += 1
+        if self.state == BREAKER_HALF_OPEN:
+            self._probe_delay = min(self._probe_delay * 2, self.probe_max)
+        elif self.failures < self.threshold:
+            return
+        else:
+            self.trips += 1
+            _LOGGER.warning(
+                "%s: no answer in %d refreshes, skipping it until a probe succeeds",
+                self.name, self.failures
+            )
+
+        self.state = BREAKER_OPEN
+        self.next_probe = now + self._probe_delay
+
+    def as_dict(self, now: float | None = None) -> dict:
+        """Snapshot for the diagnostic entity and diagnostics."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "next_probe_in": (
+                round(max(0.0, self.next_probe - now), 1)
+                if now is not None and self.next_probe is not None
+                else None
+            ),
+        }
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import logging
+import time
+from array import array
+
+from .const import (
+    CAPTURE_BUFFER_SAMPLES,
+    CAPTURE_MAX_DURATION,
+    DEFAULT_MAX_GAP,
+    DEFAULT_MAX_REGISTERS,
+    MIN_CAPTURE_INTERVAL,
+)
+from .decoder import BlockDecoder
+from .planner import plan_reads
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# ============================================================
+#  RING BUFFER
+# ============================================================
+
+class CaptureBuffer:
+    """
+    Fixed-size ring of samples: a timestamp and one raw value per column.
+
+    Every column is a typed array allocated once at full size, so a sample
+    costs a few index assignments and memory doesn't grow with the capture
+    length; past `size` samples the oldest are overwritten.
+    """
+
+    def __init__(self, keys: list[str], size: int = CAPTURE_BUFFER_SAMPLES):
+        self.keys = keys
+        self.size = size
+        self.timestamps = array("d", bytes(8 * size))
+        self.columns = [array("q", bytes(8 * size)) for _key in keys]
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    @property
+    def overwritten(self) -> int:
+        """Samples lost to the ring wrapping around."""
+        return max(0, self.count - self.size)
+
+    def clear(self):
+        self.count = 0
+
+    def append(self, timestamp: float, values, columns: range | list[int] | None = None):
+        """Store a sample's values (into `columns`, default all) at the write position."""
+        index = self.count % self.size
+        self.timestamps[index] = timestamp
+        for column, value in zip(columns or range(len(self.columns)), values):
+            self.columns[column][index] = value
+
+    def commit(self):
+        """Advance the write position once every column of the sample is stored."""
+        self.count += 1
+
+    def _ordered(self, column: array) -> array:
+        """A column's samples, oldest first."""
+        if self.count <= self.size:
+            return column[:self.count]
+        split = self.count % self.size
+        return column[split:] + column[:split]
+
+    def as_dict(self, scales: list[float] | None = None) -> dict:
+        """Samples as {"timestamp": [...], key: [...]} lists, values scaled."""
+        scales = scales or [1] * len(self.keys)
+        result = {"timestamp": self._ordered(self.timestamps).tolist()}
+        for key, column, scale in zip(self.keys, self.columns, scales):
+            values = self._ordered(column)
+            result[key] = values.tolist() if scale == 1 else [round(v * scale, 6) for v in values]
+        return result
+
+    def write_csv(self, path: str, scales: list[float] | None = None):
+        """Write the samples to a CSV file (blocking)."""
+        data = self.as_dict(scales)
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(data.keys())
+            writer.writerows(zip(*data.values()))
+
+
+# ============================================================
+#  BURST CAPTURE
+# ============================================================
+
+class BurstCapture:
+    """
+    High-rate capture of the profile's "capture" registers for one device.
+
+    Only the block(s) holding those registers are read, at a fixed rate,
+    straight into a CaptureBuffer: no data dict, no entity or recorder
+    update per sample. Reads go through the device's client, taking fair
+    turns with the normal polling on the gateway.
+    """
+
+    def __init__(self, client, profile: dict, size: int = CAPTURE_BUFFER_SAMPLES):
+        self.client = client
+        self.columns = profile.get("capture", [])
+        sensors = {s["key"]: s for s in profile["sensors"]}
+        blocks = plan_reads(
+            [sensors[column["sensor"]] for column in self.columns],
+            max_gap=profile.get("max_gap", DEFAULT_MAX_GAP),
+            max_registers=profile.get("max_registers", DEFAULT_MAX_REGISTERS),
+        )
+        positions = {column["sensor"]: i for i, column in enumerate(self.columns)}
+        # (decoder, buffer column of each decoded value)
+        self.reads = [
+            (decoder, [positions[key] for key in decoder.keys])
+            for decoder in map(BlockDecoder, blocks)
+        ]
+        self.scales = [column.get("scale", 1) for column in self.columns]
+        self.buffer = CaptureBuffer([column["key"] for column in self.columns], size)
+        self.missed = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def run(self, duration: float, interval: float) -> CaptureBuffer:
+        """Capture for `duration` seconds, one sample every `interval` seconds."""
+        if not self.columns:
+            raise ValueError("This device type has no capture registers")
+        if self.running:
+            raise ValueError("A capture is already running")
+        duration = min(duration, CAPTURE_MAX_DURATION)
+        interval = max(interval, MIN_CAPTURE_INTERVAL)
+
+        async with self._lock:
+            self.buffer.clear()
+            self.missed = 0
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            due = started
+            while due - started < duration:
+                await self._sample()
+                # Fixed schedule: a slow read delays one sample, not all later ones
+                due += interval
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    due = loop.time()
+
+        _LOGGER.debug(
+            "Capture done: %d samples, %d missed, %d overwritten",
+            self.buffer.count, self.missed, self.buffer.overwritten
+        )
+        return self.buffer
+
+    async def _sample(self):
+        timestamp = time.time()
+        for decoder, columns in self.reads:
+            block = decoder.block
+            registers, _exception_code = await self.client.read_block(block.start, block.count, block.reg_type)
+            if registers is None:
+                self.missed += 1
+                return
+            self.buffer.append(timestamp, decoder.unpack(registers), columns)
+        self.buffer.commit()
+
+    def result(self) -> dict:
+        """The last capture's samples (scaled) and counters."""
+        return {
+            "units": {column["key"]: column.get("unit") for column in self.columns},
+            "samples": len(self.buffer),
+            "missed": self.missed,
+            "overwritten": self.buffer.overwritten,
+            "data": self.buffer.as_dict(self.scales),
+        }
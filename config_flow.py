@@ -2,9 +2,28 @@ from __future__ import annotations
 
 import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .const import DOMAIN, DEVICE_TYPES
+from .const import (
+    DOMAIN,
+    DEVICE_TYPES,
+    CONF_PIPELINE_WINDOW,
+    DEFAULT_PIPELINE_WINDOW,
+    MAX_PIPELINE_WINDOW,
+    CONF_MIN_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    CONF_NIGHT_INTERVAL,
+    DEFAULT_NIGHT_INTERVAL,
+    MAX_POLL_INTERVAL,
+    CONF_PROXY_PORT,
+    DEFAULT_PROXY_PORT,
+    CONF_PROXY_MAX_AGE,
+    DEFAULT_PROXY_MAX_AGE,
+)
+from .discovery import DiscoveredDevice, scan_gateway
 
 
 class EpeverModbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -17,9 +36,16 @@ class EpeverModbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self._port: int | None = None
         self._slave: int | None = None
         self._name: str | None = None
+        self._discovered: list[DiscoveredDevice] = []
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow for tuning an existing entry."""
+        return EpeverModbusOptionsFlow()
 
     async def async_step_user(self, user_input=None) -> FlowResult:
-        """Step 1 – host, port, slave, name."""
+        """Step 1 – host, port, slave, name (or scan the gateway for slaves)."""
         errors = {}
 
         if user_input is not None:
@@ -28,15 +54,34 @@ class EpeverModbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             self._slave = user_input["slave"]
             self._name = user_input["name"]
 
-            # you could add basic validation here later
-            return await self.async_step_device_type()
-
+            if not user_input.get("scan"):
+                return await self.async_step_device_type()
+
+            try:
+                found = await scan_gateway(self._host, self._port)
+            except ConnectionError:
+                errors["base"] = "cannot_connect"
+            else:
+                # Hide slaves already set up on this gateway
+                configured = {
+                    entry.data["slave"]
+                    for entry in self._async_current_entries()
+                    if entry.data.get("host") == self._host and entry.data.get("port") == self._port
+                }
+                self._discovered = [d for d in found if d.slave not in configured]
+                if self._discovered:
+                    return await self.async_step_discovered()
+                errors["base"] = "no_devices_found"
+
+        defaults = user_input or {}
         schema = vol.Schema(
             {
-                vol.Required("host"): str,
-                vol.Required("port", default=502): int,
-                vol.Required("slave", default=1): int,
-                vol.Required("name"): str,
+                vol.Required("host", default=defaults.get("host", vol.UNDEFINED)): str,
+                vol.Required("port", default=defaults.get("port", 502)): int,
+                vol.Required("slave", default=defaults.get("slave", 1)): int,
+                vol.Required("name", default=defaults.get("name", vol.UNDEFINED)): str,
+                # Find responding slave ids instead of trusting `slave`
+                vol.Required("scan", default=defaults.get("scan", True)): bool,
             }
         )
 
@@ -46,6 +91,25 @@ class EpeverModbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors,
         )
 
+    async def async_step_discovered(self, user_input=None) -> FlowResult:
+        """Step 1b – pick one of the slaves found by the scan."""
+
+        if user_input is not None:
+            self._slave = user_input["slave"]
+            return await self.async_step_device_type()
+
+        choices = {device.slave: device.label for device in self._discovered}
+        schema = vol.Schema(
+            {
+                vol.Required("slave", default=self._discovered[0].slave): vol.In(choices),
+            }
+        )
+
+        return self.async_show_form(
+            step_id="discovered",
+            data_schema=schema,
+        )
+
     async def async_step_device_type(self, user_input=None) -> FlowResult:
         """Step 2 – pick device type (smart battery etc)."""
 
@@ -74,3 +138,57 @@ class EpeverModbusConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="device_type",
             data_schema=schema,
         )
+
+
+class EpeverModbusOptionsFlow(config_entries.OptionsFlow):
+    """Handle Epever Modbus options (connection tuning)."""
+
+    async def async_step_init(self, user_input=None) -> FlowResult:
+        """Single step – pipelining, poll interval bounds and proxy."""
+        errors = {}
+
+        if user_input is not None:
+            if user_input[CONF_MIN_INTERVAL] > user_input[CONF_MAX_INTERVAL]:
+                errors[CONF_MAX_INTERVAL] = "max_below_min"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = {**self.config_entry.options, **(user_input or {})}
+        interval = vol.All(int, vol.Range(min=1, max=MAX_POLL_INTERVAL))
+
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_PIPELINE_WINDOW,
+                    default=options.get(CONF_PIPELINE_WINDOW, DEFAULT_PIPELINE_WINDOW),
+                ): vol.All(int, vol.Range(min=1, max=MAX_PIPELINE_WINDOW)),
+                vol.Required(
+                    CONF_MIN_INTERVAL,
+                    default=options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+                ): interval,
+                vol.Required(
+                    CONF_MAX_INTERVAL,
+                    default=options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+                ): interval,
+                # 0 disables night mode
+                vol.Required(
+                    CONF_NIGHT_INTERVAL,
+                    default=options.get(CONF_NIGHT_INTERVAL, DEFAULT_NIGHT_INTERVAL),
+                ): vol.All(int, vol.Range(min=0, max=MAX_POLL_INTERVAL)),
+                # 0 disables the proxy
+                vol.Required(
+                    CONF_PROXY_PORT,
+                    default=options.get(CONF_PROXY_PORT, DEFAULT_PROXY_PORT),
+                ): vol.All(int, vol.Range(min=0, max=65535)),
+                vol.Required(
+                    CONF_PROXY_MAX_AGE,
+                    default=options.get(CONF_PROXY_MAX_AGE, DEFAULT_PROXY_MAX_AGE),
+                ): interval,
+            }
+        )
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=schema,
+            errors=errors,
+        )
@@ -1,67 +1,284 @@
 DOMAIN = "epever_modbus"
 
+# Block read planning (see planner.py)
+# max_gap:       largest hole (in registers) bridged inside one block read
+# max_registers: largest number of registers requested in one PDU
+DEFAULT_MAX_GAP = 8
+DEFAULT_MAX_REGISTERS = 32
+
+# TCP sessions opened per gateway host:port, shared by all slaves behind it
+# (most RS485-to-TCP gateways only accept one or two)
+DEFAULT_GATEWAY_SESSIONS = 1
+
+# Requests kept in flight per gateway session (Modbus TCP pipelining).
+# Opt-in from the options flow: only for gateways that accept several
+# outstanding requests; 1 waits for each response before the next request.
+CONF_PIPELINE_WINDOW = "pipeline_window"
+DEFAULT_PIPELINE_WINDOW = 1
+MAX_PIPELINE_WINDOW = 16
+
+# Refresh orchestrator shared by all entries (see orchestrator.py)
+DATA_ORCHESTRATOR = f"{DOMAIN}_orchestrator"
+ORCHESTRATOR_TICK = 1.0
+
+# Change detection: entities only write state when their value changed by
+# at least the sensor's optional "deadband"; "heartbeat" (seconds, None = off)
+# forces a write after that long without one
+DEFAULT_HEARTBEAT = None
+
+# Poll tiers: each sensor declares how often it is read ("poll" key)
+# startup: read once when the entry is set up (rated values)
+# fast:    real-time values
+# slow:    daily statistics
+POLL_STARTUP = "startup"
+POLL_FAST = "fast"
+POLL_SLOW = "slow"
+
+# Seconds between reads per tier (None = read once)
+DEFAULT_POLL_TIERS = {
+    POLL_STARTUP: None,
+    POLL_FAST: 5,
+    POLL_SLOW: 60,
+}
+
+# Adaptive poll interval (options flow): the coordinator's interval moves
+# between min and max with the measured load, and drops to the night
+# interval while the profile's "night_mode" register stays below its
+# threshold (PV voltage: the panels are dark)
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+CONF_NIGHT_INTERVAL = "night_interval"
+DEFAULT_MIN_INTERVAL = 5
+DEFAULT_MAX_INTERVAL = 30
+DEFAULT_NIGHT_INTERVAL = 300
+MAX_POLL_INTERVAL = 3600
+
+# Back off (x ADAPT_BACKOFF) when a cycle takes more than ADAPT_HIGH_LOAD of
+# the interval or requests time out; tighten (x ADAPT_TIGHTEN) below
+# ADAPT_LOW_LOAD
+ADAPT_BACKOFF = 1.5
+ADAPT_TIGHTEN = 0.9
+ADAPT_HIGH_LOAD = 0.7
+ADAPT_LOW_LOAD = 0.3
+
+# Share of the poll interval a refresh may take: block reads still pending
+# then are cancelled and their sensors keep their last good values (marked
+# stale), so a partial update is published on time
+CYCLE_DEADLINE = 0.8
+
+# Per-entry persistent data (see storage.py): registers the device rejects
+# with exception 02, found by bisecting failed block reads, and the last
+# decoded values, restored at startup before the first refresh, and the
+# local energy accumulators (saved at most every SNAPSHOT_SAVE_INTERVAL
+# seconds, and on unload and when Home Assistant stops)
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+SNAPSHOT_SAVE_INTERVAL = 300
+
+# Unreadable registers are forgotten (and bisected again if still rejected)
+# after this many seconds and when the device identification changes, so a
+# transient exception 02 doesn't drop sensors for good
+UNREADABLE_RECHECK = 24 * 3600
+
+# Device identification (FC43) read once per start for the warm start
+# fingerprint: one attempt, no retries, within the refresh deadline (many
+# controllers and gateways never answer FC43)
+IDENTIFICATION_TIMEOUT = 1.0
+
+# Local energy integration (see energy.py): reads of a source further apart
+# than this (seconds) are not integrated across
+INTEGRATION_MAX_GAP = 900
+
+# Modbus TCP proxy (options flow, see proxy.py): serves other Modbus
+# clients FC03/FC04 reads from the register cache, under the device's
+# slave id, reading through to the device when the cached registers are
+# missing or older than the max age (seconds). Port 0 = off.
+CONF_PROXY_PORT = "proxy_port"
+CONF_PROXY_MAX_AGE = "proxy_max_age"
+DEFAULT_PROXY_PORT = 0
+DEFAULT_PROXY_MAX_AGE = 30
+PROXY_HOST = "0.0.0.0"
+
+# Discovery scan in the config flow (see discovery.py): every unit id is
+# probed with one read of the rated-value block, short timeout, no retries,
+# at most DISCOVERY_CONCURRENCY probes in flight on a probe session of the
+# pooled gateway connection; units that time out are probed once more
+DISCOVERY_SLAVES = range(1, 248)
+DISCOVERY_BLOCK = (0x3000, 9)
+DISCOVERY_TIMEOUT = 0.5
+DISCOVERY_CONCURRENCY = 32
+
+# Circuit breaker per device (see breaker.py): after BREAKER_THRESHOLD
+# refreshes in a row without any successful read the device is skipped,
+# and probed with one single-register read after BREAKER_PROBE_BASE
+# seconds, doubling up to BREAKER_PROBE_MAX while it stays unreachable
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+BREAKER_THRESHOLD = 3
+BREAKER_PROBE_BASE = 10
+BREAKER_PROBE_MAX = 600
+
+# Services (see services.py and services.yaml)
+SERVICE_READ_SETTINGS = "read_settings"
+SERVICE_WRITE_SETTINGS = "write_settings"
+SERVICE_CAPTURE = "capture"
+SERVICE_RECORD_TRACE = "record_trace"
+
+# Burst capture (see capture.py): the profile's "capture" registers are read
+# every interval seconds for at most CAPTURE_MAX_DURATION seconds, into a
+# ring of CAPTURE_BUFFER_SAMPLES samples (the oldest are overwritten)
+DEFAULT_CAPTURE_INTERVAL = 1.0
+MIN_CAPTURE_INTERVAL = 0.2
+DEFAULT_CAPTURE_DURATION = 60
+CAPTURE_MAX_DURATION = 3600
+CAPTURE_BUFFER_SAMPLES = 3600
+# CSV files are written below <config>/epever_modbus/captures, like traces
+# not below www/, which is served under /local/ without authentication
+CAPTURE_DIRECTORY = "epever_modbus/captures"
+
+# Packet traces (see packet_trace.py): raw gateway traffic recorded for up
+# to TRACE_MAX_DURATION seconds / TRACE_MAX_BYTES bytes, written below
+# <config>/epever_modbus/traces for replay with the benchmarks
+DEFAULT_TRACE_DURATION = 60
+TRACE_MAX_DURATION = 3600
+TRACE_MAX_BYTES = 16 * 1024 * 1024
+TRACE_DIRECTORY = "epever_modbus/traces"
+
+# Poll metrics exposed as diagnostic sensors (see metrics.py). "metric" is
+# the key in the coordinator's metrics_snapshot (PollMetrics.as_dict(),
+# "gateway." for the shared gateway counters, "breaker." for the circuit
+# breaker). Disabled by default unless "enabled": most change every refresh.
+METRIC_SENSORS = [
+    {"key": "poll_cycle_duration",  "name": "Poll Cycle Duration",         "unit": "ms",    "metric": "last_cycle_ms",        "state_class": "measurement"},
+    {"key": "poll_cycle_average",   "name": "Poll Cycle Average",          "unit": "ms",    "metric": "average_cycle_ms",     "state_class": "measurement"},
+    {"key": "request_rtt",          "name": "Request Round Trip",          "unit": "ms",    "metric": "rtt_average_ms",       "state_class": "measurement"},
+    {"key": "registers_per_second", "name": "Registers Per Second",        "unit": "reg/s", "metric": "registers_per_second", "state_class": "measurement"},
+    {"key": "request_retries",      "name": "Request Retries",                              "metric": "retries",              "state_class": "total_increasing"},
+    {"key": "request_timeouts",     "name": "Request Timeouts",                             "metric": "timeouts",             "state_class": "total_increasing"},
+    {"key": "request_failures",     "name": "Request Failures",                             "metric": "failures",             "state_class": "total_increasing"},
+    {"key": "deadline_misses",      "name": "Refresh Deadline Misses",                      "metric": "deadline_misses",      "state_class": "total_increasing"},
+    {"key": "deadline_cancelled",   "name": "Requests Cut By Deadline",                     "metric": "cancelled",            "state_class": "total_increasing"},
+    {"key": "gateway_reconnects",   "name": "Gateway Reconnects",                           "metric": "gateway.reconnects",   "state_class": "total_increasing"},
+    {"key": "gateway_bytes_out",    "name": "Gateway Bytes Sent",          "unit": "B",     "metric": "gateway.bytes_out",    "state_class": "total_increasing"},
+    {"key": "gateway_bytes_in",     "name": "Gateway Bytes Received",      "unit": "B",     "metric": "gateway.bytes_in",     "state_class": "total_increasing"},
+    {"key": "circuit_breaker",      "name": "Circuit Breaker",                              "metric": "breaker.state",        "enabled": True},
+]
+
 DEVICE_TYPES = {
     "epever_tracer": {
         "name": "EPEVER Tracer MPPT",
+        "max_gap": 8,
+        "max_registers": 32,
+        "heartbeat": 900,
+        # Night: PV voltage below 5.00 V for 15 minutes
+        "night_mode": {"key": "pv_voltage_raw", "below": 500, "after": 900},
+        # Local energy integration: "source" (scaled to W or A) integrated
+        # between reads into Wh / Ah, reset when a daily counter goes down
+        "integrals": [
+            {"key": "pv_energy_integrated_today",       "name": "PV Energy Today (Integrated)",       "source": "pv_power_raw",         "scale": 0.01, "unit": "Wh", "precision": 1, "device_class": "energy", "state_class": "total_increasing"},
+            {"key": "charging_energy_integrated_today", "name": "Charging Energy Today (Integrated)", "source": "charging_power_raw",   "scale": 0.01, "unit": "Wh", "precision": 1, "device_class": "energy", "state_class": "total_increasing"},
+            {"key": "charging_ah_integrated_today",     "name": "Charged Ah Today (Integrated)",      "source": "charging_current_raw", "scale": 0.01, "unit": "Ah", "precision": 2, "state_class": "total_increasing"},
+            {"key": "load_energy_integrated_today",     "name": "Load Energy Today (Integrated)",     "source": "load_power_raw",       "scale": 0.01, "unit": "Wh", "precision": 1, "device_class": "energy", "state_class": "total_increasing"},
+            {"key": "load_ah_integrated_today",         "name": "Load Ah Today (Integrated)",         "source": "load_current_raw",     "scale": 0.01, "unit": "Ah", "precision": 2, "state_class": "total_increasing"},
+        ],
+        "day_counters": ["generated_today_raw", "consumed_today_raw"],
+        # Burst capture columns: raw sensor and the scale giving "unit"
+        "capture": [
+            {"key": "pv_voltage", "sensor": "pv_voltage_raw", "scale": 0.01, "unit": "V"},
+            {"key": "pv_current", "sensor": "pv_current_raw", "scale": 0.01, "unit": "A"},
+            {"key": "pv_power",   "sensor": "pv_power_raw",   "scale": 0.01, "unit": "W"},
+        ],
+        "poll_tiers": {
+            POLL_STARTUP: None,
+            POLL_FAST: 5,
+            POLL_SLOW: 60,
+        },
 
         "sensors": [
             # -------------------- RATED VALUES --------------------
-            {"key": "array_rated_voltage_raw",   "name": "Array Rated Voltage Raw",   "register": 0x3000, "type": "input", "category": "diagnostic"},
-            {"key": "array_rated_current_raw",   "name": "Array Rated Current Raw",   "register": 0x3001, "type": "input", "category": "diagnostic"},
-            {"key": "array_rated_power_raw",     "name": "Array Rated Power Raw",     "register": 0x3002, "type": "input", "length": 2, "category": "diagnostic"},
+            {"key": "array_rated_voltage_raw",   "name": "Array Rated Voltage Raw",   "register": 0x3000, "type": "input", "poll": POLL_STARTUP, "category": "diagnostic"},
+            {"key": "array_rated_current_raw",   "name": "Array Rated Current Raw",   "register": 0x3001, "type": "input", "poll": POLL_STARTUP, "category": "diagnostic"},
+            {"key": "array_rated_power_raw",     "name": "Array Rated Power Raw",     "register": 0x3002, "type": "input", "length": 2, "poll": POLL_STARTUP, "category": "diagnostic"},
 
-            {"key": "battery_rated_voltage_raw", "name": "Battery Rated Voltage Raw", "register": 0x3004, "type": "input", "category": "diagnostic"},
-            {"key": "battery_rated_current_raw", "name": "Battery Rated Current Raw", "register": 0x3005, "type": "input", "category": "diagnostic"},
-            {"key": "battery_rated_power_raw",   "name": "Battery Rated Power Raw",   "register": 0x3006, "type": "input", "length": 2, "category": "diagnostic"},
+            {"key": "battery_rated_voltage_raw", "name": "Battery Rated Voltage Raw", "register": 0x3004, "type": "input", "poll": POLL_STARTUP, "category": "diagnostic"},
+            {"key": "battery_rated_current_raw", "name": "Battery Rated Current Raw", "register": 0x3005, "type": "input", "poll": POLL_STARTUP, "category": "diagnostic"},
+            {"key": "battery_rated_power_raw",   "name": "Battery Rated Power Raw",   "register": 0x3006, "type": "input", "length": 2, "poll": POLL_STARTUP, "category": "diagnostic"},
 
-            {"key": "charging_mode_raw",         "name": "Charging Mode Raw",         "register": 0x3008, "type": "input", "category": "diagnostic"},
-            {"key": "rated_load_current_raw",    "name": "Rated Load Current Raw",    "register": 0x300E, "type": "input", "category": "diagnostic"},
+            {"key": "charging_mode_raw",         "name": "Charging Mode Raw",         "register": 0x3008, "type": "input", "poll": POLL_STARTUP, "category": "diagnostic"},
+            {"key": "rated_load_current_raw",    "name": "Rated Load Current Raw",    "register": 0x300E, "type": "input", "poll": POLL_STARTUP, "category": "diagnostic"},
 
             # -------------------- REAL-TIME VALUES --------------------
-            {"key": "pv_voltage_raw",    "name": "PV Voltage Raw",    "register": 0x3100, "type": "input", "category": "diagnostic"},
-            {"key": "pv_current_raw",    "name": "PV Current Raw",    "register": 0x3101, "type": "input", "category": "diagnostic"},
-            {"key": "pv_power_raw",      "name": "PV Power Raw",      "register": 0x3102, "type": "input", "length": 2, "category": "diagnostic"},
+            {"key": "pv_voltage_raw",    "name": "PV Voltage Raw",    "register": 0x3100, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "pv_current_raw",    "name": "PV Current Raw",    "register": 0x3101, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "pv_power_raw",      "name": "PV Power Raw",      "register": 0x3102, "type": "input", "length": 2, "poll": POLL_FAST, "category": "diagnostic"},
 
-            {"key": "charging_voltage_raw", "name": "Charging Voltage Raw", "register": 0x3104, "type": "input", "category": "diagnostic"},
-            {"key": "charging_current_raw", "name": "Charging Current Raw", "register": 0x3105, "type": "input", "category": "diagnostic"},
-            {"key": "charging_power_raw",   "name": "Charging Power Raw",   "register": 0x3106, "type": "input", "length": 2, "category": "diagnostic"},
+            {"key": "charging_voltage_raw", "name": "Charging Voltage Raw", "register": 0x3104, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "charging_current_raw", "name": "Charging Current Raw", "register": 0x3105, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "charging_power_raw",   "name": "Charging Power Raw",   "register": 0x3106, "type": "input", "length": 2, "poll": POLL_FAST, "category": "diagnostic"},
 
-            {"key": "load_voltage_raw", "name": "Load Voltage Raw", "register": 0x310C, "type": "input", "category": "diagnostic"},
-            {"key": "load_current_raw", "name": "Load Current Raw", "register": 0x310D, "type": "input", "category": "diagnostic"},
-            {"key": "load_power_raw",   "name": "Load Power Raw",   "register": 0x310E, "type": "input", "length": 2, "category": "diagnostic"},
+            {"key": "load_voltage_raw", "name": "Load Voltage Raw", "register": 0x310C, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "load_current_raw", "name": "Load Current Raw", "register": 0x310D, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "load_power_raw",   "name": "Load Power Raw",   "register": 0x310E, "type": "input", "length": 2, "poll": POLL_FAST, "category": "diagnostic"},
 
-            {"key": "battery_temp_raw",    "name": "Battery Temp Raw",    "register": 0x3110, "type": "input", "category": "diagnostic"},
-            {"key": "device_temp_raw",     "name": "Device Temp Raw",     "register": 0x3111, "type": "input", "category": "diagnostic"},
-            {"key": "component_temp_raw",  "name": "Component Temp Raw",  "register": 0x3112, "type": "input", "category": "diagnostic"},
+            {"key": "battery_temp_raw",    "name": "Battery Temp Raw",    "register": 0x3110, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "device_temp_raw",     "name": "Device Temp Raw",     "register": 0x3111, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "component_temp_raw",  "name": "Component Temp Raw",  "register": 0x3112, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
 
-            {"key": "battery_soc_raw",     "name": "Battery SOC Raw",     "register": 0x311A, "type": "input", "category": "diagnostic"},
-            {"key": "remote_temp_raw",     "name": "Remote Temp Raw",     "register": 0x311B, "type": "input", "category": "diagnostic"},
-            {"key": "remote_real_voltage_raw", "name": "Remote Real Voltage Raw", "register": 0x311D, "type": "input", "category": "diagnostic"},
+            {"key": "battery_soc_raw",     "name": "Battery SOC Raw",     "register": 0x311A, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "remote_temp_raw",     "name": "Remote Temp Raw",     "register": 0x311B, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "remote_real_voltage_raw", "name": "Remote Real Voltage Raw", "register": 0x311D, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
 
-            {"key": "battery_status_raw",  "name": "Battery Status Raw",  "register": 0x3200, "type": "input", "category": "diagnostic"},
-            {"key": "charger_status_raw",  "name": "Charger Status Raw",  "register": 0x3201, "type": "input", "category": "diagnostic"},
+            {"key": "battery_status_raw",  "name": "Battery Status Raw",  "register": 0x3200, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "charger_status_raw",  "name": "Charger Status Raw",  "register": 0x3201, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
 
             # -------------------- STATS --------------------
-            {"key": "max_pv_today_raw",    "name": "Max PV Voltage Today Raw",    "register": 0x3300, "type": "input", "category": "diagnostic"},
-            {"key": "min_pv_today_raw",    "name": "Min PV Voltage Today Raw",    "register": 0x3301, "type": "input", "category": "diagnostic"},
-            {"key": "max_batt_today_raw",  "name": "Max Battery Voltage Today Raw","register": 0x3302, "type": "input", "category": "diagnostic"},
-            {"key": "min_batt_today_raw",  "name": "Min Battery Voltage Today Raw","register": 0x3303, "type": "input", "category": "diagnostic"},
+            {"key": "max_pv_today_raw",    "name": "Max PV Voltage Today Raw",    "register": 0x3300, "type": "input", "poll": POLL_SLOW, "category": "diagnostic"},
+            {"key": "min_pv_today_raw",    "name": "Min PV Voltage Today Raw",    "register": 0x3301, "type": "input", "poll": POLL_SLOW, "category": "diagnostic"},
+            {"key": "max_batt_today_raw",  "name": "Max Battery Voltage Today Raw","register": 0x3302, "type": "input", "poll": POLL_SLOW, "category": "diagnostic"},
+            {"key": "min_batt_today_raw",  "name": "Min Battery Voltage Today Raw","register": 0x3303, "type": "input", "poll": POLL_SLOW, "category": "diagnostic"},
 
-            {"key": "consumed_today_raw",  "name": "Consumed Today Raw",  "register": 0x3304, "type": "input", "length": 2, "category": "diagnostic"},
-            {"key": "consumed_month_raw",  "name": "Consumed Month Raw",  "register": 0x3306, "type": "input", "length": 2, "category": "diagnostic"},
-            {"key": "consumed_year_raw",   "name": "Consumed Year Raw",   "register": 0x3308, "type": "input", "length": 2, "category": "diagnostic"},
-            {"key": "consumed_total_raw",  "name": "Consumed Total Raw",  "register": 0x330A, "type": "input", "length": 2, "category": "diagnostic"},
+            {"key": "consumed_today_raw",  "name": "Consumed Today Raw",  "register": 0x3304, "type": "input", "length": 2, "poll": POLL_SLOW, "category": "diagnostic"},
+            {"key": "consumed_month_raw",  "name": "Consumed Month Raw",  "register": 0x3306, "type": "input", "length": 2, "poll": POLL_SLOW, "category": "diagnostic"},
+            {"key": "consumed_year_raw",   "name": "Consumed Year Raw",   "register": 0x3308, "type": "input", "length": 2, "poll": POLL_SLOW, "category": "diagnostic"},
+            {"key": "consumed_total_raw",  "name": "Consumed Total Raw",  "register": 0x330A, "type": "input", "length": 2, "poll": POLL_SLOW, "category": "diagnostic"},
 
-            {"key": "generated_today_raw", "name": "Generated Today Raw", "register": 0x330C, "type": "input", "length": 2, "category": "diagnostic"},
-            {"key": "generated_month_raw", "name": "Generated Month Raw", "register": 0x330E, "type": "input", "length": 2, "category": "diagnostic"},
-            {"key": "generated_year_raw",  "name": "Generated Year Raw",  "register": 0x3310, "type": "input", "length": 2, "category": "diagnostic"},
-            {"key": "generated_total_raw", "name": "Generated Total Raw", "register": 0x3312, "type": "input", "length": 2, "category": "diagnostic"},
+            {"key": "generated_today_raw", "name": "Generated Today Raw", "register": 0x330C, "type": "input", "length": 2, "poll": POLL_SLOW, "category": "diagnostic"},
+            {"key": "generated_month_raw", "name": "Generated Month Raw", "register": 0x330E, "type": "input", "length": 2, "poll": POLL_SLOW, "category": "diagnostic"},
+            {"key": "generated_year_raw",  "name": "Generated Year Raw",  "register": 0x3310, "type": "input", "length": 2, "poll": POLL_SLOW, "category": "diagnostic"},
+            {"key": "generated_total_raw", "name": "Generated Total Raw", "register": 0x3312, "type": "input", "length": 2, "poll": POLL_SLOW, "category": "diagnostic"},
 
-            {"key": "co2_raw",             "name": "CO₂ Raw",             "register": 0x3314, "type": "input", "length": 2, "category": "diagnostic"},
+            {"key": "co2_raw",             "name": "CO₂ Raw",             "register": 0x3314, "type": "input", "length": 2, "poll": POLL_SLOW, "category": "diagnostic"},
 
             # your template uses this as "Battery Voltage Raw"
-            {"key": "battery_voltage_raw", "name": "Battery Voltage Raw", "register": 0x331A, "type": "input", "category": "diagnostic"},
-            {"key": "battery_current_raw", "name": "Battery Current Raw", "register": 0x331B, "type": "input", "length": 2, "category": "diagnostic"},
+            {"key": "battery_voltage_raw", "name": "Battery Voltage Raw", "register": 0x331A, "type": "input", "poll": POLL_FAST, "category": "diagnostic"},
+            {"key": "battery_current_raw", "name": "Battery Current Raw", "register": 0x331B, "type": "input", "length": 2, "poll": POLL_FAST, "category": "diagnostic"},
+        ],
+
+        # Battery / charging parameters (holding registers, see settings.py).
+        # Values are in "unit"; the register holds value / scale.
+        "settings": [
+            {"key": "battery_type",              "name": "Battery Type",              "register": 0x9000},   # 0 user, 1 sealed, 2 gel, 3 flooded
+            {"key": "battery_capacity",          "name": "Battery Capacity",          "register": 0x9001, "unit": "Ah"},
+            {"key": "temperature_compensation",  "name": "Temperature Compensation",  "register": 0x9002, "unit": "mV/°C/2V", "scale": 0.01},
+            {"key": "high_voltage_disconnect",   "name": "High Voltage Disconnect",   "register": 0x9003, "unit": "V", "scale": 0.01},
+            {"key": "charging_limit_voltage",    "name": "Charging Limit Voltage",    "register": 0x9004, "unit": "V", "scale": 0.01},
+            {"key": "over_voltage_reconnect",    "name": "Over Voltage Reconnect",    "register": 0x9005, "unit": "V", "scale": 0.01},
+            {"key": "equalization_voltage",      "name": "Equalization Voltage",      "register": 0x9006, "unit": "V", "scale": 0.01},
+            {"key": "boost_voltage",             "name": "Boost Voltage",             "register": 0x9007, "unit": "V", "scale": 0.01},
+            {"key": "float_voltage",             "name": "Float Voltage",             "register": 0x9008, "unit": "V", "scale": 0.01},
+            {"key": "boost_reconnect_voltage",   "name": "Boost Reconnect Voltage",   "register": 0x9009, "unit": "V", "scale": 0.01},
+            {"key": "low_voltage_reconnect",     "name": "Low Voltage Reconnect",     "register": 0x900A, "unit": "V", "scale": 0.01},
+            {"key": "under_voltage_recover",     "name": "Under Voltage Recover",     "register": 0x900B, "unit": "V", "scale": 0.01},
+            {"key": "under_voltage_warning",     "name": "Under Voltage Warning",     "register": 0x900C, "unit": "V", "scale": 0.01},
+            {"key": "low_voltage_disconnect",    "name": "Low Voltage Disconnect",    "register": 0x900D, "unit": "V", "scale": 0.01},
+            {"key": "discharging_limit_voltage", "name": "Discharging Limit Voltage", "register": 0x900E, "unit": "V", "scale": 0.01},
+
+            {"key": "equalize_duration",         "name": "Equalize Duration",         "register": 0x906B, "unit": "min"},
+            {"key": "boost_duration",            "name": "Boost Duration",            "register": 0x906C, "unit": "min"},
+            {"key": "discharging_percentage",    "name": "Discharging Percentage",    "register": 0x906D, "unit": "%"},
+            {"key": "charging_percentage",       "name": "Charging Percentage",       "register": 0x906E, "unit": "%"},
+            {"key": "battery_management_mode",   "name": "Battery Management Mode",   "register": 0x9070},   # 0 voltage, 1 SOC
         ],
 
         "virtual_sensors": [
@@ -75,29 +292,29 @@ DEVICE_TYPES = {
             {"key": "battery_rated_power",   "name": "Battery Rated Power",   "unit": "W",   "formula": "epever_battery_rated_power",   "precision": 1},
 
             # ------------- Battery realtime -------------
-            {"key": "battery_voltage",       "name": "Battery Voltage",       "unit": "V",   "formula": "epever_battery_voltage",       "precision": 2},
-            {"key": "battery_current",       "name": "Battery Current",       "unit": "A",   "formula": "epever_battery_current",       "precision": 2},
+            {"key": "battery_voltage",       "name": "Battery Voltage",       "unit": "V",   "formula": "epever_battery_voltage",       "precision": 2, "deadband": 0.02},
+            {"key": "battery_current",       "name": "Battery Current",       "unit": "A",   "formula": "epever_battery_current",       "precision": 2, "deadband": 0.02},
             {"key": "battery_soc",           "name": "Battery SOC",           "unit": "%",   "formula": "epever_battery_soc",           "precision": 0},
             {"key": "battery_temperature",   "name": "Battery Temperature",   "unit": "°C",  "formula": "epever_battery_temperature",   "precision": 1},
 
             # ------------- PV side -------------
-            {"key": "pv_voltage",            "name": "PV Voltage",            "unit": "V",   "formula": "epever_pv_voltage",            "precision": 2},
-            {"key": "pv_current",            "name": "PV Current",            "unit": "A",   "formula": "epever_pv_current",            "precision": 2},
-            {"key": "pv_power",              "name": "PV Power",              "unit": "W",   "formula": "epever_pv_power",              "precision": 1},
+            {"key": "pv_voltage",            "name": "PV Voltage",            "unit": "V",   "formula": "epever_pv_voltage",            "precision": 2, "deadband": 0.05},
+            {"key": "pv_current",            "name": "PV Current",            "unit": "A",   "formula": "epever_pv_current",            "precision": 2, "deadband": 0.02},
+            {"key": "pv_power",              "name": "PV Power",              "unit": "W",   "formula": "epever_pv_power",              "precision": 1, "deadband": 1},
 
             # ------------- Device temps -------------
             {"key": "device_temperature",    "name": "Device Temperature",    "unit": "°C",  "formula": "epever_device_temperature",    "precision": 1},
             {"key": "component_temperature", "name": "Component Temperature", "unit": "°C",  "formula": "epever_component_temperature", "precision": 1},
 
             # ------------- Charging side -------------
-            {"key": "charging_voltage",      "name": "Charging Voltage",      "unit": "V",   "formula": "epever_charging_voltage",      "precision": 2},
-            {"key": "charging_current",      "name": "Charging Current",      "unit": "A",   "formula": "epever_charging_current",      "precision": 2},
-            {"key": "charging_power",        "name": "Charging Power",        "unit": "W",   "formula": "epever_charging_power",        "precision": 1},
+            {"key": "charging_voltage",      "name": "Charging Voltage",      "unit": "V",   "formula": "epever_charging_voltage",      "precision": 2, "deadband": 0.02},
+            {"key": "charging_current",      "name": "Charging Current",      "unit": "A",   "formula": "epever_charging_current",      "precision": 2, "deadband": 0.02},
+            {"key": "charging_power",        "name": "Charging Power",        "unit": "W",   "formula": "epever_charging_power",        "precision": 1, "deadband": 1},
 
             # ------------- Load side -------------
-            {"key": "load_voltage",          "name": "Load Voltage",          "unit": "V",   "formula": "epever_load_voltage",          "precision": 2},
-            {"key": "load_current",          "name": "Load Current",          "unit": "A",   "formula": "epever_load_current",          "precision": 2},
-            {"key": "load_power",            "name": "Load Power",            "unit": "W",   "formula": "epever_load_power",            "precision": 1},
+            {"key": "load_voltage",          "name": "Load Voltage",          "unit": "V",   "formula": "epever_load_voltage",          "precision": 2, "deadband": 0.02},
+            {"key": "load_current",          "name": "Load Current",          "unit": "A",   "formula": "epever_load_current",          "precision": 2, "deadband": 0.02},
+            {"key": "load_power",            "name": "Load Power",            "unit": "W",   "formula": "epever_load_power",            "precision": 1, "deadband": 1},
 
             # ------------- Min/max voltages today -------------
             {"key": "max_pv_voltage_today",     "name": "Max PV Voltage Today",     "unit": "V", "formula": "epever_max_pv_voltage_today",    "precision": 2},
@@ -1,8 +1,37 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from datetime import timedelta
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ADAPT_BACKOFF,
+    ADAPT_HIGH_LOAD,
+    ADAPT_LOW_LOAD,
+    ADAPT_TIGHTEN,
+    BREAKER_HALF_OPEN,
+    CYCLE_DEADLINE,
+    DEFAULT_HEARTBEAT,
+    DEFAULT_MAX_GAP,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MAX_REGISTERS,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_NIGHT_INTERVAL,
+    DEFAULT_POLL_TIERS,
+    IDENTIFICATION_TIMEOUT,
+    SNAPSHOT_SAVE_INTERVAL,
+    UNREADABLE_RECHECK,
+)
+from .breaker import CircuitBreaker
+from .decoder import BlockDecoder, compile_virtual_sensors
+from .energy import EnergyIntegrator
+from .planner import plan_reads, sensor_tier
+from .register_cache import RegisterCache
+from .unreadable import bisect_rejected
+from .vendor.pymodbus.constants import ExcCodes
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -10,64 +39,522 @@ _LOGGER = logging.getLogger(__name__)
 class EpeverCoordinator(DataUpdateCoordinator):
     """Coordinator for polling Modbus data from an Epever device."""
 
-    def __init__(self, hass, client, profile, device_name, update_interval):
+    def __init__(
+        self,
+        hass,
+        client,
+        profile,
+        device_name,
+        update_interval=None,
+        min_interval=DEFAULT_MIN_INTERVAL,
+        max_interval=DEFAULT_MAX_INTERVAL,
+        night_interval=DEFAULT_NIGHT_INTERVAL,
+        store=None,
+    ):
+        # Seconds between reads per poll tier (None = read once)
+        self.tier_intervals = {**DEFAULT_POLL_TIERS, **profile.get("poll_tiers", {})}
+
+        # The fastest tier is read on every tick, whatever the tick interval
+        fastest = min(interval for interval in self.tier_intervals.values() if interval)
+        self._tick_tiers = {
+            tier for tier, interval in self.tier_intervals.items() if interval == fastest
+        }
+
+        # Adaptive interval bounds (seconds)
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.night_interval = night_interval
+        self.night_mode = profile.get("night_mode")
+        self.is_night = False
+        self._dark_since: float | None = None
+        self._day_interval: float | None = None
+
+        # Tick at the fastest tier unless told otherwise
+        if update_interval is None:
+            update_interval = min(max(fastest, self.min_interval), self.max_interval)
+
+        # No timer of our own: the refresh orchestrator shared by all
+        # entries calls async_refresh every poll_interval
         super().__init__(
             hass,
             _LOGGER,
             name=f"Epever {device_name}",
-            update_interval=timedelta(seconds=update_interval),
+            update_interval=None,
         )
+        self.poll_interval = timedelta(seconds=update_interval)
 
         self.client = client
+        # Request metrics are recorded by the client, cycle metrics here
+        self.metrics = client.metrics
+        self.metrics_snapshot: dict = {}
         self.profile = profile
         self.device_name = device_name
 
+        # Registers the device rejects (exception 02), persisted per entry
+        self.store = store
+        self.unreadable: dict[str, set[int]] = store.unreadable if store else {}
+        self._unreadable_checked = time.monotonic()
+
+        # Fast-fail for unreachable devices
+        self.breaker = CircuitBreaker(device_name)
+
+        # Warm start: read-once tiers (rated values) restored from the
+        # snapshot are trusted while the device's fingerprint is unchanged
+        self._once_tiers = {tier for tier, interval in self.tier_intervals.items() if not interval}
+        self.fingerprint: dict | None = None
+        self._restored_fingerprint: dict | None = None
+        self._fingerprint_checked = False
+        self._snapshot_saved: float | None = None
+
+        self._plan_reads()
+
+        # Monotonic time each tier was last read completely
+        self._tier_last_read: dict[str, float] = {}
+
+        # Raw registers of every answered block (served by the proxy)
+        self.registers = RegisterCache()
+
+        # Sensors whose last read failed keep their last good value;
+        # last_read holds when each key was last read (UTC)
+        self.last_read: dict[str, object] = {}
+        self.stale_keys: set[str] = set()
+
+        # Virtual sensor values, computed once per refresh
+        self.virtual_plan = compile_virtual_sensors(profile)
+        self.virtual_data: dict = {}
+        # Virtual sensors (and integrals) computed from a stale input
+        self._virtual_inputs = {
+            **self.virtual_plan.inputs,
+            **{cfg["key"]: frozenset({cfg["source"]}) for cfg in profile.get("integrals", [])},
+        }
+        self.stale_virtual_keys: set[str] = set()
+
+        # Local Wh / Ah accumulators, published with the virtual sensors
+        self.energy = EnergyIntegrator(profile)
+        self.energy.restore(store.integrals if store else None)
+
+        # Change detection: only entities whose value moved past their
+        # deadband (or stayed silent for `heartbeat` seconds) write state
+        self.deadbands = {
+            cfg["key"]: cfg["deadband"]
+            for cfg in [*profile["sensors"], *profile.get("virtual_sensors", [])]
+            if cfg.get("deadband")
+        }
+        self.heartbeat = profile.get("heartbeat", DEFAULT_HEARTBEAT)
+        self.changed_keys: set[str] = set()
+        self._published: dict[str, tuple[object, float]] = {}
+
+    def _plan_reads(self):
+        """Coalesce each tier's registers into block reads and compile their decoders."""
+        self.read_plans = {}
+        for tier in self.tier_intervals:
+            sensors = [s for s in self.profile["sensors"] if sensor_tier(s) == tier]
+            blocks = plan_reads(
+                sensors,
+                max_gap=self.profile.get("max_gap", DEFAULT_MAX_GAP),
+                max_registers=self.profile.get("max_registers", DEFAULT_MAX_REGISTERS),
+                unreadable=self.unreadable,
+            )
+            if blocks:
+                self.read_plans[tier] = [BlockDecoder(block) for block in blocks]
+        _LOGGER.debug(
+            "%s: %d sensors planned into %s",
+            self.device_name,
+            len(self.profile["sensors"]),
+            {tier: len(plan) for tier, plan in self.read_plans.items()},
+        )
+
+        # Sensors routed around (unreadable) are no longer reported stale
+        self._planned_keys = {
+            key for plan in self.read_plans.values() for decoder in plan for key in decoder.keys
+        }
+
+        # The breaker probes a single register of the first block read on every tick
+        probe_plan = next(
+            (plan for tier, plan in self.read_plans.items() if tier in self._tick_tiers),
+            next(iter(self.read_plans.values()), None),
+        )
+        self._probe_block = probe_plan[0].block if probe_plan else None
+
+    def _update_stale_virtual(self) -> set[str]:
+        """Mark the virtual sensors with a stale input; returns those that changed."""
+        stale = {
+            key for key, inputs in self._virtual_inputs.items()
+            if not inputs.isdisjoint(self.stale_keys)
+        }
+        changed = stale ^ self.stale_virtual_keys
+        self.stale_virtual_keys = stale
+        return changed
+
+    def virtual_last_read(self, key: str):
+        """When the oldest stale input of a virtual sensor was last read (UTC)."""
+        return min(
+            (
+                self.last_read[raw] for raw in self._virtual_inputs.get(key, ())
+                if raw in self.stale_keys and raw in self.last_read
+            ),
+            default=None,
+        )
+
+    def restore_snapshot(self) -> bool:
+        """Load the values saved by an earlier run; False if there are none."""
+        snapshot = self.store.snapshot if self.store is not None else None
+        if not snapshot or not snapshot.get("data"):
+            return False
+
+        data = snapshot["data"]
+        saved_at = dt_util.parse_datetime(snapshot["saved_at"])
+        now = time.monotonic()
+
+        self.data = data
+        self.virtual_data = {**self.virtual_plan.evaluate(data), **self.energy.values()}
+        self._restored_fingerprint = snapshot.get("fingerprint")
+        self._snapshot_saved = now
+
+        # Read-once tiers stay valid unless the fingerprint check says otherwise
+        once_keys = set()
+        for tier in self._once_tiers & self.read_plans.keys():
+            self._tier_last_read[tier] = now
+            once_keys.update(key for decoder in self.read_plans[tier] for key in decoder.keys)
+
+        # Live values are as old as the snapshot until the first refresh
+        self.last_read = dict.fromkeys(data, saved_at)
+        self.stale_keys = (set(data) & self._planned_keys) - once_keys
+        self._update_stale_virtual()
+
+        _LOGGER.debug("%s: restored %d values saved at %s", self.device_name, len(data), saved_at)
+        return True
+
+    async def _async_check_fingerprint(self, deadline: float):
+        """Identify the device once; re-read restored rated values if it changed."""
+        timeout = min(IDENTIFICATION_TIMEOUT, deadline - time.monotonic())
+        if timeout <= 0:
+            return
+        try:
+            identification = await self.client.read_device_identification(timeout) or {}
+        except TimeoutError:
+            # No answer says nothing about the device: keep the stored fingerprint
+            _LOGGER.debug("%s: no answer to the identification request", self.device_name)
+            self.fingerprint = self._restored_fingerprint
+            self._fingerprint_checked = True
+            return
+        self.fingerprint = {
+            "model": self.profile.get("name"),
+            # String keys, as they come back from JSON storage
+            "identification": {str(key): value for key, value in identification.items()},
+        }
+        self._fingerprint_checked = True
+
+        restored = self._restored_fingerprint
+        if restored is not None and restored != self.fingerprint:
+            _LOGGER.info("%s: device identification changed, re-reading rated values", self.device_name)
+            for tier in self._once_tiers:
+                self._tier_last_read.pop(tier, None)
+            self._recheck_unreadable(time.monotonic())
+
+    def _save_snapshot(self, data: dict, now: float):
+        """Persist the decoded values for the next warm start, at most every few minutes."""
+        if self.store is None:
+            return
+        self.store.async_set_integrals(self.energy.as_dict())
+        if self._snapshot_saved is not None and now - self._snapshot_saved < SNAPSHOT_SAVE_INTERVAL:
+            return
+        self._snapshot_saved = now
+        self.store.async_set_snapshot(self.fingerprint, dt_util.utcnow().isoformat(), data)
+
+    def save_state(self):
+        """Persist values and energy accumulators now (unload, Home Assistant stopping)."""
+        if self.data:
+            self._snapshot_saved = None
+            self._save_snapshot(self.data, time.monotonic())
+
+    def reset_poll_schedule(self):
+        """Make every tier due on the next refresh, including read-once tiers."""
+        self._tier_last_read.clear()
+
+    def tier_ages(self, now: float) -> dict[str, float]:
+        """Seconds since each tier was last read completely."""
+        return {tier: now - last for tier, last in self._tier_last_read.items()}
+
+    def _due_tiers(self, now: float) -> list[str]:
+        """Return the tiers whose reads are due on this tick."""
+        # Half a tick of slack so timer jitter doesn't skip a whole tick
+        slack = self.poll_interval.total_seconds() / 2
+        due = []
+        for tier in self.read_plans:
+            last = self._tier_last_read.get(tier)
+            interval = self.tier_intervals.get(tier)
+            if tier in self._tick_tiers:
+                interval = 0
+            if last is None or (interval is not None and now - last >= interval - slack):
+                due.append(tier)
+        return due
+
     async def _async_update_data(self):
-        """Fetch data from Modbus and return cleaned, scaled values."""
+        """Fetch due tiers from Modbus and merge them into the cached values."""
+
+        # Keep values of tiers that are not due on this tick
+        result = dict(self.data or {})
+        now = time.monotonic()
+        self.changed_keys = set()
+
+        # Unreachable device: fail fast instead of waiting on timeouts
+        if not self.breaker.allow(now):
+            self._update_snapshot(now)
+            raise UpdateFailed(f"{self.device_name} is not answering, waiting to probe it")
+        if not await self._async_probe(now):
+            self._update_snapshot(now)
+            raise UpdateFailed(f"{self.device_name} is still not answering")
 
-        result = {}
+        cycle = self.metrics.start_cycle()
+        timeouts = self.metrics.timeouts
+        # Identification, block reads and bisection all fit in this
+        deadline = now + self.poll_interval.total_seconds() * CYCLE_DEADLINE
 
         try:
-            for sensor in self.profile["sensors"]:
+            if not self._fingerprint_checked:
+                await self._async_check_fingerprint(deadline)
 
-                key = sensor["key"]
-                reg = sensor["register"]
-                # support both "length" and "count"
-                count = sensor.get("length") or sensor.get("count") or 1
-                reg_type = sensor.get("reg_type") or sensor.get("type")
-                scale = sensor.get("scale")
+            if now - self._unreadable_checked >= UNREADABLE_RECHECK:
+                self._recheck_unreadable(now)
 
-                # Read register(s)
-                raw = await self.client.read_register(reg, count=count)
+            due_tiers = self._due_tiers(now)
+            due = [(tier, decoder) for tier in due_tiers for decoder in self.read_plans[tier]]
 
-                if raw is None:
+            # Issue all due block reads together; the gateway connection
+            # serialises them, or keeps several in flight when pipelining
+            responses = await self._async_read_blocks([decoder for _tier, decoder in due], deadline)
+
+            read_at = dt_util.utcnow()
+            failed_tiers = set()
+            stale = set()
+            fresh = set()
+            answered = False
+            rejected = []
+            for (tier, decoder), (regs, exception_code) in zip(due, responses):
+                block = decoder.block
+                if exception_code == ExcCodes.ILLEGAL_ADDRESS:
+                    rejected.append(block)
+                if exception_code is not None:
+                    # An exception response is still an answer
+                    answered = True
+
+                if regs is None or len(regs) != block.count:
                     _LOGGER.warning(
-                        "Failed to read register 0x%04X for key '%s'",
-                        reg, key
+                        "Failed to read block 0x%04X-0x%04X (%d sensors)",
+                        block.start, block.end - 1, len(block.sensors)
                     )
-                    result[key] = None
+                    # Last good values stay in result, marked stale
+                    stale.update(decoder.keys)
+                    failed_tiers.add(tier)
                     continue
 
-               # 32-bit (2-register) value: [L, H] -> H<<16 | L
-                if count == 2:
-                    value = (raw[1] << 16) | raw[0]
-                else:
-                    value = raw[0]
-                    if reg_type == "int16" and value > 0x7FFF:
-                        value -= 0x10000
+                result.update(decoder.decode(regs))
+                self.registers.update(block.reg_type, block.start, regs, now)
+                for key in decoder.keys:
+                    self.last_read[key] = read_at
+                fresh.update(decoder.keys)
+                answered = True
 
-                    # Signed conversion
-                    if reg_type == "int16" and value > 0x7FFF:
-                        value -= 0x10000
+            # Only a refresh without a single answer counts against the device
+            if answered:
+                self.breaker.record_success()
+            elif due:
+                self.breaker.record_failure(now)
 
-                # Apply scale if defined
-                if scale:
-                    value = value * scale
+            if rejected:
+                await self._async_isolate_unreadable(rejected, deadline)
 
-                result[key] = value
+            # Incomplete tiers are retried on the next tick
+            for tier in due_tiers:
+                if tier not in failed_tiers:
+                    self._tier_last_read[tier] = now
 
+            self.energy.add(result, fresh, read_at.timestamp())
+            self.virtual_data = {**self.virtual_plan.evaluate(result), **self.energy.values()}
+            self.changed_keys = self._detect_changes(result, now) | self._detect_changes(
+                self.virtual_data, now
+            )
+            # Entities going stale or fresh again write their state too
+            stale_keys = ((self.stale_keys | stale) - fresh) & self._planned_keys
+            self.changed_keys |= stale_keys ^ self.stale_keys
+            self.stale_keys = stale_keys
+            self.changed_keys |= self._update_stale_virtual()
+
+            self._save_snapshot(result, now)
             return result
 
         except Exception as e:
             _LOGGER.error("Unexpected Modbus update failure: %s", e)
             raise
+
+        finally:
+            self.metrics.end_cycle(cycle)
+            self._update_snapshot(now)
+            self._adapt_interval(result, self.metrics.timeouts - timeouts, time.monotonic())
+
+    async def _async_read_blocks(self, decoders: list[BlockDecoder], deadline: float) -> list:
+        """Read blocks concurrently until the cycle deadline (monotonic time).
+
+        Returns (registers, exception_code) per block, (None, None) for missed reads.
+        """
+        if not decoders:
+            return []
+        tasks = [
+            asyncio.ensure_future(
+                self.client.read_block(
+                    decoder.block.start,
+                    count=decoder.block.count,
+                    reg_type=decoder.block.reg_type,
+                )
+            )
+            for decoder in decoders
+        ]
+        done, pending = await asyncio.wait(tasks, timeout=max(0, deadline - time.monotonic()))
+
+        if pending:
+            for task in pending:
+                task.cancel()
+            # Let the cancelled requests hand their gateway sessions back
+            await asyncio.gather(*pending, return_exceptions=True)
+            self.metrics.record_deadline_miss()
+            _LOGGER.warning(
+                "%s: %d of %d block reads missed the %.1f s refresh deadline",
+                self.device_name, len(pending), len(tasks),
+                self.poll_interval.total_seconds() * CYCLE_DEADLINE,
+            )
+
+        return [task.result() if task in done else (None, None) for task in tasks]
+
+    async def _async_isolate_unreadable(self, blocks, deadline: float):
+        """Bisect blocks rejected with exception 02 and plan around the bad addresses.
+
+        Bisection stops at the cycle deadline (monotonic time); blocks left
+        undecided are rejected again and bisected on a later refresh.
+        """
+        found = {}
+        for block in blocks:
+            addresses = await bisect_rejected(
+                self.client, block.reg_type, block.start, block.count, deadline
+            )
+            if addresses is None:
+                _LOGGER.debug(
+                    "%s: could not isolate the rejected register in 0x%04X-0x%04X this refresh",
+                    self.device_name, block.start, block.end - 1
+                )
+                continue
+            found.setdefault(block.reg_type, set()).update(addresses)
+
+        if not any(found.values()):
+            return
+
+        for reg_type, addresses in found.items():
+            _LOGGER.warning(
+                "%s: device rejects %s registers %s, no longer reading them",
+                self.device_name,
+                reg_type,
+                ", ".join(f"0x{address:04X}" for address in sorted(addresses)),
+            )
+            self.unreadable.setdefault(reg_type, set()).update(addresses)
+
+        if self.store is not None:
+            self.store.async_set_unreadable(self.unreadable)
+        self._plan_reads()
+
+    def _recheck_unreadable(self, now: float):
+        """Forget the unreadable registers: those still rejected are found again."""
+        self._unreadable_checked = now
+        if not any(self.unreadable.values()):
+            return
+        _LOGGER.info("%s: re-probing the registers the device rejected", self.device_name)
+        self.unreadable.clear()
+        if self.store is not None:
+            self.store.async_set_unreadable(self.unreadable)
+        self._plan_reads()
+        # Sensors routed around may sit in read-once tiers
+        self._tier_last_read.clear()
+
+    async def _async_probe(self, now: float) -> bool:
+        """In half-open state, decide with one single-register read whether to poll again."""
+        if self.breaker.state != BREAKER_HALF_OPEN:
+            return True
+        block = self._probe_block
+        if block is None:
+            return True
+        if await self.client.read_register(block.start, count=1, reg_type=block.reg_type) is None:
+            self.breaker.record_failure(now)
+            return False
+        self.breaker.record_success()
+        return True
+
+    def _update_snapshot(self, now: float):
+        """Refresh the values shown by the diagnostic entities."""
+        self.metrics_snapshot = {**self.metrics.as_dict(), "breaker": self.breaker.as_dict(now)}
+
+    def _adapt_interval(self, data: dict, timeouts: int, now: float):
+        """Move the poll interval with the measured load and the night mode."""
+        if self._update_night(data, now):
+            interval = self.night_interval
+        else:
+            interval = self._day_interval or self.poll_interval.total_seconds()
+            load = (self.metrics.last_cycle_duration or 0) / interval
+            if timeouts or load > ADAPT_HIGH_LOAD:
+                interval *= ADAPT_BACKOFF
+            elif load < ADAPT_LOW_LOAD:
+                interval *= ADAPT_TIGHTEN
+            interval = min(max(interval, self.min_interval), self.max_interval)
+            self._day_interval = interval
+
+        if interval != self.poll_interval.total_seconds():
+            _LOGGER.debug(
+                "%s: poll interval %.1f s -> %.1f s%s",
+                self.device_name,
+                self.poll_interval.total_seconds(),
+                interval,
+                " (night)" if self.is_night else "",
+            )
+            self.poll_interval = timedelta(seconds=interval)
+
+    def _update_night(self, data: dict, now: float) -> bool:
+        """Track whether the night mode register has stayed below its threshold."""
+        if not self.night_mode or not self.night_interval:
+            return False
+        value = data.get(self.night_mode["key"])
+        if value is None:
+            # Unknown: keep the current mode
+            return self.is_night
+        if value >= self.night_mode["below"]:
+            if self.is_night:
+                _LOGGER.info("%s: leaving night mode", self.device_name)
+            self._dark_since = None
+            self.is_night = False
+            return False
+        if self._dark_since is None:
+            self._dark_since = now
+        if not self.is_night and now - self._dark_since >= self.night_mode.get("after", 0):
+            _LOGGER.info("%s: entering night mode", self.device_name)
+            self.is_night = True
+        return self.is_night
+
+    def _detect_changes(self, values: dict, now: float) -> set[str]:
+        """Return the keys to publish, remembering what was published."""
+        changed = set()
+        for key, value in values.items():
+            if key in self._published:
+                last_value, last_time = self._published[key]
+                silent_too_long = self.heartbeat and now - last_time >= self.heartbeat
+                if not silent_too_long and not self._moved(key, last_value, value):
+                    continue
+            self._published[key] = (value, now)
+            changed.add(key)
+        return changed
+
+    def _moved(self, key: str, last_value, value) -> bool:
+        """Whether a value differs from the published one by at least its deadband."""
+        if value == last_value:
+            return False
+        deadband = self.deadbands.get(key)
+        if deadband and isinstance(value, (int, float)) and isinstance(last_value, (int, float)):
+            # Rounded so float noise doesn't hide a change of exactly one deadband
+            return round(abs(value - last_value), 9) >= deadband
+        return True
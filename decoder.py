@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import logging
+import struct
+
+from .formulas import FORMULAS
+from .planner import ReadBlock, sensor_length
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# ============================================================
+#  BLOCK DECODER
+# ============================================================
+
+def sensor_signed(sensor: dict) -> bool:
+    """Whether a sensor holds a two's complement value ("int16" is the legacy spelling)."""
+    return bool(sensor.get("signed")) or sensor.get("type") == "int16"
+
+
+class BlockDecoder:
+    """
+    Decode plan for one read block, compiled once at setup.
+
+    Registers are packed little-endian word by word, which turns Epever's
+    [L, H] register pairs into little-endian 32-bit integers, so the whole
+    block is decoded by a single precompiled struct unpack (holes between
+    sensors become pad bytes).
+    """
+
+    def __init__(self, block: ReadBlock):
+        self.block = block
+        self.keys: list[str] = []
+        self._pack = struct.Struct(f"<{block.count}H")
+        # (index into keys, scale) for sensors with a scale
+        self._scaled: list[tuple[int, float]] = []
+
+        fmt = "<"
+        position = 0
+        fields = []
+        for sensor in sorted(block.sensors, key=lambda s: s["register"]):
+            offset = sensor["register"] - block.start
+            width = sensor_length(sensor)
+            code = {1: "H", 2: "I"}.get(width)
+            if code is None:
+                raise ValueError(f"Unsupported register width {width} for '{sensor['key']}'")
+            if sensor_signed(sensor):
+                code = code.lower()
+            fields.append((offset, width, code))
+
+            if offset < position:
+                # Overlapping sensors can't share one format
+                fmt = None
+            elif fmt is not None:
+                fmt += "x" * (2 * (offset - position)) + code
+                position = offset + width
+
+            if sensor.get("scale"):
+                self._scaled.append((len(self.keys), sensor["scale"]))
+            self.keys.append(sensor["key"])
+
+        if fmt is not None:
+            fmt += "x" * (2 * (block.count - position))
+            self._unpack = struct.Struct(fmt).unpack
+        else:
+            self._fields = [
+                (2 * offset, struct.Struct("<" + code)) for offset, _width, code in fields
+            ]
+            self._unpack = self._unpack_fields
+
+    def _unpack_fields(self, data: bytes) -> tuple:
+        """Fallback for overlapping sensors: one unpack per sensor."""
+        return tuple(field.unpack_from(data, start)[0] for start, field in self._fields)
+
+    def unpack(self, registers: list[int]) -> tuple:
+        """Unscaled sensor values of a block response, in `keys` order."""
+        return self._unpack(self._pack.pack(*registers))
+
+    def decode(self, registers: list[int]) -> dict:
+        """Decode a block response into {key: value}."""
+        values = self.unpack(registers)
+        if not self._scaled:
+            return dict(zip(self.keys, values))
+
+        values = list(values)
+        for index, scale in self._scaled:
+            values[index] = values[index] * scale
+        return dict(zip(self.keys, values))
+
+    def empty(self) -> dict:
+        """Values for a block that could not be read."""
+        return dict.fromkeys(self.keys)
+
+
+# ============================================================
+#  VIRTUAL SENSORS
+# ============================================================
+
+class _KeyRecorder(dict):
+    """Empty data dict noting the keys a formula reads."""
+
+    def __init__(self):
+        super().__init__()
+        self.read: set[str] = set()
+
+    def get(self, key, default=None):
+        self.read.add(key)
+        return default
+
+    def __getitem__(self, key):
+        self.read.add(key)
+        raise KeyError(key)
+
+
+class VirtualSensorPlan:
+    """Virtual sensor formulas resolved once, evaluated once per refresh."""
+
+    def __init__(self, virtual_sensors: list[dict]):
+        self._entries: list[tuple[str, object, int | None]] = []
+        # key -> raw keys the formula reads (found by running it on no data)
+        self.inputs: dict[str, frozenset[str]] = {}
+
+        for vcfg in virtual_sensors:
+            func = FORMULAS.get(vcfg["formula"])
+            if func is None:
+                _LOGGER.error(
+                    "No formula '%s' defined for virtual sensor '%s'",
+                    vcfg["formula"], vcfg["key"]
+                )
+            self._entries.append((vcfg["key"], func, vcfg.get("precision")))
+            self.inputs[vcfg["key"]] = self._inputs(func)
+
+    @staticmethod
+    def _inputs(func) -> frozenset[str]:
+        if func is None:
+            return frozenset()
+        recorder = _KeyRecorder()
+        try:
+            func(recorder)
+        except Exception:
+            pass
+        return frozenset(recorder.read)
+
+    def evaluate(self, data: dict) -> dict:
+        """Compute every virtual sensor value from the raw data dict."""
+        values = {}
+        for key, func, precision in self._entries:
+            if func is None:
+                values[key] = None
+                continue
+            try:
+                val = func(data)
+            except Exception as e:
+                _LOGGER.error("Error computing virtual sensor '%s': %s", key, e)
+                val = None
+
+            if precision is not None and val is not None:
+                val = round(val, precision)
+            values[key] = val
+        return values
+
+
+def compile_virtual_sensors(profile: dict) -> VirtualSensorPlan:
+    """Resolve the profile's virtual sensor formulas."""
+    return VirtualSensorPlan(profile.get("virtual_sensors", []))
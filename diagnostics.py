@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import time
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {"host"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return diagnostics for a config entry: read plan, poll metrics and last values."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = data["coordinator"]
+    now = time.monotonic()
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "profile": data["profile"].get("name"),
+        "poll_interval": coordinator.poll_interval.total_seconds(),
+        "tier_intervals": coordinator.tier_intervals,
+        "read_plan": {
+            tier: [
+                {
+                    "reg_type": decoder.block.reg_type,
+                    "start": f"0x{decoder.block.start:04X}",
+                    "count": decoder.block.count,
+                    "sensors": len(decoder.block.sensors),
+                }
+                for decoder in plan
+            ]
+            for tier, plan in coordinator.read_plans.items()
+        },
+        "tier_age_seconds": {
+            tier: round(age, 1) for tier, age in coordinator.tier_ages(now).items()
+        },
+        "unreadable_registers": {
+            reg_type: [f"0x{address:04X}" for address in sorted(addresses)]
+            for reg_type, addresses in coordinator.unreadable.items()
+        },
+        "last_update_success": coordinator.last_update_success,
+        "metrics": {**coordinator.metrics.as_dict(), "breaker": coordinator.breaker.as_dict(now)},
+        "energy": coordinator.energy.as_dict(),
+        "proxy": data["proxy"].as_dict() if "proxy" in data else None,
+        "data": coordinator.data,
+        "virtual_data": coordinator.virtual_data,
+    }
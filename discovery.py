@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from .const import (
+    DEVICE_TYPES,
+    DISCOVERY_BLOCK,
+    DISCOVERY_CONCURRENCY,
+    DISCOVERY_SLAVES,
+    DISCOVERY_TIMEOUT,
+)
+from .decoder import BlockDecoder, compile_virtual_sensors
+from .planner import ReadBlock
+from .modbus_client import POOL, ModbusConnectionPool
+from .vendor.pymodbus.exceptions import ModbusIOException
+
+_LOGGER = logging.getLogger(__name__)
+
+_LABEL_KEYS = ("array_rated_voltage", "array_rated_current", "battery_rated_voltage")
+
+
+@dataclass
+class DiscoveredDevice:
+    """A unit id that answered the discovery probe."""
+
+    slave: int
+    rated: dict
+
+    @property
+    def label(self) -> str:
+        """Short description for the config flow."""
+        rated = self.rated
+        if any(rated.get(key) is None for key in _LABEL_KEYS):
+            return f"Unit {self.slave} (unidentified)"
+        return (
+            f"Unit {self.slave}: array {rated['array_rated_voltage']:g} V / "
+            f"{rated['array_rated_current']:g} A, battery {rated['battery_rated_voltage']:g} V"
+        )
+
+
+def _rated_decoder(profile: dict) -> BlockDecoder:
+    """Decoder for the profile's sensors inside the discovery block."""
+    start, count = DISCOVERY_BLOCK
+    sensors = [
+        s for s in profile["sensors"]
+        if start <= s["register"] < start + count and s.get("type", "input") == "input"
+    ]
+    return BlockDecoder(ReadBlock("input", start, count, sensors))
+
+
+async def scan_gateway(
+    host: str,
+    port: int,
+    slaves=DISCOVERY_SLAVES,
+    concurrency: int = DISCOVERY_CONCURRENCY,
+    timeout: float = DISCOVERY_TIMEOUT,
+    profile: dict | None = None,
+    pool: ModbusConnectionPool = POOL,
+) -> list[DiscoveredDevice]:
+    """
+    Find the unit ids answering on a gateway.
+
+    Each unit is probed with one read of the rated-value block, which also
+    identifies it. Probes use a short timeout and no retries, and up to
+    `concurrency` of them are in flight (Modbus TCP transaction ids) on a
+    probe session of the pooled gateway connection, so a full 1-247 scan
+    takes seconds and leaves the entries' own sessions alone. Units that
+    didn't answer in time, e.g. queued behind other probes at the gateway,
+    are probed once more.
+
+    Raises ConnectionError if the gateway can't be reached.
+    """
+    profile = profile or next(iter(DEVICE_TYPES.values()))
+    decoder = _rated_decoder(profile)
+    virtual = compile_virtual_sensors(profile)
+    start, count = DISCOVERY_BLOCK
+    slaves = list(slaves)
+
+    gateway = pool.acquire(host, port)
+    session = gateway.open_session(concurrency, timeout=timeout, retries=0)
+    # Silent units are expected here: don't drop the connection after a
+    # few unanswered requests in a row (every unit may be probed twice)
+    session.ctx.max_until_disconnect = 2 * len(slaves) + 1
+
+    timed_out: list[int] = []
+
+    async def probe(slave: int) -> DiscoveredDevice | None:
+        try:
+            resp = await session.read_input_registers(start, count=count, device_id=slave)
+        except ModbusIOException:
+            timed_out.append(slave)
+            return None
+        except Exception:
+            return None
+        if resp.isError():
+            # Answered, but not with the Epever rated-value block
+            return DiscoveredDevice(slave, {})
+        data = decoder.decode(resp.registers)
+        return DiscoveredDevice(slave, virtual.evaluate(data))
+
+    try:
+        if not await session.connect():
+            raise ConnectionError(f"Modbus gateway {host}:{port} not reachable")
+        results = await asyncio.gather(*(probe(slave) for slave in slaves))
+        retry, timed_out[:] = list(timed_out), []
+        results += await asyncio.gather(*(probe(slave) for slave in retry))
+    finally:
+        session.close()
+        pool.release(gateway)
+
+    found = sorted(
+        (device for device in results if device is not None), key=lambda device: device.slave
+    )
+    _LOGGER.debug("Discovery on %s:%s found units %s", host, port, [d.slave for d in found])
+    return found
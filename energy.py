@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import logging
+
+from .const import INTEGRATION_MAX_GAP
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class EnergyIntegrator:
+    """
+    Local Wh / Ah accumulators of one device (the profile's "integrals").
+
+    Each accumulator integrates its source (a power or current register)
+    trapezoidally between two successive reads, using the time of each
+    read. Intervals longer than `max_gap` seconds (device unreachable,
+    Home Assistant stopped) are skipped rather than guessed. All
+    accumulators restart from 0 when one of the controller's own daily
+    counters ("day_counters") goes down, i.e. at the controller's midnight.
+    The counters may be read less often than the sources, so the reset
+    keeps what was integrated since the last read that still showed the
+    previous day.
+    """
+
+    def __init__(self, profile: dict, max_gap: float = INTEGRATION_MAX_GAP):
+        self.integrals = profile.get("integrals", [])
+        self.day_counters = profile.get("day_counters", [])
+        self.max_gap = max_gap
+        self.sources = {cfg["source"] for cfg in self.integrals}
+
+        self.totals: dict[str, float] = {cfg["key"]: 0.0 for cfg in self.integrals}
+        # key -> (timestamp, value) of the last sample
+        self._last: dict[str, tuple[float, float]] = {}
+        # Last value of each daily counter
+        self._day: dict[str, int] = {}
+        # Totals when the daily counters were last read
+        self._day_totals: dict[str, float] = dict(self.totals)
+
+    def add(self, data: dict, fresh: set[str], timestamp: float):
+        """Integrate the fresh values of a refresh read at `timestamp` (epoch seconds)."""
+        rolled = self._rolled_over(data, fresh)
+        if rolled:
+            _LOGGER.debug("Controller day rollover, resetting %s", list(self.totals))
+            # Midnight passed after the previous counter read: restart from
+            # what was integrated since then rather than dropping it
+            self.totals = {
+                key: max(0.0, total - self._day_totals.get(key, 0.0))
+                for key, total in self.totals.items()
+            }
+
+        for cfg in self.integrals:
+            source = cfg["source"]
+            if source not in fresh or data.get(source) is None:
+                continue
+            key = cfg["key"]
+            value = data[source] * cfg.get("scale", 1)
+            last = self._last.get(key)
+            if last is not None and 0 < timestamp - last[0] <= self.max_gap:
+                # Units per hour (W, A) -> Wh, Ah
+                self.totals[key] += (last[1] + value) / 2 * (timestamp - last[0]) / 3600
+            self._last[key] = (timestamp, value)
+
+        if any(counter in fresh for counter in self.day_counters):
+            self._day_totals = dict(self.totals)
+
+    def _rolled_over(self, data: dict, fresh: set[str]) -> bool:
+        rolled = False
+        for counter in self.day_counters:
+            value = data.get(counter)
+            if counter not in fresh or value is None:
+                continue
+            last = self._day.get(counter)
+            if last is not None and value < last:
+                rolled = True
+            self._day[counter] = value
+        return rolled
+
+    def values(self) -> dict:
+        """Accumulator values, rounded per the profile's "precision"."""
+        return {
+            cfg["key"]: round(self.totals[cfg["key"]], cfg.get("precision", 3))
+            for cfg in self.integrals
+        }
+
+    def as_dict(self) -> dict:
+        """State to persist across restarts."""
+        return {
+            "totals": self.totals,
+            "last": {key: list(sample) for key, sample in self._last.items()},
+            "day": self._day,
+            "day_totals": self._day_totals,
+        }
+
+    def restore(self, state: dict | None):
+        """Resume from state saved by as_dict."""
+        if not state:
+            return
+        for key, total in state.get("totals", {}).items():
+            if key in self.totals:
+                self.totals[key] = total
+        self._last = {
+            key: tuple(sample) for key, sample in state.get("last", {}).items() if key in self.totals
+        }
+        self._day = dict(state.get("day", {}))
+        # Older state: count from the restored totals
+        self._day_totals = {**self.totals, **{
+            key: total for key, total in state.get("day_totals", {}).items() if key in self.totals
+        }}
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import bisect
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+
+# Upper bounds (ms) of the request round-trip histogram buckets; the last
+# bucket counts everything slower
+RTT_BUCKETS_MS = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Poll cycles kept for the duration averages
+CYCLE_WINDOW = 60
+
+
+# ============================================================
+#  GATEWAY COUNTERS
+# ============================================================
+
+@dataclass
+class GatewayStats:
+    """Traffic counters of one gateway connection, shared by its devices."""
+
+    bytes_out: int = 0
+    bytes_in: int = 0
+    connects: int = 0
+    disconnects: int = 0
+
+    @property
+    def reconnects(self) -> int:
+        """Connections made after the first one."""
+        return max(0, self.connects - 1)
+
+    def trace_packet(self, sending: bool, data: bytes) -> bytes:
+        """pymodbus trace_packet hook: count the bytes on the wire."""
+        if sending:
+            self.bytes_out += len(data)
+        else:
+            self.bytes_in += len(data)
+        return data
+
+    def trace_connect(self, connected: bool) -> None:
+        """pymodbus trace_connect hook."""
+        if connected:
+            self.connects += 1
+        else:
+            self.disconnects += 1
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "reconnects": self.reconnects}
+
+
+# ============================================================
+#  PER-DEVICE POLL METRICS
+# ============================================================
+
+class PollMetrics:
+    """Request and poll cycle metrics of one device."""
+
+    def __init__(self, gateway: GatewayStats | None = None):
+        self.gateway = gateway or GatewayStats()
+
+        self.requests = 0
+        self.failures = 0
+        self.timeouts = 0
+        # Requests cut short by the caller (refresh deadline), not failures
+        self.cancelled = 0
+        self.retries = 0
+        self.registers = 0
+        self.rtt_histogram = [0] * (len(RTT_BUCKETS_MS) + 1)
+        self._rtt_total = 0.0
+
+        self.cycles = 0
+        self.deadline_misses = 0
+        self.last_cycle_duration: float | None = None
+        self.last_cycle_registers = 0
+        self._cycle_durations: deque[float] = deque(maxlen=CYCLE_WINDOW)
+        self._cycle_registers = 0
+
+    # ----- requests -----
+
+    def record_request(self, rtt: float, registers: int = 0, retries: int = 0):
+        """Record an answered request (`rtt` in seconds, retries included)."""
+        self.requests += 1
+        self.retries += retries
+        self.registers += registers
+        self._cycle_registers += registers
+        self._rtt_total += rtt
+        self.rtt_histogram[bisect.bisect_left(RTT_BUCKETS_MS, rtt * 1000)] += 1
+
+    def record_failure(self, timeout: bool = False):
+        """Record a request that got no usable response."""
+        self.requests += 1
+        self.failures += 1
+        if timeout:
+            self.timeouts += 1
+
+    def record_cancelled(self):
+        """Record a request cancelled by the caller, e.g. at the refresh deadline."""
+        self.cancelled += 1
+
+    @property
+    def rtt_average(self) -> float | None:
+        """Mean round-trip time of answered requests, in seconds."""
+        answered = self.requests - self.failures
+        return self._rtt_total / answered if answered else None
+
+    def rtt_percentile(self, pct: float) -> float | None:
+        """Approximate round-trip percentile (upper bucket bound), in seconds."""
+        total = sum(self.rtt_histogram)
+        if not total:
+            return None
+        rank = total * pct / 100
+        seen = 0
+        for bound, count in zip(RTT_BUCKETS_MS, self.rtt_histogram):
+            seen += count
+            if seen >= rank:
+                return bound / 1000
+        return None
+
+    # ----- poll cycles -----
+
+    def start_cycle(self) -> float:
+        """Mark the start of a poll cycle; returns the start time."""
+        self._cycle_registers = 0
+        return time.perf_counter()
+
+    def record_deadline_miss(self):
+        """Record a poll cycle cut short by its deadline."""
+        self.deadline_misses += 1
+
+    def end_cycle(self, started: float):
+        """Mark the end of the poll cycle started at `started`."""
+        duration = time.perf_counter() - started
+        self.cycles += 1
+        self.last_cycle_duration = duration
+        self.last_cycle_registers = self._cycle_registers
+        self._cycle_durations.append(duration)
+
+    @property
+    def cycle_average(self) -> float | None:
+        """Mean duration of the recent poll cycles, in seconds."""
+        if not self._cycle_durations:
+            return None
+        return sum(self._cycle_durations) / len(self._cycle_durations)
+
+    @property
+    def registers_per_second(self) -> float | None:
+        """Register throughput of the last poll cycle."""
+        if not self.last_cycle_duration:
+            return None
+        return self.last_cycle_registers / self.last_cycle_duration
+
+    def as_dict(self) -> dict:
+        """Snapshot for diagnostics."""
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "retries": self.retries,
+            "registers": self.registers,
+            "rtt_average_ms": _ms(self.rtt_average),
+            "rtt_p95_ms": _ms(self.rtt_percentile(95)),
+            "rtt_histogram_ms": self.rtt_buckets(),
+            "cycles": self.cycles,
+            "deadline_misses": self.deadline_misses,
+            "last_cycle_ms": _ms(self.last_cycle_duration),
+            "average_cycle_ms": _ms(self.cycle_average),
+            "registers_per_second": self.registers_per_second,
+            "gateway": self.gateway.as_dict(),
+        }
+
+    def rtt_buckets(self) -> dict[str, int]:
+        """Round-trip histogram keyed by bucket ("<=20", ..., ">5000")."""
+        buckets = {f"<={bound}": count for bound, count in zip(RTT_BUCKETS_MS, self.rtt_histogram)}
+        buckets[f">{RTT_BUCKETS_MS[-1]}"] = self.rtt_histogram[-1]
+        return buckets
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 2)
@@ -2,50 +2,288 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
+from collections import deque
 
+from .const import DEFAULT_GATEWAY_SESSIONS, DEFAULT_PIPELINE_WINDOW
+from .metrics import GatewayStats, PollMetrics
+from .packet_trace import PacketRecorder
 from .vendor.pymodbus.client import AsyncModbusTcpClient
-from .vendor.pymodbus.exceptions import ModbusException
+from .vendor.pymodbus.exceptions import ModbusException, ModbusIOException
 
 _LOGGER = logging.getLogger(__name__)
 
 
+# ============================================================
+#  SHARED GATEWAY CONNECTIONS
+# ============================================================
+
+class GatewayConnection:
+    """
+    TCP session(s) to one Modbus gateway, shared by every slave behind it.
+
+    Requests are handed a session in round-robin order between owners
+    (one owner per EpeverModbusClient), so a device issuing many reads
+    back-to-back cannot starve the other devices on the same bus.
+
+    With a pipeline window above 1 each session keeps that many requests
+    in flight (Modbus TCP transaction ids match the responses), so every
+    session is handed out `pipeline_window` times.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        max_sessions: int = DEFAULT_GATEWAY_SESSIONS,
+        pipeline_window: int = DEFAULT_PIPELINE_WINDOW,
+    ):
+        self.host = host
+        self.port = port
+        self.max_sessions = max(1, max_sessions)
+        self.pipeline_window = max(1, pipeline_window)
+        self.refs = 0
+        self.stats = GatewayStats()
+        # Optional PacketRecorder fed with the raw traffic
+        self.recorder = None
+
+        self._sessions: list[AsyncModbusTcpClient] = []
+        # One connect at a time per session: with a pipeline window above 1
+        # several slot holders share the session
+        self._connect_locks: dict[AsyncModbusTcpClient, asyncio.Lock] = {}
+        self._idle: deque[AsyncModbusTcpClient] = deque()
+        self._queues: dict[object, deque[asyncio.Future]] = {}
+        self._turns: deque[object] = deque()
+
+    def _ensure_sessions(self):
+        """Create the session objects (connected lazily on first use)."""
+        while len(self._sessions) < self.max_sessions:
+            session = self.open_session(self.pipeline_window)
+            self._sessions.append(session)
+            self._connect_locks[session] = asyncio.Lock()
+            # One slot per request the session may have in flight
+            self._idle.extend([session] * self.pipeline_window)
+
+    def open_session(self, pipeline_window: int, **kwargs) -> AsyncModbusTcpClient:
+        """
+        Create a session to the gateway, its traffic counted in `stats`.
+
+        Sessions not created by the connection itself (e.g. for a discovery
+        scan) are connected and closed by the caller.
+        """
+        session = AsyncModbusTcpClient(
+            host=self.host,
+            port=self.port,
+            trace_packet=self._trace_packet,
+            trace_connect=self._trace_connect,
+            **kwargs,
+        )
+        session.set_max_in_flight(pipeline_window)
+        return session
+
+    def _trace_packet(self, sending: bool, data: bytes) -> bytes:
+        if self.recorder is not None:
+            self.recorder.packet(sending, data)
+        return self.stats.trace_packet(sending, data)
+
+    def _trace_connect(self, connected: bool) -> None:
+        if self.recorder is not None:
+            self.recorder.connection(connected)
+        self.stats.trace_connect(connected)
+
+    async def connect(self):
+        """Make sure a session to the gateway is connected."""
+        async def noop(_session):
+            return None
+
+        await self.request(self, noop)
+
+    async def request(self, owner, call):
+        """Run `call(session)` on a free session, in fair turn with other owners."""
+        session = await self._acquire(owner)
+        try:
+            if not session.connected:
+                await self._connect(session)
+            return await call(session)
+        finally:
+            self._release(session)
+
+    async def _connect(self, session: AsyncModbusTcpClient):
+        """Connect a session once, however many of its slots are waiting for it."""
+        async with self._connect_locks[session]:
+            if not session.connected:
+                await session.connect()
+        if not session.connected:
+            raise ConnectionError(f"Modbus gateway {self.host}:{self.port} not connected")
+
+    async def _acquire(self, owner) -> AsyncModbusTcpClient:
+        self._ensure_sessions()
+
+        # Fast path: a session is free and nobody is waiting
+        if self._idle and not self._turns:
+            return self._idle.popleft()
+
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.setdefault(owner, deque())
+        queue.append(future)
+        if len(queue) == 1:
+            self._turns.append(owner)
+        self._dispatch()
+
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Granted at the same moment we were cancelled: give it back
+            if future.done() and not future.cancelled():
+                self._release(future.result())
+            raise
+
+    def _release(self, session: AsyncModbusTcpClient):
+        self._idle.append(session)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free session slots to waiting owners, one request per turn."""
+        while self._idle and self._turns:
+            owner = self._turns.popleft()
+            queue = self._queues[owner]
+            future = queue.popleft()
+
+            if queue:
+                self._turns.append(owner)
+            else:
+                del self._queues[owner]
+
+            # Skip requests cancelled while waiting
+            if not future.done():
+                future.set_result(self._idle.popleft())
+
+    def close(self):
+        """Close every session."""
+        for session in self._sessions:
+            session.close()
+        self._sessions.clear()
+        self._connect_locks.clear()
+        self._idle.clear()
+
+
+class ModbusConnectionPool:
+    """Process-wide, reference-counted gateway connections keyed by (host, port)."""
+
+    def __init__(self):
+        self._connections: dict[tuple[str, int], GatewayConnection] = {}
+
+    def acquire(
+        self,
+        host: str,
+        port: int,
+        max_sessions: int = DEFAULT_GATEWAY_SESSIONS,
+        pipeline_window: int = DEFAULT_PIPELINE_WINDOW,
+    ) -> GatewayConnection:
+        """
+        Return the shared connection for a gateway, taking a reference.
+
+        The first entry on a gateway decides its session and pipeline settings.
+        """
+        key = (host, port)
+        connection = self._connections.get(key)
+        if connection is None:
+            connection = self._connections[key] = GatewayConnection(
+                host, port, max_sessions, pipeline_window
+            )
+        connection.refs += 1
+        return connection
+
+    def release(self, connection: GatewayConnection):
+        """Drop a reference; the last one closes the gateway's sessions."""
+        connection.refs -= 1
+        if connection.refs > 0:
+            return
+
+        self._connections.pop((connection.host, connection.port), None)
+        connection.close()
+        _LOGGER.info("Closed Modbus connection to %s:%s", connection.host, connection.port)
+
+    def __len__(self):
+        return len(self._connections)
+
+
+POOL = ModbusConnectionPool()
+
+
+# ============================================================
+#  PER-DEVICE CLIENT
+# ============================================================
+
 class EpeverModbusClient:
     """Async Modbus TCP client using vendored pymodbus 3.11.4."""
 
-    def __init__(self, host: str, port: int, slave: int):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        slave: int,
+        pipeline_window: int = DEFAULT_PIPELINE_WINDOW,
+        pool: ModbusConnectionPool = POOL,
+    ):
         self._host = host
         self._port = port
         self._slave = slave
-        self._client: AsyncModbusTcpClient | None = None
-        self._lock = asyncio.Lock()
+        self._pipeline_window = pipeline_window
+        self._pool = pool
+        self._gateway: GatewayConnection | None = None
+        self.metrics = PollMetrics()
+
+    @property
+    def gateway(self) -> tuple[str, int]:
+        """The (host, port) of the gateway this device is reached through."""
+        return (self._host, self._port)
+
+    @property
+    def pipeline_window(self) -> int:
+        """Requests this device's gateway may keep in flight."""
+        return self._pipeline_window
 
     async def connect(self):
-        """Connect to the Modbus TCP device."""
+        """Connect to the Modbus TCP device (through its shared gateway connection)."""
         _LOGGER.debug("Connecting to Modbus %s:%s", self._host, self._port)
 
-        try:
-            self._client = AsyncModbusTcpClient(
-                host=self._host,
-                port=self._port,
+        if self._gateway is None:
+            self._gateway = self._pool.acquire(
+                self._host, self._port, pipeline_window=self._pipeline_window
             )
+            self.metrics.gateway = self._gateway.stats
 
-            await self._client.connect()
-
-            if not self._client.connected:
-                raise ConnectionError("Failed to connect to Modbus device")
-
+        try:
+            await self._gateway.connect()
             _LOGGER.info("Connected to Modbus device at %s:%s", self._host, self._port)
 
         except Exception as err:
             _LOGGER.error("Modbus connection error: %s", err)
+            await self.close()
             raise
 
+    async def start_trace(self) -> PacketRecorder:
+        """Start recording the gateway's raw traffic (every device on it)."""
+        if not self._gateway:
+            await self.connect()
+        if self._gateway.recorder is not None:
+            raise ValueError(f"Already recording {self._host}:{self._port}")
+        self._gateway.recorder = PacketRecorder()
+        return self._gateway.recorder
+
+    def stop_trace(self) -> PacketRecorder | None:
+        """Stop recording; returns the recorder."""
+        if not self._gateway:
+            return None
+        recorder, self._gateway.recorder = self._gateway.recorder, None
+        return recorder
+
     async def close(self):
-        """Close the connection."""
-        if self._client:
-            await self._client.close()
-            _LOGGER.info("Closed Modbus connection")
-            self._client = None
+        """Release this device's reference on the gateway connection."""
+        if self._gateway:
+            self._pool.release(self._gateway)
+            self._gateway = None
 
     async def read_register(self, register: int, count: int = 1, reg_type: str = "input"):
         """
@@ -55,36 +293,148 @@ class EpeverModbusClient:
             "input"   -> function 0x04
             "holding" -> function 0x03
         """
-        if not self._client:
-            await self.connect()
+        registers, _exception_code = await self.read_block(register, count, reg_type)
+        return registers
+
+    async def read_block(
+        self, register: int, count: int = 1, reg_type: str = "input"
+    ) -> tuple[list[int] | None, int | None]:
+        """
+        Read registers like read_register, returning (registers, exception_code).
 
-        async with self._lock:
-            try:
-                if reg_type == "input":
-                    resp = await self._client.read_input_registers(
-                        address=register,
-                        count=count,
-                        device_id=self._slave,
-                    )
-                else:
-                    resp = await self._client.read_holding_registers(
-                        address=register,
-                        count=count,
-                        device_id=self._slave,
-                    )
-
-            except ModbusException as err:
-                _LOGGER.error("Modbus error reg 0x%04X: %s", register, err)
-                return None
-            except Exception as err:
-                _LOGGER.error("Unexpected Modbus error reg 0x%04X: %s", register, err)
-                return None
+        exception_code is the Modbus exception the device answered with
+        (e.g. 2, illegal data address), None otherwise.
+        """
+        async def call(session: AsyncModbusTcpClient):
+            # Timed once a session is ours, so queueing isn't counted as round trip
+            nonlocal started
+            started = time.perf_counter()
+            if reg_type == "input":
+                return await session.read_input_registers(
+                    address=register,
+                    count=count,
+                    device_id=self._slave,
+                )
+            return await session.read_holding_registers(
+                address=register,
+                count=count,
+                device_id=self._slave,
+            )
+
+        started = None
+        try:
+            if not self._gateway:
+                await self.connect()
+            resp = await self._gateway.request(self, call)
+
+        except asyncio.CancelledError:
+            self.metrics.record_cancelled()
+            raise
+        except ModbusIOException as err:
+            if isinstance(err.__cause__, asyncio.CancelledError):
+                # Cut short by the caller (refresh deadline): not a timeout
+                self.metrics.record_cancelled()
+                raise asyncio.CancelledError from err
+            _LOGGER.error("Modbus error reg 0x%04X: %s", register, err)
+            self.metrics.record_failure(timeout=True)
+            return None, None
+        except ModbusException as err:
+            _LOGGER.error("Modbus error reg 0x%04X: %s", register, err)
+            self.metrics.record_failure()
+            return None, None
+        except Exception as err:
+            _LOGGER.error("Unexpected Modbus error reg 0x%04X: %s", register, err)
+            self.metrics.record_failure()
+            return None, None
 
         if not resp or resp.isError():
             _LOGGER.error("Bad Modbus response reg 0x%04X: %s", register, resp)
+            self.metrics.record_failure()
+            return None, getattr(resp, "exception_code", None) or None
+
+        self.metrics.record_request(
+            time.perf_counter() - started, len(resp.registers), getattr(resp, "retries", 0)
+        )
+        return resp.registers, None
+
+    async def write_registers(self, register: int, values: list[int]) -> bool:
+        """Write a run of holding registers in one request (function 0x10)."""
+        async def call(session: AsyncModbusTcpClient):
+            nonlocal started
+            started = time.perf_counter()
+            return await session.write_registers(
+                address=register,
+                values=values,
+                device_id=self._slave,
+            )
+
+        started = None
+        try:
+            if not self._gateway:
+                await self.connect()
+            resp = await self._gateway.request(self, call)
+
+        except asyncio.CancelledError:
+            self.metrics.record_cancelled()
+            raise
+        except ModbusIOException as err:
+            if isinstance(err.__cause__, asyncio.CancelledError):
+                self.metrics.record_cancelled()
+                raise asyncio.CancelledError from err
+            _LOGGER.error("Modbus write error reg 0x%04X: %s", register, err)
+            self.metrics.record_failure(timeout=True)
+            return False
+        except Exception as err:
+            _LOGGER.error("Modbus write error reg 0x%04X: %s", register, err)
+            self.metrics.record_failure()
+            return False
+
+        if not resp or resp.isError():
+            _LOGGER.error("Bad Modbus write response reg 0x%04X: %s", register, resp)
+            self.metrics.record_failure()
+            return False
+
+        self.metrics.record_request(
+            time.perf_counter() - started, len(values), getattr(resp, "retries", 0)
+        )
+        return True
+
+    async def read_device_identification(self, timeout: float | None = None) -> dict[int, str] | None:
+        """
+        Read the basic device identification (FC43/14: vendor, product code, revision).
+
+        None if the device doesn't support it. With a timeout, a single
+        attempt is made and TimeoutError raised when it isn't answered in time.
+        """
+        async def call(session: AsyncModbusTcpClient):
+            # Cancelled before the session's own retries kick in
+            return await asyncio.wait_for(session.read_device_information(device_id=self._slave), timeout)
+
+        try:
+            if not self._gateway:
+                await self.connect()
+            resp = await self._gateway.request(self, call)
+        except asyncio.TimeoutError as err:
+            raise TimeoutError(f"No device identification within {timeout} s") from err
+        except ModbusIOException as err:
+            if timeout is not None:
+                raise TimeoutError(str(err)) from err
+            _LOGGER.debug("Device identification not available: %s", err)
+            return None
+        except Exception as err:
+            _LOGGER.debug("Device identification not available: %s", err)
+            return None
+
+        if not resp or resp.isError():
+            _LOGGER.debug("Device identification not supported: %s", resp)
             return None
 
-        return resp.registers
+        info = {}
+        for object_id, value in resp.information.items():
+            if isinstance(value, list):
+                value = b"".join(value)
+            info[object_id] = value.decode(errors="replace") if isinstance(value, bytes) else str(value)
+        return info
 
     async def read_int(self, register: int, reg_type: str = "input") -> int | None:
         """Read a single register and return its integer value."""
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import DATA_ORCHESTRATOR, ORCHESTRATOR_TICK
+
+_LOGGER = logging.getLogger(__name__)
+
+# Fractional part of k * golden ratio spreads start offsets evenly,
+# however many coordinators register
+_STAGGER = 0.6180339887
+
+
+class _Scheduled:
+    """Refresh state of one registered coordinator."""
+
+    def __init__(self, coordinator, gateway: tuple[str, int], next_due: float):
+        self.coordinator = coordinator
+        self.gateway = gateway
+        self.next_due = next_due
+        self.running = False
+
+
+class EpeverRefreshOrchestrator:
+    """
+    Drive the refreshes of every Epever coordinator from one timer.
+
+    Each tick collects the coordinators that are due and refreshes them in
+    one asyncio cycle: gateways in parallel, devices on the same gateway
+    (the same RS485 bus) limited by a per-gateway semaphore. Start times are
+    staggered so many coordinators don't all poll at the same second.
+    """
+
+    def __init__(self, hass: HomeAssistant, tick: float = ORCHESTRATOR_TICK):
+        self.hass = hass
+        self.tick = tick
+        self._scheduled: dict[object, _Scheduled] = {}
+        self._semaphores: dict[tuple[str, int], asyncio.Semaphore] = {}
+        self._registered = 0
+        self._unsub = None
+
+    @callback
+    def register(self, coordinator, gateway: tuple[str, int], concurrency: int = 1):
+        """Start scheduling a coordinator polled through `gateway` (host, port)."""
+        interval = coordinator.poll_interval.total_seconds()
+        offset = (self._registered * _STAGGER) % 1.0 * interval
+        self._registered += 1
+
+        self._scheduled[coordinator] = _Scheduled(
+            coordinator, gateway, time.monotonic() + interval + offset
+        )
+        if gateway not in self._semaphores:
+            self._semaphores[gateway] = asyncio.Semaphore(max(1, concurrency))
+
+        if self._unsub is None:
+            self._unsub = async_track_time_interval(
+                self.hass, self._async_tick, timedelta(seconds=self.tick)
+            )
+
+    @callback
+    def unregister(self, coordinator):
+        """Stop scheduling a coordinator; the last one stops the timer."""
+        scheduled = self._scheduled.pop(coordinator, None)
+        if scheduled is None:
+            return
+
+        if not any(s.gateway == scheduled.gateway for s in self._scheduled.values()):
+            self._semaphores.pop(scheduled.gateway, None)
+
+        if not self._scheduled and self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    def __len__(self):
+        return len(self._scheduled)
+
+    async def _async_tick(self, _now=None):
+        """Refresh every due coordinator in one cycle."""
+        now = time.monotonic()
+        by_gateway: dict[tuple[str, int], list[_Scheduled]] = {}
+
+        for scheduled in self._scheduled.values():
+            # A refresh still running from an earlier tick is not doubled up
+            if scheduled.running or scheduled.next_due > now:
+                continue
+            scheduled.running = True
+            by_gateway.setdefault(scheduled.gateway, []).append(scheduled)
+
+        if not by_gateway:
+            return
+
+        await asyncio.gather(
+            *(
+                self._async_refresh(scheduled, self._semaphores[gateway])
+                for gateway, due in by_gateway.items()
+                for scheduled in due
+            )
+        )
+
+    async def _async_refresh(self, scheduled: _Scheduled, semaphore: asyncio.Semaphore):
+        coordinator = scheduled.coordinator
+        try:
+            async with semaphore:
+                await coordinator.async_refresh()
+        finally:
+            scheduled.running = False
+            interval = coordinator.poll_interval.total_seconds()
+            # Keep the staggered phase; skip ticks that were missed entirely
+            scheduled.next_due += interval
+            now = time.monotonic()
+            if scheduled.next_due <= now:
+                missed = (now - scheduled.next_due) // interval + 1
+                scheduled.next_due += missed * interval
+
+
+@callback
+def async_get_orchestrator(hass: HomeAssistant) -> EpeverRefreshOrchestrator:
+    """Return the orchestrator shared by all entries, creating it on first use."""
+    orchestrator = hass.data.get(DATA_ORCHESTRATOR)
+    if orchestrator is None:
+        orchestrator = hass.data[DATA_ORCHESTRATOR] = EpeverRefreshOrchestrator(hass)
+    return orchestrator
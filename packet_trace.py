@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import struct
+import time
+from dataclasses import dataclass
+
+from .const import TRACE_MAX_BYTES
+
+# File layout: TRACE_MAGIC, then one record per event:
+#   <d: seconds since the recording started> <B: kind> <H: payload length> payload
+TRACE_MAGIC = b"EPTRACE1"
+RECORD = struct.Struct("<dBH")
+
+SENT = 0
+RECEIVED = 1
+CONNECTED = 2
+DISCONNECTED = 3
+
+# Modbus TCP (MBAP) header: transaction id, protocol id, length
+_MBAP = struct.Struct(">HHH")
+
+
+# ============================================================
+#  RECORDING
+# ============================================================
+
+class PacketRecorder:
+    """
+    Timestamped log of the raw bytes exchanged with one gateway.
+
+    Fed by the gateway sessions' pymodbus trace hooks; records are packed
+    into one growing bytearray (a few bytes of overhead per packet) and
+    written out in one go by save(). Recording stops at `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = TRACE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.buffer = bytearray(TRACE_MAGIC)
+        self.packets = 0
+        self.truncated = False
+        self._started = time.perf_counter()
+
+    def _add(self, kind: int, data: bytes = b""):
+        if len(self.buffer) + RECORD.size + len(data) > self.max_bytes:
+            self.truncated = True
+            return
+        self.buffer += RECORD.pack(time.perf_counter() - self._started, kind, len(data))
+        self.buffer += data
+
+    def packet(self, sending: bool, data: bytes):
+        """trace_packet hook: a frame sent or a chunk received."""
+        self.packets += 1
+        self._add(SENT if sending else RECEIVED, data)
+
+    def connection(self, connected: bool):
+        """trace_connect hook."""
+        self._add(CONNECTED if connected else DISCONNECTED)
+
+    def save(self, path: str):
+        """Write the trace to a file (blocking)."""
+        with open(path, "wb") as file:
+            file.write(self.buffer)
+
+
+# ============================================================
+#  READING
+# ============================================================
+
+@dataclass
+class TraceRecord:
+    time: float
+    kind: int
+    data: bytes
+
+
+@dataclass
+class Exchange:
+    """A request and the response matched to it by transaction id."""
+
+    sent_at: float
+    request: bytes
+    response: bytes | None = None
+    latency: float | None = None
+
+    @property
+    def key(self) -> bytes:
+        """Unit id + PDU of the request: what a replay matches requests on."""
+        return self.request[6:]
+
+
+def read_trace(data: bytes) -> list[TraceRecord]:
+    """Parse a trace written by PacketRecorder."""
+    if not data.startswith(TRACE_MAGIC):
+        raise ValueError("Not an Epever packet trace")
+    view = memoryview(data)
+    records = []
+    offset = len(TRACE_MAGIC)
+    while offset + RECORD.size <= len(data):
+        at, kind, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        records.append(TraceRecord(at, kind, bytes(view[offset:offset + length])))
+        offset += length
+    return records
+
+
+def exchanges(records: list[TraceRecord]) -> list[Exchange]:
+    """
+    Pair requests with their responses.
+
+    Received chunks are re-framed with the MBAP length (a chunk may hold
+    part of a frame or several frames), then matched by transaction id.
+    Requests left unanswered (timeouts) keep response None.
+    """
+    result: list[Exchange] = []
+    pending: dict[int, Exchange] = {}
+    stream = bytearray()
+
+    for record in records:
+        if record.kind == SENT:
+            exchange = Exchange(record.time, record.data)
+            pending[_MBAP.unpack_from(record.data)[0]] = exchange
+            result.append(exchange)
+        elif record.kind == RECEIVED:
+            stream += record.data
+            while len(stream) >= _MBAP.size:
+                tid, _protocol, length = _MBAP.unpack_from(stream)
+                size = _MBAP.size + length
+                if len(stream) < size:
+                    break
+                exchange = pending.pop(tid, None)
+                if exchange is not None:
+                    exchange.response = bytes(stream[:size])
+                    exchange.latency = record.time - exchange.sent_at
+                del stream[:size]
+        else:
+            # New or lost connection: partial frames and open requests are void
+            stream.clear()
+            pending.clear()
+    return result
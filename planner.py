@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from .const import DEFAULT_MAX_GAP, DEFAULT_MAX_REGISTERS, POLL_FAST
+
+
+# ============================================================
+#  READ BLOCKS
+# ============================================================
+
+@dataclass
+class ReadBlock:
+    """One FC03/FC04 request covering one or more profile sensors."""
+
+    reg_type: str
+    start: int
+    count: int
+    sensors: list[dict] = field(default_factory=list)
+
+    @property
+    def end(self) -> int:
+        """First register address after this block."""
+        return self.start + self.count
+
+    def slice(self, registers: list[int], sensor: dict) -> list[int]:
+        """Return the registers belonging to a sensor of this block."""
+        offset = sensor["register"] - self.start
+        return registers[offset:offset + sensor_length(sensor)]
+
+
+def sensor_length(sensor: dict) -> int:
+    """Number of registers used by a sensor (supports "length" and "count")."""
+    return sensor.get("length") or sensor.get("count") or 1
+
+
+def sensor_registers(sensor: dict) -> range:
+    """Register addresses used by a sensor."""
+    return range(sensor["register"], sensor["register"] + sensor_length(sensor))
+
+
+def sensor_table(sensor: dict) -> str:
+    """Register table of a sensor: "holding" (FC03) or "input" (FC04)."""
+    return "holding" if sensor.get("type") == "holding" else "input"
+
+
+def sensor_tier(sensor: dict) -> str:
+    """Poll tier of a sensor (defaults to the fast, real-time tier)."""
+    return sensor.get("poll") or POLL_FAST
+
+
+# ============================================================
+#  PLANNER
+# ============================================================
+
+_NONE: frozenset[int] = frozenset()
+
+
+def plan_reads(
+    sensors: list[dict],
+    max_gap: int = DEFAULT_MAX_GAP,
+    max_registers: int = DEFAULT_MAX_REGISTERS,
+    unreadable: dict[str, set[int]] | None = None,
+) -> list[ReadBlock]:
+    """
+    Group sensors into the fewest block reads.
+
+    Sensors of the same register table are merged while the hole between
+    them is at most `max_gap` registers and the block stays within
+    `max_registers` registers (the device's per-request limit).
+
+    `unreadable` maps a register table to addresses the device rejects:
+    sensors using them are left out and no block bridges a hole over them.
+    """
+    unreadable = unreadable or {}
+    ordered = sorted(
+        (
+            s for s in sensors
+            if not unreadable.get(sensor_table(s))
+            or unreadable[sensor_table(s)].isdisjoint(sensor_registers(s))
+        ),
+        key=lambda s: (sensor_table(s), s["register"]),
+    )
+
+    blocks: list[ReadBlock] = []
+    current: ReadBlock | None = None
+
+    for sensor in ordered:
+        reg_type = sensor_table(sensor)
+        start = sensor["register"]
+        end = start + sensor_length(sensor)
+
+        if (
+            current is not None
+            and current.reg_type == reg_type
+            and start - current.end <= max_gap
+            and max(end, current.end) - current.start <= max_registers
+            and unreadable.get(reg_type, _NONE).isdisjoint(range(current.end, start))
+        ):
+            current.count = max(end, current.end) - current.start
+            current.sensors.append(sensor)
+            continue
+
+        current = ReadBlock(
+            reg_type=reg_type,
+            start=start,
+            count=end - start,
+            sensors=[sensor],
+        )
+        blocks.append(current)
+
+    return blocks
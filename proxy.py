@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from .const import PROXY_HOST
+from .register_cache import RegisterCache
+from .vendor.pymodbus.constants import ExcCodes
+from .vendor.pymodbus.datastore import ModbusBaseDeviceContext, ModbusServerContext
+from .vendor.pymodbus.server import ModbusTcpServer
+
+_LOGGER = logging.getLogger(__name__)
+
+# Function code -> register table
+_TABLES = {3: "holding", 4: "input"}
+
+
+# ============================================================
+#  PROXY DEVICE
+# ============================================================
+
+class ProxyDeviceContext(ModbusBaseDeviceContext):
+    """
+    One device served by the proxy, under its own slave id.
+
+    FC03/FC04 reads are answered from the coordinator's register cache;
+    registers missing from it, or older than max_age seconds, are read
+    through the device's client (in fair turn with the coordinator's own
+    reads) and cached. Writes are refused: the integration stays the only
+    master writing to the bus.
+    """
+
+    def __init__(self, client, cache: RegisterCache, max_age: float):
+        self.client = client
+        self.cache = cache
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+    async def async_getValues(self, func_code, address, count=1):
+        reg_type = _TABLES.get(func_code)
+        if reg_type is None:
+            return ExcCodes.ILLEGAL_FUNCTION
+
+        values = self.cache.get(reg_type, address, count, self.max_age, time.monotonic())
+        if values is not None:
+            self.hits += 1
+            return values
+
+        self.misses += 1
+        registers, exception_code = await self.client.read_block(address, count, reg_type)
+        if registers is None:
+            try:
+                return ExcCodes(exception_code)
+            except ValueError:
+                return ExcCodes.GATEWAY_NO_RESPONSE
+        self.cache.update(reg_type, address, registers, time.monotonic())
+        return registers
+
+    async def async_setValues(self, func_code, address, values):
+        return ExcCodes.ILLEGAL_FUNCTION
+
+    def getValues(self, func_code, address, count=1):
+        return ExcCodes.ILLEGAL_FUNCTION
+
+    def setValues(self, func_code, address, values):
+        return ExcCodes.ILLEGAL_FUNCTION
+
+    def as_dict(self) -> dict:
+        return {
+            "max_age": self.max_age,
+            "cached_registers": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# ============================================================
+#  PROXY LISTENERS
+# ============================================================
+
+class ModbusProxyServer:
+    """Modbus TCP listener on one port, serving every device attached to it."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.context = ModbusServerContext(devices={}, single=False)
+        self._server: ModbusTcpServer | None = None
+
+    @property
+    def devices(self) -> list[int]:
+        return [slave for slave, _context in self.context]
+
+    async def start(self):
+        self._server = ModbusTcpServer(self.context, address=(self.host, self.port))
+        await self._server.serve_forever(background=True)
+        _LOGGER.info("Modbus proxy listening on %s:%s", self.host, self.port)
+
+    async def stop(self):
+        if self._server is not None:
+            await self._server.shutdown()
+            self._server = None
+            _LOGGER.info("Modbus proxy on port %s stopped", self.port)
+
+
+class ModbusProxyPool:
+    """Process-wide proxy listeners keyed by port; entries on one port share it."""
+
+    def __init__(self, host: str = PROXY_HOST):
+        self.host = host
+        self._servers: dict[int, ModbusProxyServer] = {}
+
+    async def attach(self, port: int, slave: int, device: ProxyDeviceContext) -> bool:
+        """Serve a device as unit `slave` on `port`; False if that unit is taken."""
+        server = self._servers.get(port)
+        if server is None:
+            server = ModbusProxyServer(self.host, port)
+            await server.start()
+            self._servers[port] = server
+        elif slave in server.context:
+            _LOGGER.error("Modbus proxy port %s already serves unit %s", port, slave)
+            return False
+        server.context[slave] = device
+        return True
+
+    async def detach(self, port: int, slave: int):
+        """Stop serving a unit; the last one stops the listener."""
+        server = self._servers.get(port)
+        if server is None or slave not in server.context:
+            return
+        del server.context[slave]
+        if not server.devices:
+            del self._servers[port]
+            await server.stop()
+
+
+PROXIES = ModbusProxyPool()
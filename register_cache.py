@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+
+class RegisterCache:
+    """Latest raw register values of one device, with the time each was read."""
+
+    def __init__(self):
+        self._values: dict[str, dict[int, int]] = {}
+        self._read_at: dict[str, dict[int, float]] = {}
+
+    def update(self, reg_type: str, start: int, registers: list[int], now: float):
+        """Store registers read from `start` at monotonic time `now`."""
+        values = self._values.setdefault(reg_type, {})
+        read_at = self._read_at.setdefault(reg_type, {})
+        for address, value in enumerate(registers, start):
+            values[address] = value
+            read_at[address] = now
+
+    def get(self, reg_type: str, address: int, count: int, max_age: float, now: float) -> list[int] | None:
+        """Cached registers, or None if any of them is missing or older than max_age."""
+        values = self._values.get(reg_type)
+        read_at = self._read_at.get(reg_type)
+        if not values:
+            return None
+        addresses = range(address, address + count)
+        try:
+            if any(now - read_at[a] > max_age for a in addresses):
+                return None
+            return [values[a] for a in addresses]
+        except KeyError:
+            return None
+
+    def __len__(self):
+        return sum(len(values) for values in self._values.values())
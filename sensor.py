@@ -2,309 +2,38 @@ from __future__ import annotations
 
 import logging
 from homeassistant.components.sensor import SensorEntity
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.helpers.entity import EntityCategory
 
-from .const import DOMAIN
+from .const import DOMAIN, METRIC_SENSORS
 
 _LOGGER = logging.getLogger(__name__)
 
 # ============================================================
-#  SCALING HELPERS
+#  CHANGE-FILTERED ENTITY
 # ============================================================
 
-def _scale_100(raw):
-    """Scale register with factor 0.01."""
-    return raw * 0.01 if raw is not None else None
+class EpeverChangeFilteredEntity(CoordinatorEntity):
+    """Coordinator entity that only writes state when its value was published."""
 
+    _key: str
+    _last_available: bool | None = None
 
-def _scale_10(raw):
-    """Scale register with factor 10."""
-    return raw * 10.0 if raw is not None else None
-
-
-def _scale_kwh_001(raw):
-    """Scale register with factor 0.01 to kWh."""
-    return raw * 0.01 if raw is not None else None
-
-
-def _signed_int32(val: int | None) -> int | None:
-    """Convert 32-bit unsigned to signed."""
-    if val is None:
-        return None
-    if val & 0x80000000:
-        return val - 0x100000000
-    return val
-
-
-# ============================================================
-#  FORMULA FUNCTIONS (match const.py formula names)
-# ============================================================
-
-# ----- Rated values -----
-
-def epever_array_rated_voltage(d):
-    return _scale_100(d.get("array_rated_voltage_raw"))
-
-
-def epever_array_rated_current(d):
-    return _scale_100(d.get("array_rated_current_raw"))
-
-
-def epever_array_rated_power(d):
-    # 32-bit register, already combined in coordinator
-    return _scale_100(d.get("array_rated_power_raw"))
-
-
-def epever_battery_rated_voltage(d):
-    return _scale_100(d.get("battery_rated_voltage_raw"))
-
-
-def epever_battery_rated_current(d):
-    return _scale_100(d.get("battery_rated_current_raw"))
-
-
-def epever_battery_rated_power(d):
-    return _scale_100(d.get("battery_rated_power_raw"))
-
-
-# ----- Battery realtime -----
-
-def epever_battery_voltage(d):
-    # 0x331A, voltage /100
-    return _scale_100(d.get("battery_voltage_raw"))
-
-
-def epever_battery_current(d):
-    # 0x331B/0x331C combined 32-bit, signed, A/100
-    raw = _signed_int32(d.get("battery_current_raw"))
-    return raw * 0.01 if raw is not None else None
-
-
-def epever_battery_soc(d):
-    # 0x311A, already percent
-    return d.get("battery_soc_raw")
-
-
-def epever_battery_temperature(d):
-    # 0x3110, °C/100
-    return _scale_100(d.get("battery_temp_raw"))
-
-
-# ----- Device temperatures -----
-
-def epever_device_temperature(d):
-    # 0x3111, °C/100
-    return _scale_100(d.get("device_temp_raw"))
-
-
-def epever_component_temperature(d):
-    # 0x3112, °C/100
-    return _scale_100(d.get("component_temp_raw"))
-
-
-# ----- Charging side (controller → battery) -----
-
-def epever_charging_voltage(d):
-    return _scale_100(d.get("charging_voltage_raw"))
-
-
-def epever_charging_current(d):
-    return _scale_100(d.get("charging_current_raw"))
-
-
-def epever_charging_power(d):
-    # 32-bit, W/100
-    return _scale_100(d.get("charging_power_raw"))
-
-
-# ----- Load side -----
-
-def epever_load_voltage(d):
-    return _scale_100(d.get("load_voltage_raw"))
-
-
-def epever_load_current(d):
-    return _scale_100(d.get("load_current_raw"))
-
-
-def epever_load_power(d):
-    # 32-bit, W/100
-    return _scale_100(d.get("load_power_raw"))
-
-
-# ----- Min/max voltages today -----
-
-def epever_max_pv_voltage_today(d):
-    return _scale_100(d.get("max_pv_today_raw"))
-
-
-def epever_min_pv_voltage_today(d):
-    return _scale_100(d.get("min_pv_today_raw"))
-
-
-def epever_max_batt_voltage_today(d):
-    return _scale_100(d.get("max_batt_today_raw"))
-
-
-def epever_min_batt_voltage_today(d):
-    return _scale_100(d.get("min_batt_today_raw"))
-
-
-# ----- Energy – consumed -----
-# Match your template:
-#   Today/month: raw * 10  -> Wh
-#   Year/total:  raw * 0.01 -> kWh
-
-def epever_energy_consumed_today(d):
-    return _scale_10(d.get("consumed_today_raw"))
-
-
-def epever_energy_consumed_month(d):
-    return _scale_10(d.get("consumed_month_raw"))
-
-
-def epever_energy_consumed_year(d):
-    return _scale_kwh_001(d.get("consumed_year_raw"))
-
-
-def epever_energy_consumed_total(d):
-    return _scale_kwh_001(d.get("consumed_total_raw"))
-
-
-# ----- Energy – generated -----
-
-def epever_energy_generated_today(d):
-    return _scale_10(d.get("generated_today_raw"))
-
-
-def epever_energy_generated_month(d):
-    return _scale_10(d.get("generated_month_raw"))
-
-
-def epever_energy_generated_year(d):
-    return _scale_kwh_001(d.get("generated_year_raw"))
-
-
-def epever_energy_generated_total(d):
-    return _scale_kwh_001(d.get("generated_total_raw"))
-
-
-def epever_generated_charge_today(d):
-    """
-    ESPHome-style extra: approximate Ah generated today,
-    assuming ~12 V system: Wh_today / 12.
-    """
-    wh_today = epever_energy_generated_today(d)
-    return wh_today / 12.0 if wh_today is not None else None
-
-
-# ----- CO₂ reduction -----
-
-def epever_co2_reduction(d):
-    # co2_raw * 10 -> kg, like your template
-    return _scale_10(d.get("co2_raw"))
-
-
-# ----- Status codes (just expose raw) -----
-
-def epever_battery_status_code(d):
-    return d.get("battery_status_raw")
-
-
-def epever_charger_status_code(d):
-    return d.get("charger_status_raw")
-
-
-def epever_charging_mode_code(d):
-    return d.get("charging_mode_raw")
-
-# ------ PV side -----
-def epever_pv_voltage(d):
-    return _scale_100(d.get("pv_voltage_raw"))
-
-def epever_pv_current(d):
-    return _scale_100(d.get("pv_current_raw"))
-
-def epever_pv_power(d):
-    # 32-bit, W/100
-    return _scale_100(d.get("pv_power_raw"))
-
-# ============================================================
-#  FORMULA MAP (MUST MATCH const.py "formula" VALUES)
-# ============================================================
-
-FORMULAS = {
-    # Rated values
-    "epever_array_rated_voltage": epever_array_rated_voltage,
-    "epever_array_rated_current": epever_array_rated_current,
-    "epever_array_rated_power":   epever_array_rated_power,
-
-    "epever_battery_rated_voltage": epever_battery_rated_voltage,
-    "epever_battery_rated_current": epever_battery_rated_current,
-    "epever_battery_rated_power":   epever_battery_rated_power,
-
-    # Battery realtime
-    "epever_battery_voltage":     epever_battery_voltage,
-    "epever_battery_current":     epever_battery_current,
-    "epever_battery_soc":         epever_battery_soc,
-    "epever_battery_temperature": epever_battery_temperature,
-
-    # Device temps
-    "epever_device_temperature":    epever_device_temperature,
-    "epever_component_temperature": epever_component_temperature,
-
-    # Charging side
-    "epever_charging_voltage": epever_charging_voltage,
-    "epever_charging_current": epever_charging_current,
-    "epever_charging_power":   epever_charging_power,
-
-    # Load side
-    "epever_load_voltage": epever_load_voltage,
-    "epever_load_current": epever_load_current,
-    "epever_load_power":   epever_load_power,
-
-    # PV side
-    "epever_pv_voltage": epever_pv_voltage,
-    "epever_pv_current": epever_pv_current,
-    "epever_pv_power":   epever_pv_power,
-
-    # Min/max voltages today
-    "epever_max_pv_voltage_today":   epever_max_pv_voltage_today,
-    "epever_min_pv_voltage_today":   epever_min_pv_voltage_today,
-    "epever_max_batt_voltage_today": epever_max_batt_voltage_today,
-    "epever_min_batt_voltage_today": epever_min_batt_voltage_today,
-
-    # Energy – consumed
-    "epever_energy_consumed_today": epever_energy_consumed_today,
-    "epever_energy_consumed_month": epever_energy_consumed_month,
-    "epever_energy_consumed_year":  epever_energy_consumed_year,
-    "epever_energy_consumed_total": epever_energy_consumed_total,
-
-    # Energy – generated
-    "epever_energy_generated_today": epever_energy_generated_today,
-    "epever_energy_generated_month": epever_energy_generated_month,
-    "epever_energy_generated_year":  epever_energy_generated_year,
-    "epever_energy_generated_total": epever_energy_generated_total,
-
-    # Ah estimate from generated energy
-    "epever_generated_charge_today": epever_generated_charge_today,
-
-    # CO2
-    "epever_co2_reduction": epever_co2_reduction,
-
-    # Status codes
-    "epever_battery_status_code": epever_battery_status_code,
-    "epever_charger_status_code": epever_charger_status_code,
-    "epever_charging_mode_code":  epever_charging_mode_code,
-}
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        available = self.available
+        if available == self._last_available and self._key not in self.coordinator.changed_keys:
+            return
+        self._last_available = available
+        super()._handle_coordinator_update()
 
 
 # ============================================================
 #  RAW SENSOR ENTITY
 # ============================================================
 
-class EpeverRawSensor(CoordinatorEntity, SensorEntity):
+class EpeverRawSensor(EpeverChangeFilteredEntity, SensorEntity):
     """Representation of a raw Modbus register (scaled by coordinator)."""
 
     def __init__(self, coordinator, device_name, key, cfg):
@@ -324,6 +53,13 @@ class EpeverRawSensor(CoordinatorEntity, SensorEntity):
     def native_value(self):
         return self.coordinator.data.get(self._key)
 
+    @property
+    def extra_state_attributes(self):
+        # Last read failed: the value shown is the last good one
+        if self._key in self.coordinator.stale_keys:
+            return {"stale": True, "last_read": self.coordinator.last_read.get(self._key)}
+        return None
+
     @property
     def device_info(self):
         return {
@@ -338,7 +74,7 @@ class EpeverRawSensor(CoordinatorEntity, SensorEntity):
 #  VIRTUAL SENSOR ENTITY
 # ============================================================
 
-class EpeverVirtualSensor(CoordinatorEntity, SensorEntity):
+class EpeverVirtualSensor(EpeverChangeFilteredEntity, SensorEntity):
     """Representation of a computed / derived sensor."""
 
     def __init__(self, coordinator, device_name, key, cfg):
@@ -350,30 +86,74 @@ class EpeverVirtualSensor(CoordinatorEntity, SensorEntity):
         self._attr_name = f"{device_name} {cfg['name']}"
         self._attr_unique_id = f"{device_name}_{key}"
         self._attr_native_unit_of_measurement = cfg.get("unit")
+        self._attr_device_class = cfg.get("device_class")
+        self._attr_state_class = cfg.get("state_class")
 
     @property
     def native_value(self):
-        d = self.coordinator.data
-        formula_name = self._cfg["formula"]
+        # Formula and rounding already applied once per refresh
+        return self.coordinator.virtual_data.get(self._key)
 
-        try:
-            func = FORMULAS.get(formula_name)
-            if not func:
-                _LOGGER.error("No formula '%s' defined for virtual sensor '%s'", formula_name, self._key)
-                return None
+    @property
+    def extra_state_attributes(self):
+        # Computed from an input whose last read failed
+        if self._key in self.coordinator.stale_virtual_keys:
+            return {"stale": True, "last_read": self.coordinator.virtual_last_read(self._key)}
+        return None
 
-            val = func(d)
+    @property
+    def device_info(self):
+        return {
+            "identifiers": {(DOMAIN, self._dev_name)},
+            "name": self._dev_name,
+            "manufacturer": "Epever",
+            "model": self.coordinator.profile.get("name", "Epever Device"),
+        }
+
+
+# ============================================================
+#  POLL METRIC ENTITY
+# ============================================================
 
-            precision = self._cfg.get("precision")
-            if precision is not None and val is not None:
-                val = round(val, precision)
+class EpeverMetricSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor showing one poll metric of the device."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, device_name, key, cfg):
+        super().__init__(coordinator)
+        self._key = key
+        self._cfg = cfg
+        self._dev_name = device_name
+        self._path = cfg["metric"].split(".")
+        self._attr_entity_registry_enabled_default = cfg.get("enabled", False)
 
-            return val
+        self._attr_name = f"{device_name} {cfg['name']}"
+        self._attr_unique_id = f"{device_name}_{key}"
+        self._attr_native_unit_of_measurement = cfg.get("unit")
+        self._attr_state_class = cfg.get("state_class")
 
-        except Exception as e:
-            _LOGGER.error("Error computing virtual sensor '%s' (formula '%s'): %s",
-                          self._key, formula_name, e)
-            return None
+    @property
+    def available(self):
+        # Metrics stay meaningful while the device doesn't answer
+        return True
+
+    @property
+    def native_value(self):
+        value = self.coordinator.metrics_snapshot
+        for part in self._path:
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    @property
+    def extra_state_attributes(self):
+        if self._key == "request_rtt":
+            snapshot = self.coordinator.metrics_snapshot
+            return {
+                "p95_ms": snapshot.get("rtt_p95_ms"),
+                "histogram_ms": snapshot.get("rtt_histogram_ms"),
+            }
+        return None
 
     @property
     def device_info(self):
@@ -421,4 +201,26 @@ async def async_setup_entry(hass, entry, async_add_entities):
             )
         )
 
+    # Local energy accumulators (computed like virtual sensors)
+    for icfg in profile.get("integrals", []):
+        entities.append(
+            EpeverVirtualSensor(
+                coordinator,
+                device_name,
+                icfg["key"],
+                icfg,
+            )
+        )
+
+    # Poll metrics (diagnostic)
+    for mcfg in METRIC_SENSORS:
+        entities.append(
+            EpeverMetricSensor(
+                coordinator,
+                device_name,
+                mcfg["key"],
+                mcfg,
+            )
+        )
+
     async_add_entities(entities)
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+
+import voluptuous as vol
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import device_registry as dr
+from homeassistant.util import slugify
+
+from .const import (
+    CAPTURE_DIRECTORY,
+    CAPTURE_MAX_DURATION,
+    DEFAULT_CAPTURE_DURATION,
+    DEFAULT_CAPTURE_INTERVAL,
+    DEFAULT_TRACE_DURATION,
+    DOMAIN,
+    MIN_CAPTURE_INTERVAL,
+    SERVICE_CAPTURE,
+    SERVICE_READ_SETTINGS,
+    SERVICE_RECORD_TRACE,
+    SERVICE_WRITE_SETTINGS,
+    TRACE_DIRECTORY,
+    TRACE_MAX_DURATION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_SETTINGS = "settings"
+ATTR_DURATION = "duration"
+ATTR_INTERVAL = "interval"
+ATTR_FILE = "file"
+
+TARGET_SCHEMA = {vol.Optional(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string])}
+
+READ_SETTINGS_SCHEMA = vol.Schema(TARGET_SCHEMA)
+# Writes go to the devices named, never to every device by default
+WRITE_SETTINGS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string], vol.Length(min=1)),
+        vol.Required(ATTR_SETTINGS): vol.Schema({cv.string: vol.Coerce(float)}),
+    }
+)
+
+CAPTURE_SCHEMA = vol.Schema(
+    {
+        **TARGET_SCHEMA,
+        vol.Optional(ATTR_DURATION, default=DEFAULT_CAPTURE_DURATION): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=CAPTURE_MAX_DURATION)
+        ),
+        vol.Optional(ATTR_INTERVAL, default=DEFAULT_CAPTURE_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=MIN_CAPTURE_INTERVAL)
+        ),
+        vol.Optional(ATTR_FILE, default=False): cv.boolean,
+    }
+)
+
+RECORD_TRACE_SCHEMA = vol.Schema(
+    {
+        **TARGET_SCHEMA,
+        vol.Optional(ATTR_DURATION, default=DEFAULT_TRACE_DURATION): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=TRACE_MAX_DURATION)
+        ),
+    }
+)
+
+
+def _target_entries(hass: HomeAssistant, call: ServiceCall, default_all: bool = True) -> dict[str, dict]:
+    """
+    Loaded entries (entry_id -> hass.data) targeted by a call.
+
+    Without device_id that's all of them, unless `default_all` is False
+    (services writing to the devices), which makes device_id required.
+    """
+    loaded = hass.data.get(DOMAIN, {})
+    device_ids = call.data.get(ATTR_DEVICE_ID)
+    if not device_ids:
+        if not default_all:
+            raise ServiceValidationError(f"{call.service} needs the devices to apply to (device_id)")
+        return dict(loaded)
+
+    registry = dr.async_get(hass)
+    targets = {}
+    for device_id in device_ids:
+        device = registry.async_get(device_id)
+        if device is None:
+            raise ServiceValidationError(f"Unknown device {device_id}")
+        entry_ids = [entry_id for entry_id in device.config_entries if entry_id in loaded]
+        if not entry_ids:
+            raise ServiceValidationError(f"Device {device.name} is not an Epever device")
+        for entry_id in entry_ids:
+            targets[entry_id] = loaded[entry_id]
+    return targets
+
+
+async def _run_on_entries(
+    hass: HomeAssistant, call: ServiceCall, job, default_all: bool = True
+) -> ServiceResponse:
+    """Run `job(data)` on every targeted device concurrently; results keyed by device name."""
+    targets = _target_entries(hass, call, default_all)
+
+    async def run(data: dict):
+        try:
+            return await job(data)
+        except (ValueError, ConnectionError) as err:
+            _LOGGER.error("%s: %s failed: %s", data["name"], call.service, err)
+            return {"error": str(err)}
+
+    # Devices behind one gateway still take fair turns on its connection;
+    # different gateways are worked on in parallel
+    results = await asyncio.gather(*(run(data) for data in targets.values()))
+    return {data["name"]: result for data, result in zip(targets.values(), results)}
+
+
+async def async_setup_services(hass: HomeAssistant):
+    """Register the integration's services."""
+
+    async def read_settings(call: ServiceCall) -> ServiceResponse:
+        async def job(data: dict):
+            return await data["settings"].read()
+
+        return await _run_on_entries(hass, call, job)
+
+    async def write_settings(call: ServiceCall) -> ServiceResponse:
+        desired = call.data[ATTR_SETTINGS]
+
+        async def job(data: dict):
+            return await data["settings"].write(desired)
+
+        return await _run_on_entries(hass, call, job, default_all=False)
+
+    async def capture(call: ServiceCall) -> ServiceResponse:
+        duration = call.data[ATTR_DURATION]
+        interval = call.data[ATTR_INTERVAL]
+        to_file = call.data[ATTR_FILE]
+        started = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        async def job(data: dict):
+            capture = data["capture"]
+            buffer = await capture.run(duration, interval)
+            result = capture.result()
+            if not to_file:
+                return result
+
+            name = f"{slugify(data['name'])}_{started}.csv"
+            path = hass.config.path(CAPTURE_DIRECTORY, name)
+            await hass.async_add_executor_job(_write_csv, buffer, path, capture.scales)
+            del result["data"]
+            return {**result, "file": path}
+
+        return await _run_on_entries(hass, call, job)
+
+    async def record_trace(call: ServiceCall) -> ServiceResponse:
+        duration = call.data[ATTR_DURATION]
+        started = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # One recording per gateway, whichever of its devices were targeted
+        gateways = {data["client"].gateway: data["client"] for data in _target_entries(hass, call).values()}
+
+        async def record(gateway: tuple[str, int], client):
+            host, port = gateway
+            try:
+                recorder = await client.start_trace()
+            except (ValueError, ConnectionError) as err:
+                _LOGGER.error("Recording %s:%s failed: %s", host, port, err)
+                return {"error": str(err)}
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                client.stop_trace()
+            path = hass.config.path(TRACE_DIRECTORY, f"{slugify(host)}_{port}_{started}.eptrace")
+            await hass.async_add_executor_job(_save_trace, recorder, path)
+            return {
+                "file": path,
+                "packets": recorder.packets,
+                "bytes": len(recorder.buffer),
+                "truncated": recorder.truncated,
+            }
+
+        results = await asyncio.gather(*(record(gateway, client) for gateway, client in gateways.items()))
+        return {f"{host}:{port}": result for (host, port), result in zip(gateways, results)}
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_READ_SETTINGS, read_settings,
+        schema=READ_SETTINGS_SCHEMA, supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_WRITE_SETTINGS, write_settings,
+        schema=WRITE_SETTINGS_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_CAPTURE, capture,
+        schema=CAPTURE_SCHEMA, supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_RECORD_TRACE, record_trace,
+        schema=RECORD_TRACE_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _write_csv(buffer, path: str, scales: list[float]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    buffer.write_csv(path, scales)
+
+
+def _save_trace(recorder, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    recorder.save(path)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from .const import DEFAULT_MAX_GAP, DEFAULT_MAX_REGISTERS
+from .planner import ReadBlock, plan_reads
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def changed_runs(current: dict[int, int], wanted: dict[int, int]) -> list[tuple[int, list[int]]]:
+    """Contiguous runs (start, values) of the wanted registers that differ from current."""
+    runs: list[tuple[int, list[int]]] = []
+    for address in sorted(wanted):
+        value = wanted[address]
+        if current.get(address) == value:
+            continue
+        if runs and runs[-1][0] + len(runs[-1][1]) == address:
+            runs[-1][1].append(value)
+        else:
+            runs.append((address, [value]))
+    return runs
+
+
+class EpeverSettings:
+    """
+    Battery and charging parameters of one device (the profile's "settings").
+
+    The whole parameter area is read in as few FC03 requests as the planner
+    allows (two on a Tracer). A write reads it, writes only the runs of
+    registers that differ with one FC16 request each, and reads back the
+    blocks it wrote to confirm the device took the values.
+    """
+
+    def __init__(self, client, profile: dict, cache=None):
+        self.client = client
+        self.settings = {s["key"]: s for s in profile.get("settings", [])}
+        self.blocks: list[ReadBlock] = plan_reads(
+            [{**s, "type": "holding"} for s in self.settings.values()],
+            max_gap=profile.get("max_gap", DEFAULT_MAX_GAP),
+            max_registers=profile.get("max_registers", DEFAULT_MAX_REGISTERS),
+        )
+        # Register cache served by the proxy, kept in step with what we read
+        self.cache = cache
+
+    # ----- conversions -----
+
+    def to_raw(self, key: str, value) -> int:
+        """Register value for a setting; ValueError if unknown or out of range."""
+        setting = self.settings.get(key)
+        if setting is None:
+            raise ValueError(f"Unknown setting '{key}'")
+        raw = round(float(value) / setting.get("scale", 1))
+        if not 0 <= raw <= 0xFFFF:
+            raise ValueError(f"{value} is out of range for '{key}'")
+        return raw
+
+    def from_raw(self, registers: dict[int, int]) -> dict:
+        """Setting values from raw registers (address -> value)."""
+        values = {}
+        for key, setting in self.settings.items():
+            raw = registers.get(setting["register"])
+            scale = setting.get("scale", 1)
+            values[key] = None if raw is None else (raw if scale == 1 else round(raw * scale, 4))
+        return values
+
+    # ----- bus -----
+
+    async def read_registers(self, blocks: list[ReadBlock] | None = None) -> dict[int, int]:
+        """Raw registers (address -> value) of the given blocks (default: all)."""
+        registers: dict[int, int] = {}
+        for block in self.blocks if blocks is None else blocks:
+            values = await self.client.read_register(block.start, block.count, reg_type="holding")
+            if values is None:
+                raise ConnectionError(f"Reading settings at 0x{block.start:04X} failed")
+            if self.cache is not None:
+                self.cache.update("holding", block.start, values, time.monotonic())
+            registers.update(enumerate(values, block.start))
+        return registers
+
+    async def read(self) -> dict:
+        """Current value of every setting."""
+        return self.from_raw(await self.read_registers())
+
+    async def write(self, desired: dict) -> dict:
+        """
+        Apply the desired settings (key -> value), touching only what changed.
+
+        Returns the settings changed (key -> [old, new]), the registers
+        written and whether the read-back matched. Raises ValueError for
+        unknown or out-of-range settings (before anything is written) and
+        ConnectionError if the device can't be read or refuses a write.
+        """
+        wanted = {}
+        for key, value in desired.items():
+            raw = self.to_raw(key, value)
+            wanted[self.settings[key]["register"]] = raw
+
+        current = await self.read_registers()
+        runs = changed_runs(current, wanted)
+        before = self.from_raw(current)
+
+        for start, values in runs:
+            if not await self.client.write_registers(start, values):
+                raise ConnectionError(f"Writing settings at 0x{start:04X} failed")
+
+        written = {address for start, values in runs for address in range(start, start + len(values))}
+        verified = True
+        after = before
+        if runs:
+            touched = [block for block in self.blocks if not written.isdisjoint(range(block.start, block.end))]
+            readback = await self.read_registers(touched)
+            verified = all(readback.get(address) == wanted[address] for address in written)
+            after = self.from_raw({**current, **readback})
+            if not verified:
+                _LOGGER.warning("Settings read back differ from the values written: %s", after)
+
+        return {
+            "changed": {
+                key: [before[key], after[key]]
+                for key in desired
+                if self.settings[key]["register"] in written
+            },
+            "writes": [{"start": f"0x{start:04X}", "count": len(values)} for start, values in runs],
+            "verified": verified,
+        }
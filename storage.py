@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STORAGE_SAVE_DELAY, STORAGE_VERSION
+
+
+class EpeverStore:
+    """Data one config entry keeps across restarts, in .storage/epever_modbus.<entry_id>."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+        self.data: dict = {}
+
+    async def async_load(self):
+        """Load the stored data (empty on first use)."""
+        self.data = await self._store.async_load() or {}
+
+    @callback
+    def async_schedule_save(self):
+        """Save soon, coalescing changes made close together."""
+        self._store.async_delay_save(lambda: self.data, STORAGE_SAVE_DELAY)
+
+    async def async_remove(self):
+        """Delete the stored data (config entry removed)."""
+        await self._store.async_remove()
+
+    # ----- unreadable registers -----
+
+    @property
+    def unreadable(self) -> dict[str, set[int]]:
+        """Register addresses the device rejects, per register table."""
+        return {
+            reg_type: set(addresses)
+            for reg_type, addresses in self.data.get("unreadable", {}).items()
+        }
+
+    @callback
+    def async_set_unreadable(self, unreadable: dict[str, set[int]]):
+        self.data["unreadable"] = {
+            reg_type: sorted(addresses) for reg_type, addresses in unreadable.items() if addresses
+        }
+        self.async_schedule_save()
+
+    # ----- warm start snapshot -----
+
+    @property
+    def snapshot(self) -> dict | None:
+        """Last decoded values: {"fingerprint", "saved_at", "data"}."""
+        return self.data.get("snapshot")
+
+    @callback
+    def async_set_snapshot(self, fingerprint, saved_at: str, data: dict):
+        self.data["snapshot"] = {"fingerprint": fingerprint, "saved_at": saved_at, "data": data}
+        self.async_schedule_save()
+
+    # ----- energy accumulators -----
+
+    @property
+    def integrals(self) -> dict | None:
+        """Saved EnergyIntegrator state."""
+        return self.data.get("integrals")
+
+    @callback
+    def async_set_integrals(self, state: dict):
+        """Keep the accumulators' state; written with the next save."""
+        self.data["integrals"] = state
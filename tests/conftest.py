@@ -0,0 +1,21 @@
+"""Make the integration importable as ``epever_modbus`` without Home Assistant.
+
+Like benchmarks/_common.py, the repository is registered as a package without
+running its ``__init__`` (which needs Home Assistant), under ``epever_modbus``
+and under its directory name, which pytest imports for the package node.
+"""
+from __future__ import annotations
+
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+PACKAGE = "epever_modbus"
+
+if PACKAGE not in sys.modules:
+    _package = types.ModuleType(PACKAGE)
+    _package.__path__ = [str(ROOT)]
+    _package.__file__ = str(ROOT / "__init__.py")
+    sys.modules[PACKAGE] = _package
+    sys.modules.setdefault(ROOT.name, _package)
@@ -0,0 +1,111 @@
+"""ModbusArraySimulatorContext against ModbusSimulatorContext, for the Tracer config."""
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+from epever_modbus.vendor.pymodbus.constants import ExcCodes
+from epever_modbus.vendor.pymodbus.datastore import ModbusArraySimulatorContext, ModbusSimulatorContext
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+from epever_simulator import ACTIONS, BATCH_ACTIONS, PROFILE, RANGES, tracer_config  # noqa: E402
+
+UNREADABLE = (0x311B, 0x3302)
+
+
+@pytest.fixture(params=["up", "down"])
+def stores(request, monkeypatch):
+    """Both stores, with the actions' random steps pinned to their top or bottom.
+
+    The cell and batch actions draw their steps differently (randint and
+    random()); pinned, they step alike and every value can be compared,
+    clamping at minval / maxval and 32-bit carries included.
+    """
+    if request.param == "up":
+        monkeypatch.setattr(random, "randint", lambda low, high: high)
+        monkeypatch.setattr(random, "random", lambda: 1 - 1e-9)
+    else:
+        monkeypatch.setattr(random, "randint", lambda low, high: low)
+        monkeypatch.setattr(random, "random", lambda: 0.0)
+    return (
+        ModbusSimulatorContext(tracer_config(unreadable=UNREADABLE), ACTIONS),
+        ModbusArraySimulatorContext(tracer_config(unreadable=UNREADABLE), BATCH_ACTIONS),
+    )
+
+
+def block_reads() -> list[tuple[int, int, int]]:
+    """(function code, address, count) reads around and across every served range.
+
+    None runs past the last register: ModbusSimulatorContext raises
+    IndexError there instead of answering exception 02.
+    """
+    size = RANGES[-1][1]
+    reads = []
+    for start, end in RANGES:
+        for func_code in (3, 4):
+            reads.append((func_code, start, end - start))
+            for address in range(start - 2, end + 2, 3):
+                reads.extend((func_code, address, count) for count in (1, 2, 5) if address + count <= size)
+    return reads
+
+
+def counters(cells: ModbusSimulatorContext) -> tuple[list[int], list[int]]:
+    return [reg.count_read for reg in cells.registers], [reg.count_write for reg in cells.registers]
+
+
+def test_reads_and_actions_match(stores):
+    cells, arrays = stores
+    reads = block_reads()
+    # Repeated, so the counters climb into their clamps and carries
+    for _ in range(40):
+        for func_code, address, count in reads:
+            assert arrays.getValues(func_code, address, count) == cells.getValues(func_code, address, count)
+    assert arrays.values.tolist() == [reg.value for reg in cells.registers]
+    assert (arrays.count_read(), arrays.count_write()) == counters(cells)
+
+
+def test_unreadable_and_undefined_addresses_are_rejected_alike(stores):
+    cells, arrays = stores
+    for address in (*UNREADABLE, 0x3120, 0x8FFF):
+        for func_code in (3, 4):
+            assert cells.getValues(func_code, address, 1) == ExcCodes.ILLEGAL_ADDRESS
+            assert arrays.getValues(func_code, address, 1) == ExcCodes.ILLEGAL_ADDRESS
+    assert arrays.register_count == RANGES[-1][1]
+    for address, count in ((arrays.register_count, 1), (arrays.register_count - 1, 2)):
+        assert arrays.getValues(3, address, count) == ExcCodes.ILLEGAL_ADDRESS
+
+
+def test_writes_match(stores):
+    cells, arrays = stores
+    settings = [setting["register"] for setting in PROFILE["settings"]]
+    writes = [
+        (16, settings[0], [1, 2, 3]),
+        (6, settings[-1], [7]),
+        (16, 0x9007, [1450, 1390]),
+        # Read-only and undefined registers: rejected, nothing written
+        (16, 0x3100, [5]),
+        (6, 0x3120, [5]),
+        (16, 0x906F, [5, 6]),
+    ]
+    for func_code, address, values in writes:
+        assert arrays.setValues(func_code, address, values) == cells.setValues(func_code, address, values)
+    for func_code, address, count in block_reads():
+        assert arrays.getValues(func_code, address, count) == cells.getValues(func_code, address, count)
+    assert (arrays.count_read(), arrays.count_write()) == counters(cells)
+
+
+def test_clones_serve_like_fresh_cell_stores(stores):
+    cells, layout = stores
+    clones = [layout.clone() for _ in range(2)]
+    clones[0].setValues(16, 0x9007, [1450, 1390])
+    cells.setValues(16, 0x9007, [1450, 1390])
+    for func_code, address, count in block_reads():
+        expected = cells.getValues(func_code, address, count)
+        assert clones[0].getValues(func_code, address, count) == expected
+    # Values and counters are the clone's own
+    assert clones[1].getValues(3, 0x9007, 2) == layout.getValues(3, 0x9007, 2) != [1450, 1390]
+    assert clones[1].count_write() == [0] * layout.register_count
+    assert (clones[0].count_read(), clones[0].count_write()) == counters(cells)
@@ -0,0 +1,101 @@
+"""CircuitBreaker state transitions."""
+from __future__ import annotations
+
+from epever_modbus.breaker import CircuitBreaker
+from epever_modbus.const import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN
+
+
+class Clock:
+    """Monotonic time under the test's control."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def tripped(clock: Clock) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", threshold=3, probe_base=10, probe_max=40)
+    for _ in range(3):
+        assert breaker.allow(clock())
+        breaker.record_failure(clock())
+    return breaker
+
+
+def test_opens_after_threshold_failures_in_a_row():
+    clock = Clock()
+    breaker = CircuitBreaker("test", threshold=3, probe_base=10, probe_max=40)
+    breaker.record_failure(clock())
+    breaker.record_failure(clock())
+    assert breaker.state == BREAKER_CLOSED
+    # A success in between starts the count again
+    breaker.record_success()
+    breaker.record_failure(clock())
+    breaker.record_failure(clock())
+    assert breaker.state == BREAKER_CLOSED
+
+    breaker.record_failure(clock())
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.trips == 1
+    assert breaker.next_probe == clock() + 10
+
+
+def test_open_skips_refreshes_until_the_probe_is_due():
+    clock = Clock()
+    breaker = tripped(clock)
+    clock.advance(9.9)
+    assert not breaker.allow(clock())
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.as_dict(clock())["next_probe_in"] == 0.1
+
+    clock.advance(0.1)
+    assert breaker.allow(clock())
+    assert breaker.state == BREAKER_HALF_OPEN
+
+
+def test_successful_probe_closes():
+    clock = Clock()
+    breaker = tripped(clock)
+    clock.advance(10)
+    assert breaker.allow(clock())
+    breaker.record_success()
+    assert breaker.state == BREAKER_CLOSED
+    assert (breaker.failures, breaker.next_probe) == (0, None)
+    assert breaker.allow(clock())
+
+
+def test_failed_probes_reopen_with_doubling_delay_up_to_the_max():
+    clock = Clock()
+    breaker = tripped(clock)
+    delays = []
+    for _ in range(4):
+        clock.advance(breaker.next_probe - clock())
+        assert breaker.allow(clock())
+        assert breaker.state == BREAKER_HALF_OPEN
+        breaker.record_failure(clock())
+        assert breaker.state == BREAKER_OPEN
+        delays.append(breaker.next_probe - clock())
+    assert delays == [20, 40, 40, 40]
+    # Probe failures don't count as new trips
+    assert breaker.trips == 1
+
+
+def test_delay_restarts_from_the_base_after_recovering():
+    clock = Clock()
+    breaker = tripped(clock)
+    clock.advance(10)
+    breaker.allow(clock())
+    breaker.record_failure(clock())
+    clock.advance(20)
+    breaker.allow(clock())
+    breaker.record_success()
+
+    for _ in range(3):
+        breaker.record_failure(clock())
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.trips == 2
+    assert breaker.next_probe - clock() == 10
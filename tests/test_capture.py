@@ -0,0 +1,68 @@
+"""CaptureBuffer ring order and CSV export."""
+from __future__ import annotations
+
+import csv
+
+from epever_modbus.capture import CaptureBuffer
+
+
+def filled(size: int, samples: int) -> CaptureBuffer:
+    buffer = CaptureBuffer(["voltage", "current"], size)
+    for i in range(samples):
+        buffer.append(1000.0 + i, [i, -i])
+        buffer.commit()
+    return buffer
+
+
+def test_before_wrapping_samples_are_in_order():
+    buffer = filled(5, 3)
+    assert len(buffer) == 3
+    assert buffer.overwritten == 0
+    assert buffer.as_dict() == {
+        "timestamp": [1000.0, 1001.0, 1002.0],
+        "voltage": [0, 1, 2],
+        "current": [0, -1, -2],
+    }
+
+
+def test_after_wrapping_samples_come_out_oldest_first():
+    # Wrapped more than once, and exactly onto the ring boundary
+    for samples in (7, 12, 15):
+        buffer = filled(5, samples)
+        assert len(buffer) == 5
+        assert buffer.overwritten == samples - 5
+        first = samples - 5
+        assert buffer.as_dict() == {
+            "timestamp": [1000.0 + i for i in range(first, samples)],
+            "voltage": list(range(first, samples)),
+            "current": [-i for i in range(first, samples)],
+        }
+
+
+def test_scales_apply_to_the_wrapped_samples():
+    buffer = filled(4, 6)
+    data = buffer.as_dict([0.01, 1])
+    assert data["voltage"] == [0.02, 0.03, 0.04, 0.05]
+    assert data["current"] == [-2, -3, -4, -5]
+
+
+def test_partial_sample_is_overwritten_by_the_next_one():
+    buffer = filled(3, 2)
+    # A sample whose second block failed: stored but never committed
+    buffer.append(2000.0, [99], [0])
+    buffer.append(1002.0, [2, -2])
+    buffer.commit()
+    assert buffer.as_dict()["voltage"] == [0, 1, 2]
+
+
+def test_csv_row_count_matches_capacity_once_wrapped(tmp_path):
+    buffer = filled(5, 13)
+    path = tmp_path / "capture.csv"
+    buffer.write_csv(str(path), [0.01, 1])
+
+    with open(path, newline="", encoding="utf-8") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["timestamp", "voltage", "current"]
+    assert len(rows) - 1 == buffer.size
+    assert [float(row[0]) for row in rows[1:]] == [1008.0, 1009.0, 1010.0, 1011.0, 1012.0]
+    assert [row[1:] for row in rows[1:]] == [[str(round(i * 0.01, 6)), str(-i)] for i in range(8, 13)]
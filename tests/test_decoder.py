@@ -0,0 +1,121 @@
+"""Precompiled block decoding and virtual sensors."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from epever_modbus.const import DEVICE_TYPES
+from epever_modbus.decoder import BlockDecoder, VirtualSensorPlan, compile_virtual_sensors
+from epever_modbus.planner import ReadBlock, plan_reads, sensor_length
+
+PROFILE = DEVICE_TYPES["epever_tracer"]
+
+
+def per_register_decode(sensor: dict, raw: list[int]):
+    """The per-sensor decode the block decoder replaced."""
+    if sensor_length(sensor) == 2:
+        value = (raw[1] << 16) | raw[0]
+    else:
+        value = raw[0]
+        if sensor.get("type") == "int16" and value > 0x7FFF:
+            value -= 0x10000
+    if sensor.get("scale"):
+        value = value * sensor["scale"]
+    return value
+
+
+def block(sensors: list[dict], start: int | None = None, count: int | None = None) -> ReadBlock:
+    start = min(s["register"] for s in sensors) if start is None else start
+    end = max(s["register"] + sensor_length(s) for s in sensors)
+    return ReadBlock("input", start, count or end - start, sensors)
+
+
+def test_profile_blocks_match_the_per_register_decode():
+    rng = random.Random(0)
+    for read in plan_reads(PROFILE["sensors"]):
+        decoder = BlockDecoder(read)
+        for _ in range(20):
+            registers = [rng.choice((0, 1, 0x7FFF, 0x8000, 0xFFFF, rng.randrange(0x10000))) for _ in range(read.count)]
+            expected = {s["key"]: per_register_decode(s, read.slice(registers, s)) for s in read.sensors}
+            assert decoder.decode(registers) == expected
+
+
+def test_signed_16_bit():
+    decoder = BlockDecoder(block([
+        {"key": "legacy", "register": 0x10, "type": "int16"},
+        {"key": "signed", "register": 0x11, "signed": True},
+        {"key": "unsigned", "register": 0x12},
+    ]))
+    assert decoder.decode([0xFFFF, 0x8000, 0xFFFF]) == {"legacy": -1, "signed": -32768, "unsigned": 0xFFFF}
+    assert decoder.decode([0x7FFF, 0, 1]) == {"legacy": 0x7FFF, "signed": 0, "unsigned": 1}
+
+
+def test_32_bit_values_are_low_word_first():
+    decoder = BlockDecoder(block([
+        {"key": "unsigned", "register": 0x20, "length": 2},
+        {"key": "signed", "register": 0x22, "length": 2, "signed": True},
+    ]))
+    assert decoder.decode([0x5678, 0x1234, 0xFFFE, 0xFFFF]) == {"unsigned": 0x12345678, "signed": -2}
+
+
+def test_scale():
+    decoder = BlockDecoder(block([
+        {"key": "voltage", "register": 0x30, "scale": 0.01},
+        {"key": "power", "register": 0x31, "length": 2, "scale": 0.1},
+        {"key": "raw", "register": 0x33},
+    ]))
+    values = decoder.decode([1234, 0x0000, 0x0001, 7])
+    assert values["voltage"] == pytest.approx(12.34)
+    assert values["power"] == pytest.approx(6553.6)
+    assert values["raw"] == 7
+
+
+def test_registers_without_a_sensor_inside_the_block_are_skipped():
+    sensors = [
+        {"key": "first", "register": 0x41},
+        {"key": "wide", "register": 0x44, "length": 2},
+        {"key": "last", "register": 0x48},
+    ]
+    # Holes before, between and after the sensors
+    read = block(sensors, start=0x40, count=11)
+    registers = [0xAAAA, 1, 0xBBBB, 0xCCCC, 2, 3, 0xDDDD, 0xEEEE, 4, 0xFFFF, 0x9999]
+    assert BlockDecoder(read).decode(registers) == {"first": 1, "wide": 3 << 16 | 2, "last": 4}
+    assert BlockDecoder(read).empty() == {"first": None, "wide": None, "last": None}
+
+
+def test_overlapping_sensors_decode_separately():
+    decoder = BlockDecoder(block([
+        {"key": "pair", "register": 0x50, "length": 2},
+        {"key": "low", "register": 0x50},
+        {"key": "high", "register": 0x51, "signed": True},
+    ]))
+    assert decoder.decode([1, 0xFFFF]) == {"pair": 0xFFFF0001, "low": 1, "high": -1}
+
+
+def test_virtual_sensor_with_an_unavailable_input_is_none():
+    plan = compile_virtual_sensors(PROFILE)
+    values = plan.evaluate({})
+    assert set(values) == {v["key"] for v in PROFILE["virtual_sensors"]}
+    assert all(value is None for value in values.values())
+
+    values = plan.evaluate({"battery_voltage_raw": 1234, "battery_current_raw": 0xFFFFFF9C})
+    assert values["battery_voltage"] == pytest.approx(12.3, abs=0.05)
+    assert values["battery_current"] == pytest.approx(-1.0)
+
+
+def test_virtual_sensor_formula_errors_and_unknown_formulas_give_none():
+    plan = VirtualSensorPlan([
+        {"key": "voltage", "formula": "epever_battery_voltage", "precision": 1},
+        {"key": "missing", "formula": "no_such_formula"},
+    ])
+    # A value the formula can't compute with
+    assert plan.evaluate({"battery_voltage_raw": "n/a"}) == {"voltage": None, "missing": None}
+    assert plan.evaluate({"battery_voltage_raw": 1234}) == {"voltage": 12.3, "missing": None}
+
+
+def test_virtual_sensor_inputs():
+    plan = compile_virtual_sensors(PROFILE)
+    assert plan.inputs["battery_current"] == {"battery_current_raw"}
+    assert plan.inputs["generated_charge_today"] == {"generated_today_raw"}
+    assert VirtualSensorPlan([{"key": "missing", "formula": "no_such_formula"}]).inputs == {"missing": frozenset()}
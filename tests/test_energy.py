@@ -0,0 +1,36 @@
+"""EnergyIntegrator day rollover."""
+from __future__ import annotations
+
+from epever_modbus.energy import EnergyIntegrator
+
+PROFILE = {
+    "integrals": [{"key": "pv_wh", "source": "pv_power"}],
+    "day_counters": ["generated_today"],
+}
+
+
+def test_rollover_keeps_energy_integrated_since_the_last_counter_read():
+    energy = EnergyIntegrator(PROFILE)
+    # 3600 W; the daily counter is read every 60 s, the power every 5 s
+    energy.add({"pv_power": 3600, "generated_today": 50}, {"pv_power", "generated_today"}, 0)
+    for timestamp in range(5, 60, 5):
+        energy.add({"pv_power": 3600}, {"pv_power"}, timestamp)
+    assert round(energy.totals["pv_wh"], 6) == 55
+
+    energy.add({"pv_power": 3600, "generated_today": 0}, {"pv_power", "generated_today"}, 60)
+    # The 60 s since the last counter read are kept, not dropped
+    assert round(energy.totals["pv_wh"], 6) == 60
+
+    energy.add({"pv_power": 3600}, {"pv_power"}, 65)
+    assert round(energy.totals["pv_wh"], 6) == 65
+
+
+def test_rollover_state_survives_a_restart():
+    energy = EnergyIntegrator(PROFILE)
+    energy.add({"pv_power": 3600, "generated_today": 50}, {"pv_power", "generated_today"}, 0)
+    energy.add({"pv_power": 3600}, {"pv_power"}, 30)
+
+    restored = EnergyIntegrator(PROFILE)
+    restored.restore(energy.as_dict())
+    restored.add({"pv_power": 3600, "generated_today": 0}, {"pv_power", "generated_today"}, 60)
+    assert round(restored.totals["pv_wh"], 6) == 60
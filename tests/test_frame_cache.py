@@ -0,0 +1,48 @@
+"""FramerSocket pre-encoded request frames."""
+from __future__ import annotations
+
+from epever_modbus.vendor.pymodbus.framer import FramerSocket
+from epever_modbus.vendor.pymodbus.pdu import DecodePDU
+from epever_modbus.vendor.pymodbus.pdu.register_message import (
+    ReadHoldingRegistersRequest,
+    ReadInputRegistersRequest,
+)
+
+
+def requests():
+    """Repeating reads over a few devices, tids wrapping around."""
+    tid = 65530
+    for cycle in range(3):
+        for request_class in (ReadInputRegistersRequest, ReadHoldingRegistersRequest):
+            for dev_id in (1, 2, 247):
+                for address, count in ((0x3100, 19), (0x3300, 20), (0x9000, 15)):
+                    tid = tid % 65535 + 1
+                    yield request_class(address=address, count=count, dev_id=dev_id, transaction_id=tid)
+
+
+def test_cached_frames_match_uncached_encoding():
+    cached = FramerSocket(DecodePDU(False))
+    for request in requests():
+        frame = cached.buildFrame(request)
+        assert frame == FramerSocket(DecodePDU(False)).buildFrame(request)
+        assert cached.expected_length(request) == request.get_response_pdu_size() + 7
+
+
+def test_cache_evicts_the_least_recently_sent_frame(monkeypatch):
+    monkeypatch.setattr(FramerSocket, "FRAME_CACHE_SIZE", 2)
+    framer = FramerSocket(DecodePDU(False))
+    first, second, third = (
+        ReadInputRegistersRequest(address=address, count=2, dev_id=1, transaction_id=1)
+        for address in (0x3100, 0x3200, 0x3300)
+    )
+    framer.buildFrame(first)
+    framer.buildFrame(second)
+    framer.buildFrame(first)
+    framer.buildFrame(third)
+
+    assert len(framer.templates) == 2
+    assert framer.expected_length(second) == 0
+    assert framer.expected_length(first) and framer.expected_length(third)
+    # Frames built after the eviction still encode the same
+    second.transaction_id = 7
+    assert framer.buildFrame(second) == FramerSocket(DecodePDU(False)).buildFrame(second)
@@ -0,0 +1,101 @@
+"""GatewayConnection session sharing."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from epever_modbus import modbus_client
+from epever_modbus.vendor.pymodbus.exceptions import ModbusIOException
+
+
+class FakeSession:
+    """Stands in for AsyncModbusTcpClient, counting connects."""
+
+    def __init__(self, **_kwargs):
+        self.connected = False
+        self.connects = 0
+
+    def set_max_in_flight(self, _window):
+        pass
+
+    async def connect(self):
+        self.connects += 1
+        await asyncio.sleep(0.01)
+        self.connected = True
+
+    def close(self):
+        self.connected = False
+
+
+def test_pipelined_slots_connect_their_session_once(monkeypatch):
+    monkeypatch.setattr(modbus_client, "AsyncModbusTcpClient", FakeSession)
+    gateway = modbus_client.GatewayConnection("gateway", 502, max_sessions=1, pipeline_window=4)
+
+    async def call(session):
+        await asyncio.sleep(0)
+        return session
+
+    async def run():
+        return await asyncio.gather(*(gateway.request(owner, call) for owner in range(4)))
+
+    sessions = asyncio.run(run())
+    assert len({id(session) for session in sessions}) == 1
+    assert sessions[0].connects == 1
+
+
+def test_failed_connect_raises_for_every_slot(monkeypatch):
+    class Unreachable(FakeSession):
+        async def connect(self):
+            self.connects += 1
+            await asyncio.sleep(0)
+
+    monkeypatch.setattr(modbus_client, "AsyncModbusTcpClient", Unreachable)
+    gateway = modbus_client.GatewayConnection("gateway", 502, max_sessions=1, pipeline_window=2)
+
+    async def run():
+        return await asyncio.gather(
+            *(gateway.request(owner, lambda session: asyncio.sleep(0)) for owner in range(2)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+class HangingSession(FakeSession):
+    """Never answers; a cancelled request surfaces like pymodbus reports it."""
+
+    async def read_input_registers(self, address, count=1, device_id=1):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError as exc:
+            raise ModbusIOException("Request cancelled outside pymodbus.") from exc
+
+
+def test_deadline_cancellation_is_not_counted_as_a_timeout(monkeypatch):
+    monkeypatch.setattr(modbus_client, "AsyncModbusTcpClient", HangingSession)
+    client = modbus_client.EpeverModbusClient("gateway", 502, 1, pool=modbus_client.ModbusConnectionPool())
+
+    async def run():
+        task = asyncio.create_task(client.read_block(0x3100, 4))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert client.metrics.cancelled == 1
+    assert (client.metrics.timeouts, client.metrics.failures, client.metrics.requests) == (0, 0, 0)
+
+
+def test_unanswered_request_is_counted_as_a_timeout(monkeypatch):
+    class Silent(FakeSession):
+        async def read_input_registers(self, address, count=1, device_id=1):
+            raise ModbusIOException("No response received after 3 retries")
+
+    monkeypatch.setattr(modbus_client, "AsyncModbusTcpClient", Silent)
+    client = modbus_client.EpeverModbusClient("gateway", 502, 1, pool=modbus_client.ModbusConnectionPool())
+
+    assert asyncio.run(client.read_block(0x3100, 4)) == (None, None)
+    assert (client.metrics.timeouts, client.metrics.cancelled) == (1, 0)
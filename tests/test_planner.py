@@ -0,0 +1,68 @@
+"""Block read planning."""
+from __future__ import annotations
+
+from epever_modbus.planner import plan_reads
+
+
+def sensor(register: int, length: int = 1, reg_type: str = "input") -> dict:
+    return {"key": f"{reg_type}_{register:x}", "register": register, "length": length, "type": reg_type}
+
+
+def spans(blocks) -> list[tuple[str, int, int]]:
+    return [(block.reg_type, block.start, block.count) for block in blocks]
+
+
+def test_gaps_up_to_max_gap_are_bridged():
+    sensors = [sensor(0x3100), sensor(0x3104), sensor(0x310A)]
+    # Holes of 3 and 5 registers
+    assert spans(plan_reads(sensors, max_gap=5)) == [("input", 0x3100, 11)]
+    assert spans(plan_reads(sensors, max_gap=3)) == [("input", 0x3100, 5), ("input", 0x310A, 1)]
+    assert spans(plan_reads(sensors, max_gap=0)) == [
+        ("input", 0x3100, 1), ("input", 0x3104, 1), ("input", 0x310A, 1),
+    ]
+
+
+def test_adjacent_and_overlapping_sensors_share_a_block():
+    sensors = [sensor(0x3102, 2), sensor(0x3100, 2), sensor(0x3102)]
+    blocks = plan_reads(sensors, max_gap=0)
+    assert spans(blocks) == [("input", 0x3100, 4)]
+    assert [s["register"] for s in blocks[0].sensors] == [0x3100, 0x3102, 0x3102]
+
+
+def test_blocks_split_at_max_registers():
+    sensors = [sensor(0x3100 + i) for i in range(10)]
+    assert spans(plan_reads(sensors, max_registers=4)) == [
+        ("input", 0x3100, 4), ("input", 0x3104, 4), ("input", 0x3108, 2),
+    ]
+    # A 32-bit sensor is not cut in two: it starts the next block
+    sensors = [sensor(0x3100), sensor(0x3102), sensor(0x3103, 2)]
+    assert spans(plan_reads(sensors, max_registers=4)) == [("input", 0x3100, 3), ("input", 0x3103, 2)]
+
+
+def test_unreadable_addresses_are_left_out_and_not_bridged():
+    sensors = [sensor(0x3100), sensor(0x3102), sensor(0x3104), sensor(0x3106, 2)]
+    blocks = plan_reads(sensors, max_gap=5, unreadable={"input": {0x3101, 0x3107}})
+    # 0x3101 is in a hole: split there; 0x3107 is used by a sensor: drop it
+    assert spans(blocks) == [("input", 0x3100, 1), ("input", 0x3102, 3)]
+    assert all(s["register"] != 0x3106 for block in blocks for s in block.sensors)
+
+
+def test_unreadable_addresses_only_apply_to_their_table():
+    sensors = [sensor(0x3100), sensor(0x3102), sensor(0x3100, reg_type="holding"), sensor(0x3102, reg_type="holding")]
+    blocks = plan_reads(sensors, max_gap=5, unreadable={"holding": {0x3101}})
+    assert spans(blocks) == [
+        ("holding", 0x3100, 1), ("holding", 0x3102, 1), ("input", 0x3100, 3),
+    ]
+
+
+def test_input_and_holding_tables_stay_in_separate_blocks():
+    sensors = [
+        sensor(0x9000, reg_type="holding"),
+        sensor(0x3100),
+        sensor(0x9001, reg_type="holding"),
+        sensor(0x3101),
+        {"key": "untyped", "register": 0x3102},
+    ]
+    blocks = plan_reads(sensors, max_gap=0x10000, max_registers=0x10000)
+    assert spans(blocks) == [("holding", 0x9000, 2), ("input", 0x3100, 3)]
+    assert {s["type"] for s in blocks[0].sensors} == {"holding"}
@@ -0,0 +1,82 @@
+"""Bulk struct encode/decode of the register messages."""
+from __future__ import annotations
+
+import struct
+
+import pytest
+
+from epever_modbus.vendor.pymodbus.exceptions import ModbusIOException
+from epever_modbus.vendor.pymodbus.pdu.register_message import (
+    ReadHoldingRegistersRequest,
+    ReadHoldingRegistersResponse,
+    ReadInputRegistersResponse,
+    ReadWriteMultipleRegistersRequest,
+    WriteMultipleRegistersRequest,
+)
+
+REGISTERS = [0, 1, 0x7FFF, 0x8000, 0xFFFF, 0x1234]
+
+
+def per_register_decode(data: bytes) -> list[int]:
+    """The register by register decode the bulk unpack replaced."""
+    return [struct.unpack(">H", data[i : i + 2])[0] for i in range(1, data[0], 2)]
+
+
+@pytest.mark.parametrize("count", [1, 2, 61, 125])
+@pytest.mark.parametrize("response_class", [ReadHoldingRegistersResponse, ReadInputRegistersResponse])
+def test_read_response_round_trip(response_class, count):
+    registers = [(REGISTERS * 21)[i] ^ i for i in range(count)]
+    data = response_class(registers=registers).encode()
+    assert data[0] == 2 * count
+    assert data == bytes([2 * count]) + b"".join(struct.pack(">H", r) for r in registers)
+
+    decoded = response_class()
+    decoded.decode(data)
+    assert decoded.registers == registers == per_register_decode(data)
+
+
+def test_read_response_odd_byte_count_drops_the_half_register():
+    data = bytes([5, 0x12, 0x34, 0x56, 0x78, 0x9A, 0x00])
+    response = ReadHoldingRegistersResponse()
+    response.decode(data)
+    assert response.registers == [0x1234, 0x5678] == per_register_decode(data)
+
+
+def test_read_response_byte_count_beyond_the_packet():
+    with pytest.raises(ModbusIOException):
+        ReadHoldingRegistersResponse().decode(bytes([4, 0x12, 0x34]))
+
+
+def test_read_request_is_limited_to_125_registers():
+    assert ReadHoldingRegistersRequest(address=0x3100, count=125).encode() == struct.pack(">HH", 0x3100, 125)
+    with pytest.raises(ValueError):
+        ReadHoldingRegistersRequest(address=0x3100, count=126).encode()
+    with pytest.raises(ValueError):
+        ReadHoldingRegistersRequest(address=0x3100, count=0).encode()
+
+
+@pytest.mark.parametrize("count", [1, 3, 123])
+def test_write_multiple_round_trip(count):
+    registers = [(REGISTERS * 21)[i] for i in range(count)]
+    request = WriteMultipleRegistersRequest(address=0x9000, registers=registers)
+    data = request.encode()
+    assert data[:5] == struct.pack(">HHB", 0x9000, count, 2 * count)
+
+    decoded = WriteMultipleRegistersRequest()
+    decoded.decode(data)
+    assert (decoded.address, decoded.count, decoded.registers) == (0x9000, count, registers)
+
+
+def test_read_write_multiple_round_trip():
+    request = ReadWriteMultipleRegistersRequest(
+        read_address=0x3100, read_count=125, write_address=0x9000, write_registers=REGISTERS
+    )
+    data = request.encode()
+    decoded = ReadWriteMultipleRegistersRequest()
+    decoded.decode(data)
+    assert (decoded.read_address, decoded.read_count, decoded.write_address) == (0x3100, 125, 0x9000)
+    assert decoded.write_registers == REGISTERS
+    assert decoded.write_byte_count == 2 * len(REGISTERS)
+
+    with pytest.raises(ValueError):
+        ReadWriteMultipleRegistersRequest(read_count=126, write_registers=[1]).encode()
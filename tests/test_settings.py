@@ -0,0 +1,90 @@
+"""Settings writes: changed runs and read-back."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from epever_modbus.const import DEVICE_TYPES
+from epever_modbus.settings import EpeverSettings, changed_runs
+
+PROFILE = DEVICE_TYPES["epever_tracer"]
+
+
+def test_changed_runs_merge_adjacent_changes():
+    current = {0x9000: 1, 0x9001: 200, 0x9002: 300, 0x9003: 1600}
+    wanted = {0x9001: 201, 0x9002: 301, 0x9003: 1601}
+    assert changed_runs(current, wanted) == [(0x9001, [201, 301, 1601])]
+
+
+def test_changed_runs_leave_unchanged_registers_alone():
+    current = {0x9000: 1, 0x9001: 200, 0x9002: 300, 0x9003: 1600}
+    # 0x9002 is unchanged: two runs around it, 0x9000 not written at all
+    wanted = {0x9000: 1, 0x9001: 201, 0x9002: 300, 0x9003: 1601}
+    assert changed_runs(current, wanted) == [(0x9001, [201]), (0x9003, [1601])]
+    assert changed_runs(current, {0x9000: 1, 0x9002: 300}) == []
+
+
+def test_changed_runs_are_sorted_and_include_unknown_registers():
+    wanted = {0x9008: 1380, 0x9007: 1440, 0x9000: 2}
+    assert changed_runs({}, wanted) == [(0x9000, [2]), (0x9007, [1440, 1380])]
+
+
+class FakeClient:
+    """Holding registers in a dict; `stuck` addresses ignore writes."""
+
+    def __init__(self, stuck: set[int] = frozenset()):
+        self.registers = {address: 1000 for address in range(0x9000, 0x9070)}
+        self.stuck = stuck
+        self.writes: list[tuple[int, list[int]]] = []
+        self.reads: list[tuple[int, int]] = []
+
+    async def read_register(self, register: int, count: int = 1, reg_type: str = "input"):
+        assert reg_type == "holding"
+        self.reads.append((register, count))
+        return [self.registers.get(register + i, 0) for i in range(count)]
+
+    async def write_registers(self, start: int, values: list[int]) -> bool:
+        self.writes.append((start, values))
+        for address, value in enumerate(values, start):
+            if address not in self.stuck:
+                self.registers[address] = value
+        return True
+
+
+def test_write_touches_only_changed_runs_and_reads_them_back():
+    client = FakeClient()
+    settings = EpeverSettings(client, PROFILE)
+    result = asyncio.run(settings.write({"boost_voltage": 14.4, "float_voltage": 13.8, "battery_type": 1000}))
+
+    assert client.writes == [(0x9007, [1440, 1380])]
+    assert result["writes"] == [{"start": "0x9007", "count": 2}]
+    assert result["verified"] is True
+    assert result["changed"] == {"boost_voltage": [10.0, 14.4], "float_voltage": [10.0, 13.8]}
+    # The full read, then the read-back of the block written to
+    assert len(client.reads) == len(settings.blocks) + 1
+    assert client.reads[-1][0] <= 0x9007 < client.reads[-1][0] + client.reads[-1][1]
+
+
+def test_write_reports_a_read_back_mismatch():
+    client = FakeClient(stuck={0x9008})
+    result = asyncio.run(EpeverSettings(client, PROFILE).write({"boost_voltage": 14.4, "float_voltage": 13.8}))
+    assert result["verified"] is False
+    assert result["changed"]["float_voltage"] == [10.0, 10.0]
+    assert result["changed"]["boost_voltage"] == [10.0, 14.4]
+
+
+def test_write_without_changes_writes_nothing():
+    client = FakeClient()
+    result = asyncio.run(EpeverSettings(client, PROFILE).write({"boost_voltage": 10.0}))
+    assert client.writes == []
+    assert result == {"changed": {}, "writes": [], "verified": True}
+
+
+def test_invalid_settings_are_refused_before_anything_is_written():
+    client = FakeClient()
+    settings = EpeverSettings(client, PROFILE)
+    for desired in ({"boost_voltage": 14.4, "no_such_setting": 1}, {"boost_voltage": 1000}):
+        with pytest.raises(ValueError):
+            asyncio.run(settings.write(desired))
+    assert client.writes == [] and client.reads == []
@@ -0,0 +1,141 @@
+"""Pipelined requests in the vendored transaction manager."""
+from __future__ import annotations
+
+import asyncio
+import struct
+
+import pytest
+
+from epever_modbus.vendor.pymodbus.client import AsyncModbusTcpClient
+from epever_modbus.vendor.pymodbus.exceptions import ConnectionException
+
+
+class FakeTransport:
+    """Keeps what the client writes, in place of the TCP socket."""
+
+    def __init__(self):
+        self.frames: list[bytes] = []
+
+    def write(self, data: bytes):
+        self.frames.append(bytes(data))
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+    def is_closing(self) -> bool:
+        return False
+
+
+def response(tid: int, registers: list[int], dev_id: int = 1) -> bytes:
+    """MBAP frame of a read input registers response."""
+    pdu = struct.pack(f">BB{len(registers)}H", 4, 2 * len(registers), *registers)
+    return struct.pack(">HHHB", tid, 0, len(pdu) + 1, dev_id) + pdu
+
+
+async def pipelined(count: int, window: int = 4):
+    """Client with `count` reads in flight, and the tid each was sent with."""
+    client = AsyncModbusTcpClient("gateway", timeout=5, retries=0)
+    client.set_max_in_flight(window)
+    transport = client.ctx.transport = FakeTransport()
+    tasks = [
+        asyncio.create_task(client.read_input_registers(0x3100 + 0x10 * i, count=2, device_id=1))
+        for i in range(count)
+    ]
+    while len(transport.frames) < count:
+        await asyncio.sleep(0)
+    tids = [struct.unpack_from(">H", frame)[0] for frame in transport.frames]
+    return client, tasks, tids
+
+
+def test_out_of_order_responses_are_routed_by_transaction_id():
+    async def run():
+        client, tasks, tids = await pipelined(3)
+        for i in (2, 0, 1):
+            client.ctx.data_received(response(tids[i], [i, 100 + i]))
+        return [(await task).registers for task in tasks]
+
+    assert asyncio.run(run()) == [[0, 100], [1, 101], [2, 102]]
+
+
+def test_frame_split_across_chunks():
+    async def run():
+        client, tasks, tids = await pipelined(2)
+        first, second = response(tids[0], [1, 2]), response(tids[1], [3, 4])
+        client.ctx.data_received(first[:5])
+        await asyncio.sleep(0)
+        assert not tasks[0].done()
+        client.ctx.data_received(first[5:] + second[:9])
+        client.ctx.data_received(second[9:])
+        return [(await task).registers for task in tasks]
+
+    assert asyncio.run(run()) == [[1, 2], [3, 4]]
+
+
+def test_several_frames_in_one_chunk():
+    async def run():
+        client, tasks, tids = await pipelined(3)
+        client.ctx.data_received(b"".join(response(tid, [tid, 7]) for tid in reversed(tids)))
+        return tids, [(await task).registers for task in tasks]
+
+    tids, results = asyncio.run(run())
+    assert results == [[tid, 7] for tid in tids]
+
+
+def test_unknown_transaction_id_is_dropped():
+    async def run():
+        client, tasks, tids = await pipelined(2)
+        unknown = max(tids) + 100
+        client.ctx.data_received(response(unknown, [9, 9]) + response(tids[1], [2, 2]))
+        client.ctx.data_received(response(tids[0], [1, 1]))
+        results = [(await task).registers for task in tasks]
+        return results, client.ctx.in_flight, client.ctx.recv_buffer
+
+    results, in_flight, buffer = asyncio.run(run())
+    assert results == [[1, 1], [2, 2]]
+    assert not in_flight
+    assert not buffer
+
+
+def test_in_flight_requests_fail_on_disconnect():
+    async def run():
+        client, tasks, _tids = await pipelined(3)
+        client.ctx.callback_disconnected(None)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return results, client.ctx.in_flight
+
+    results, in_flight = asyncio.run(run())
+    assert all(isinstance(result, ConnectionException) for result in results)
+    assert not in_flight
+
+
+def test_window_bounds_requests_in_flight():
+    async def run():
+        client, tasks, tids = await pipelined(2, window=2)
+        # A third request waits for a free slot in the window
+        third = asyncio.create_task(client.read_input_registers(0x3300, count=2, device_id=1))
+        await asyncio.sleep(0.01)
+        sent_before = len(client.ctx.transport.frames)
+        client.ctx.data_received(response(tids[0], [1, 1]))
+        while len(client.ctx.transport.frames) < 3:
+            await asyncio.sleep(0)
+        tid = struct.unpack_from(">H", client.ctx.transport.frames[2])[0]
+        client.ctx.data_received(response(tids[1], [2, 2]) + response(tid, [3, 3]))
+        return sent_before, [(await task).registers for task in (*tasks, third)]
+
+    sent_before, results = asyncio.run(run())
+    assert sent_before == 2
+    assert results == [[1, 1], [2, 2], [3, 3]]
+
+
+def test_pipelining_requires_the_socket_framer():
+    async def run():
+        from epever_modbus.vendor.pymodbus import FramerType
+
+        client = AsyncModbusTcpClient("gateway", framer=FramerType.RTU)
+        with pytest.raises(ValueError):
+            client.set_max_in_flight(2)
+
+    asyncio.run(run())
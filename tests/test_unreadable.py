@@ -0,0 +1,74 @@
+"""Bisection of blocks rejected with exception 02."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+from epever_modbus.unreadable import bisect_rejected
+from epever_modbus.vendor.pymodbus.constants import ExcCodes
+
+
+class RejectingClient:
+    """Answers block reads, with exception 02 for blocks covering a rejected address."""
+
+    def __init__(self, rejected: set[int], delay: float = 0.0, failing: set[int] = frozenset()):
+        self.rejected = rejected
+        self.delay = delay
+        self.failing = failing
+        self.reads: list[tuple[int, int]] = []
+
+    async def read_block(self, register: int, count: int = 1, reg_type: str = "input"):
+        self.reads.append((register, count))
+        await asyncio.sleep(self.delay)
+        addresses = set(range(register, register + count))
+        if addresses & self.failing:
+            return None, None
+        if addresses & self.rejected:
+            return None, ExcCodes.ILLEGAL_ADDRESS
+        return [0] * count, None
+
+
+def bisect(client, start: int, count: int, seconds: float = 5.0):
+    async def run():
+        return await bisect_rejected(client, "input", start, count, time.monotonic() + seconds)
+
+    return asyncio.run(run())
+
+
+def test_finds_the_exact_rejected_addresses():
+    client = RejectingClient({0x3104, 0x3109, 0x310A})
+    assert sorted(bisect(client, 0x3100, 16)) == [0x3104, 0x3109, 0x310A]
+    # The readable quarter 0x3100-0x3103 is read once, not split further
+    assert (0x3100, 4) in client.reads
+    assert not any(0x3100 <= start and start + count <= 0x3104 and count < 4 for start, count in client.reads)
+
+
+def test_single_rejected_address_in_an_odd_block():
+    client = RejectingClient({0x311B})
+    assert bisect(client, 0x3110, 13) == [0x311B]
+
+
+def test_a_single_register_block_is_the_rejected_address():
+    client = RejectingClient({0x3100})
+    assert bisect(client, 0x3100, 1) == [0x3100]
+    assert client.reads == []
+
+
+def test_stops_at_the_deadline():
+    # Each read takes 50 ms, the whole bisection would need about 8 of them
+    client = RejectingClient({0x3101, 0x310E}, delay=0.05)
+    started = time.monotonic()
+    assert bisect(client, 0x3100, 16, seconds=0.12) is None
+    assert time.monotonic() - started < 0.2
+    assert len(client.reads) <= 3
+
+
+def test_past_deadline_reads_nothing():
+    client = RejectingClient({0x3101})
+    assert bisect(client, 0x3100, 16, seconds=0) is None
+    assert client.reads == []
+
+
+def test_other_failures_are_inconclusive():
+    client = RejectingClient({0x3101}, failing={0x310C})
+    assert bisect(client, 0x3100, 16) is None
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from .vendor.pymodbus.constants import ExcCodes
+
+
+async def bisect_rejected(
+    client, reg_type: str, start: int, count: int, deadline: float
+) -> list[int] | None:
+    """
+    Addresses in a range rejected with exception 02 that the device won't read.
+
+    The range is split in halves read with `client.read_block` until the
+    rejected registers are single addresses. None if a read failed
+    otherwise (inconclusive) or the deadline (monotonic time) passed.
+    """
+    if count == 1:
+        return [start]
+
+    half = count // 2
+    unreadable = []
+    for sub_start, sub_count in ((start, half), (start + half, count - half)):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        try:
+            regs, exception_code = await asyncio.wait_for(
+                client.read_block(sub_start, sub_count, reg_type), remaining
+            )
+        except asyncio.TimeoutError:
+            return None
+        if exception_code == ExcCodes.ILLEGAL_ADDRESS:
+            addresses = await bisect_rejected(client, reg_type, sub_start, sub_count, deadline)
+            if addresses is None:
+                return None
+            unreadable.extend(addresses)
+        elif regs is None:
+            # Timeout or another error: inconclusive
+            return None
+    return unreadable